@@ -1,5 +1,6 @@
 import os
 import logging
+import json
 from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
@@ -78,6 +79,21 @@ with app.app_context():
         migrate_database()
     except Exception as e:
         logger.error(f"Error running migration: {str(e)}")
+    try:
+        from migrations.command_templates import migrate_database as migrate_command_templates
+        migrate_command_templates()
+    except Exception as e:
+        logger.error(f"Error running migration: {str(e)}")
+    try:
+        from migrations.scan_progress import migrate_database as migrate_scan_progress
+        migrate_scan_progress()
+    except Exception as e:
+        logger.error(f"Error running migration: {str(e)}")
+    try:
+        from migrations.scan_results_keyset import migrate_database as migrate_scan_results_keyset
+        migrate_scan_results_keyset()
+    except Exception as e:
+        logger.error(f"Error running migration: {str(e)}")
 
     # Create default admin account if no users exist
     if User.query.count() == 0:
@@ -239,7 +255,7 @@ def scan():
 @app.route('/start_scan', methods=['POST'])
 @login_required
 def start_scan():
-    from subnet_utils import parse_subnet_input
+    from subnet_utils import parse_target_set
     from ssh_utils import start_scan_session
     from models import ScanSession, CommandTemplate, CredentialSet
     
@@ -260,6 +276,9 @@ def start_scan():
         use_credential_sets = bool(data.get('use_credential_sets', False))
         multiple_credentials = bool(data.get('multiple_credentials', False))
         credential_set_id = data.get('credential_set_id')
+        scan_engine = data.get('scan_engine')
+        discovery = bool(data.get('discovery', False))
+        command_parallelism = data.get('command_parallelism')
     else:
         # Get form data
         subnets = request.form.get('subnets', '')
@@ -274,6 +293,23 @@ def start_scan():
         use_credential_sets = request.form.get('use_credential_sets') == 'true'
         multiple_credentials = request.form.get('multiple_credentials') == 'true'
         credential_set_id = request.form.get('credentialSet')
+        scan_engine = request.form.get('scanEngine')
+        discovery = request.form.get('discovery') == 'on'
+        command_parallelism = request.form.get('commandParallelism')
+
+    if scan_engine and scan_engine not in ('thread', 'asyncio'):
+        return jsonify({"error": "Invalid scan engine"}), 400
+
+    # Empty means "use the command template's setting"
+    if command_parallelism in (None, ''):
+        command_parallelism = None
+    else:
+        try:
+            command_parallelism = int(command_parallelism)
+        except (TypeError, ValueError):
+            return jsonify({"error": "Invalid command parallelism"}), 400
+        if not 1 <= command_parallelism <= 10:
+            return jsonify({"error": "Command parallelism must be between 1 and 10"}), 400
 
     # Validate subnets early
     if not subnets:
@@ -331,7 +367,7 @@ def start_scan():
     
     # Parse subnets
     try:
-        ip_addresses = parse_subnet_input(subnets)
+        ip_addresses = parse_target_set(subnets)
         if not ip_addresses:
             return jsonify({"error": "No valid IP addresses found"}), 400
     except Exception as e:
@@ -347,6 +383,8 @@ def start_scan():
             template = CommandTemplate.query.get(template_id_int)
             if template:
                 commands = template.commands.splitlines()
+                if command_parallelism is None:
+                    command_parallelism = template.command_parallelism
         except ValueError:
             # Handle invalid template ID
             pass
@@ -383,7 +421,10 @@ def start_scan():
         collect_detailed_info=collect_detailed_info,
         sudo_password=sudo_password,
         credential_sets=credential_sets_to_use,
-        concurrency=concurrency
+        concurrency=concurrency,
+        engine=scan_engine,
+        discovery=discovery,
+        command_parallelism=command_parallelism or 1
     )
     
     return jsonify({
@@ -392,35 +433,174 @@ def start_scan():
         "message": f"Scan started with {len(ip_addresses)} IP addresses"
     })
 
-@app.route('/scan_status/<int:scan_id>')
+@app.route('/import_targets', methods=['POST'])
 @login_required
-def scan_status(scan_id):
-    from models import ScanSession, ScanResult
-    
-    scan_session = ScanSession.query.get_or_404(scan_id)
-    total_ips = scan_session.total_ips or 0
-    completed_ips = ScanResult.query.filter(
-        ScanResult.scan_session_id == scan_id,
-        ScanResult.status_code.in_(['success', 'failed'])
-    ).count()
+def import_targets():
+    """Read an uploaded CSV file of targets into merged ranges for the scan form"""
+    import io
+    import csv
+    from subnet_utils import import_csv_targets
 
-    return jsonify({
-        "scan_id": scan_id,
+    upload = request.files.get('csvFile')
+    if upload is None or not upload.filename:
+        return jsonify({"error": "No CSV file provided"}), 400
+
+    # Decoded and parsed as it is read, a buffer at a time
+    text = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', errors='replace', newline='')
+    try:
+        result = import_csv_targets(text)
+    except csv.Error as e:
+        return jsonify({"error": f"Error parsing CSV file: {str(e)}"}), 400
+
+    payload = result.to_dict()
+    if not result.targets:
+        payload["error"] = "No valid IP addresses found"
+        return jsonify(payload), 400
+
+    logger.info(f"Imported {payload['ip_count']} targets from {result.rows} CSV rows "
+                f"({result.error_count} invalid entries)")
+    payload["success"] = True
+    payload["targets"] = '\n'.join(result.targets.ranges())
+    return jsonify(payload)
+
+def scan_progress(scan_session):
+    """Progress of a scan session from its maintained counters"""
+    total_ips = scan_session.total_ips or 0
+    # Maintained as results are written, so polling does not count scan_results
+    completed_ips = scan_session.completed_count or 0
+    return {
+        "scan_id": scan_session.id,
         "status": scan_session.status,
         "total": total_ips,
         "completed": completed_ips,
+        "success": scan_session.success_count or 0,
+        "failed": scan_session.failed_count or 0,
         "percent_complete": (completed_ips / total_ips * 100) if total_ips > 0 else 0
+    }
+
+@app.route('/scan_status/<int:scan_id>')
+@login_required
+def scan_status(scan_id):
+    from models import ScanSession
+    
+    scan_session = ScanSession.query.get_or_404(scan_id)
+    return jsonify(scan_progress(scan_session))
+
+# Seconds between keep-alive progress events on an idle event stream
+SCAN_EVENT_KEEPALIVE = 15
+
+# Results loaded per query when turning notifications into events
+SCAN_EVENT_RESULT_CHUNK = 500
+
+def format_sse(event, data):
+    """Encode one server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/scan_events/<int:scan_id>')
+@login_required
+def scan_event_stream(scan_id):
+    """Stream progress and newly finished results of a scan as server-sent events
+
+    Events: `progress` (same payload as /scan_status), `result` (one
+    ScanResult.to_dict() without detail fields), `resync` (notifications were
+    dropped, reload the results) and `complete` (final progress, the stream ends).
+    """
+    from flask import Response, stream_with_context
+    from sqlalchemy.orm import defer
+    from models import ScanResult, ScanSession
+    from scan_events import broker, RESULTS, COMPLETED
+
+    ScanSession.query.get_or_404(scan_id)
+
+    # Every open stream holds a server thread; beyond the limit clients poll
+    max_streams = int(os.environ.get('SCAN_EVENT_STREAMS', '8'))
+    if broker.subscriber_count() >= max_streams:
+        return jsonify({"success": False, "message": "Too many open event streams"}), 503
+
+    # Subscribe before the first read so nothing committed after it is missed
+    subscription = broker.subscribe(scan_id)
+
+    def current_progress():
+        progress = scan_progress(db.session.get(ScanSession, scan_id))
+        # End the read transaction so the next read sees new commits
+        db.session.rollback()
+        return progress
+
+    def result_events(result_ids):
+        for start in range(0, len(result_ids), SCAN_EVENT_RESULT_CHUNK):
+            chunk = result_ids[start:start + SCAN_EVENT_RESULT_CHUNK]
+            results = ScanResult.query.filter(ScanResult.id.in_(chunk)).options(
+                *[defer(getattr(ScanResult, field)) for field in ScanResult.DETAIL_FIELDS]
+            ).order_by(ScanResult.id).all()
+            for result in results:
+                yield format_sse('result', result.to_dict(fields=()))
+        db.session.rollback()
+
+    def generate():
+        try:
+            yield "retry: 3000\n\n"
+            progress = current_progress()
+            yield format_sse('progress', progress)
+            if progress['status'] == 'completed':
+                yield format_sse('complete', progress)
+                return
+
+            while True:
+                notification = subscription.get(timeout=SCAN_EVENT_KEEPALIVE)
+                if notification is None:
+                    # Idle: counters also cover scans running in other processes
+                    progress = current_progress()
+                    yield format_sse('progress', progress)
+                    if progress['status'] == 'completed':
+                        yield format_sse('complete', progress)
+                        return
+                    continue
+
+                result_ids = []
+                completed = False
+                while notification is not None:
+                    kind, payload = notification
+                    if kind == RESULTS:
+                        result_ids.extend(payload)
+                    elif kind == COMPLETED:
+                        completed = True
+                    notification = subscription.get_nowait()
+
+                if subscription.overflowed:
+                    subscription.overflowed = False
+                    yield format_sse('resync', {"scan_id": scan_id})
+                elif result_ids:
+                    yield from result_events(result_ids)
+
+                progress = current_progress()
+                yield format_sse('progress', progress)
+                if completed:
+                    yield format_sse('complete', progress)
+                    return
+        finally:
+            broker.unsubscribe(subscription)
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
     })
+    # generate() never runs if the client goes away before the first chunk
+    response.call_on_close(lambda: broker.unsubscribe(subscription))
+    return response
 
 @app.route('/results')
 @login_required
 def results():
-    from models import ScanSession
+    from models import ScanResult, ScanSession
     
     scan_sessions = ScanSession.query.order_by(ScanSession.created_at.desc()).all()
     current_scan_id = session.get('current_scan_id')
+    # Result rows per session, pending ones included, like ScanSession.to_dict's total_count
+    summaries = ScanResult.summarize([scan_session.id for scan_session in scan_sessions])
+    total_counts = {scan_id: summary['total'] for scan_id, summary in summaries.items()}
     
-    return render_template('results.html', scan_sessions=scan_sessions, current_scan_id=current_scan_id)
+    return render_template('results.html', scan_sessions=scan_sessions, current_scan_id=current_scan_id,
+                           total_counts=total_counts)
 
 @app.route('/scan_results/<int:scan_id>')
 @login_required
@@ -430,14 +610,15 @@ def scan_results(scan_id):
     scan_session = ScanSession.query.get_or_404(scan_id)
     results = ScanResult.query.filter_by(scan_session_id=scan_id).all()
     
-    # Calculate summary statistics
-    total = len(results)
-    success_count = sum(1 for r in results if r.status_code == 'success')
+    # Calculate summary statistics in the database
+    summary = ScanResult.summarize([scan_id]).get(scan_id) or ScanResult.empty_summary()
+    total = summary['total']
+    success_count = summary['success']
     failed_count = total - success_count
     
     return jsonify({
         "scan_id": scan_id,
-        "session": scan_session.to_dict(),
+        "session": scan_session.to_dict(total_count=total),
         "results": [r.to_dict() for r in results],
         "summary": {
             "total": total,
@@ -447,184 +628,240 @@ def scan_results(scan_id):
         }
     })
     
+@app.route('/scan_summary/<int:scan_id>')
+@login_required
+def scan_summary(scan_id):
+    """Aggregated statistics of a scan without any result rows"""
+    from models import ScanResult, ScanSession
+
+    scan_session = ScanSession.query.get_or_404(scan_id)
+    summary = ScanResult.summarize([scan_id]).get(scan_id) or ScanResult.empty_summary()
+    finished = summary['success'] + summary['failed']
+    summary['success_rate'] = (summary['success'] / finished * 100) if finished > 0 else 0
+    summary['execution_time_bucket_bounds'] = list(ScanResult.EXECUTION_TIME_BUCKETS)
+
+    return jsonify({
+        "scan_id": scan_id,
+        "session": scan_session.to_dict(total_count=summary['total']),
+        "progress": scan_progress(scan_session),
+        "summary": summary
+    })
+
+# Results per page of /scan_results/<scan_id>/page
+RESULT_PAGE_SIZE = 100
+MAX_RESULT_PAGE_SIZE = 1000
+
+def encode_result_cursor(result):
+    """Opaque cursor pointing just after `result` in (ip_int, id) order"""
+    import base64
+    return base64.urlsafe_b64encode(json.dumps([result.ip_int, result.id]).encode()).decode()
+
+def decode_result_cursor(cursor):
+    """Return (ip_int, id) of a cursor, raising ValueError if it is malformed"""
+    import base64
+    import binascii
+    try:
+        ip_int, result_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+    if type(ip_int) is not int or type(result_id) is not int:
+        raise ValueError("Invalid cursor")
+    return ip_int, result_id
+
+def parse_bool_arg(name):
+    """Return a yes/no query argument as True/False, None if it is absent or 'all'"""
+    value = request.args.get(name, '').strip().lower()
+    if value in ('', 'all'):
+        return None
+    if value in ('1', 'true', 'yes'):
+        return True
+    if value in ('0', 'false', 'no'):
+        return False
+    raise ValueError(f"Invalid value for {name}: {value}")
+
+@app.route('/scan_results/<int:scan_id>/page')
+@login_required
+def scan_results_page(scan_id):
+    """One page of a scan's results in numeric IP address order
+
+    Query arguments:
+        limit: Results per page (default 100, at most 1000)
+        cursor: `next_cursor` of the previous page
+        status: Only results with this status_code
+        ssh_status, sudo_status: yes/no
+        ip: Only addresses starting with this prefix
+        fields: Comma-separated detail fields to include (command_output, server_info)
+
+    The first page (no cursor) also carries `total`, the number of matching results.
+    """
+    from sqlalchemy import tuple_
+    from sqlalchemy.orm import defer
+    from models import ScanResult, ScanSession
+
+    ScanSession.query.get_or_404(scan_id)
+
+    try:
+        limit = min(max(int(request.args.get('limit', RESULT_PAGE_SIZE)), 1), MAX_RESULT_PAGE_SIZE)
+        cursor = request.args.get('cursor')
+        after = decode_result_cursor(cursor) if cursor else None
+        ssh_status = parse_bool_arg('ssh_status')
+        sudo_status = parse_bool_arg('sudo_status')
+        fields = [field.strip() for field in request.args.get('fields', '').split(',') if field.strip()]
+        unknown_fields = set(fields) - set(ScanResult.DETAIL_FIELDS)
+        if unknown_fields:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown_fields))}")
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    query = ScanResult.query.filter(ScanResult.scan_session_id == scan_id)
+    status = request.args.get('status', '').strip().lower()
+    if status and status != 'all':
+        query = query.filter(ScanResult.status_code == status)
+    if ssh_status is not None:
+        query = query.filter(ScanResult.ssh_status == ssh_status)
+    if sudo_status is not None:
+        query = query.filter(ScanResult.sudo_status == sudo_status)
+    ip_prefix = request.args.get('ip', '').strip()
+    if ip_prefix:
+        escaped = ip_prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        query = query.filter(ScanResult.ip_address.like(f"{escaped}%", escape='\\'))
+
+    total = query.count() if after is None else None
+
+    # Detail columns that were not asked for are never read from the database
+    page_query = query.options(*[
+        defer(getattr(ScanResult, field)) for field in ScanResult.DETAIL_FIELDS if field not in fields
+    ])
+    if after is not None:
+        page_query = page_query.filter(tuple_(ScanResult.ip_int, ScanResult.id) > after)
+    results = page_query.order_by(ScanResult.ip_int, ScanResult.id).limit(limit + 1).all()
+
+    has_more = len(results) > limit
+    results = results[:limit]
+
+    payload = {
+        "scan_id": scan_id,
+        "results": [result.to_dict(fields=fields) for result in results],
+        "next_cursor": encode_result_cursor(results[-1]) if has_more else None,
+    }
+    if total is not None:
+        payload["total"] = total
+    return jsonify(payload)
+
+@app.route('/scan_result/<int:result_id>')
+@login_required
+def scan_result_detail(result_id):
+    """A single result including its command output and server info"""
+    from models import ScanResult
+
+    result = ScanResult.query.get_or_404(result_id)
+    return jsonify(result.to_dict())
+
 @app.route('/scan_results/<int:scan_id>/export/<format>')
 @login_required
 def export_results(scan_id, format):
-    """Export scan results in various formats (CSV, JSON, PDF)"""
+    """Export scan results in various formats (CSV, JSON, NDJSON, PDF)
+
+    A file exported by a background job since the scan last changed is sent
+    from the export cache. Otherwise CSV, JSON and NDJSON are streamed
+    (`?compress=gzip` gzips them on the fly) and PDF starts a background job
+    (202 with the job status, see /export_jobs/<job_id>).
+    """
     from datetime import datetime
-    import csv
-    import json
-    from io import StringIO, BytesIO
-    import pandas as pd
-    import matplotlib.pyplot as plt
-    from flask import Response, make_response
-    from models import ScanResult, ScanSession
+    from flask import Response, send_file, stream_with_context
+    from models import ScanSession
+    import result_export
+    import export_jobs
     
-    try:
-        # Get scan session and results
-        scan_session = ScanSession.query.get_or_404(scan_id)
-        results = ScanResult.query.filter_by(scan_session_id=scan_id).all()
-        
-        # Generate timestamp for filename
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"subnet_whisperer_results_{scan_id}_{timestamp}"
-        
-        # Calculate summary statistics
-        total = len(results)
-        success_count = sum(1 for r in results if r.status_code == 'success')
-        failed_count = total - success_count
-        success_rate = (success_count / total * 100) if total > 0 else 0
+    export_format = format.lower()
+    scan_session = ScanSession.query.get_or_404(scan_id)
+    
+    # Generate timestamp for filename
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    filename = f"subnet_whisperer_results_{scan_id}_{timestamp}"
+    
+    compress = request.args.get('compress', '').lower()
+    if compress not in ('', 'gzip'):
+        return jsonify({'error': 'Unsupported compression'}), 400
+    
+    if export_format in export_jobs.JOB_FORMATS:
+        # A file exported since the scan last changed is sent as it is
+        manager = export_jobs.get_export_job_manager()
+        cached_path = manager.cached_path(scan_session, export_format, compress == 'gzip')
+        if cached_path:
+            return send_file(cached_path, mimetype=export_jobs.artifact_mimetype(export_format, compress == 'gzip'),
+                             as_attachment=True, download_name=f"{filename}.{os.path.basename(cached_path).split('.', 1)[1]}")
+    
+    if export_format == 'pdf':
+        # Rendering is left to a background job; poll its status and download it from there
+        job = manager.submit(scan_session, export_format)
+        return jsonify(export_job_payload(job)), 202
+    
+    if export_format in result_export.EXPORT_FORMATS:
+        mimetype, extension = result_export.EXPORT_FORMATS[export_format]
+        chunks = result_export.export_chunks(scan_session, export_format)
+        if compress == 'gzip':
+            chunks = result_export.gzip_chunks(chunks)
+            mimetype, extension = 'application/gzip', f"{extension}.gz"
         
-        # Format based on requested format
-        if format.lower() == 'csv':
-            # Create CSV
-            output = StringIO()
-            csv_writer = csv.writer(output)
-            
-            # Write header
-            csv_writer.writerow(['IP Address', 'Status', 'SSH Status', 'Sudo Status', 'Command Status', 
-                                'Execution Time (s)', 'Error Message', 'Created At'])
-            
-            # Write data rows
-            for result in results:
-                csv_writer.writerow([
-                    result.ip_address,
-                    result.status_code,
-                    'Yes' if result.ssh_status else 'No',
-                    'Yes' if result.sudo_status else 'No',
-                    'Yes' if result.command_status else 'No',
-                    result.execution_time,
-                    result.error_message,
-                    result.created_at.strftime('%Y-%m-%d %H:%M:%S')
-                ])
-            
-            # Create response
-            response = make_response(output.getvalue())
-            response.headers["Content-Disposition"] = f"attachment; filename={filename}.csv"
-            response.headers["Content-type"] = "text/csv"
-            return response
-            
-        elif format.lower() == 'json':
-            # Create JSON
-            export_data = {
-                'scan_id': scan_id,
-                'username': scan_session.username,
-                'auth_type': scan_session.auth_type,
-                'status': scan_session.status,
-                'started_at': scan_session.started_at.strftime('%Y-%m-%d %H:%M:%S') if scan_session.started_at else None,
-                'completed_at': scan_session.completed_at.strftime('%Y-%m-%d %H:%M:%S') if scan_session.completed_at else None,
-                'summary': {
-                    'total': total,
-                    'success': success_count,
-                    'failed': failed_count,
-                    'success_rate': success_rate
-                },
-                'results': []
-            }
-            
-            # Add result details
-            for result in results:
-                export_data['results'].append({
-                    'ip_address': result.ip_address,
-                    'status_code': result.status_code,
-                    'ssh_status': result.ssh_status,
-                    'sudo_status': result.sudo_status,
-                    'command_status': result.command_status,
-                    'command_output': result.command_output,
-                    'server_info': result.server_info,
-                    'error_message': result.error_message,
-                    'execution_time': result.execution_time,
-                    'created_at': result.created_at.strftime('%Y-%m-%d %H:%M:%S')
-                })
-            
-            # Create response
-            response = make_response(json.dumps(export_data, indent=2))
-            response.headers["Content-Disposition"] = f"attachment; filename={filename}.json"
-            response.headers["Content-type"] = "application/json"
-            return response
-            
-        elif format.lower() == 'pdf':
-            # Create PDF report using matplotlib and pandas
-            import matplotlib
-            matplotlib.use('Agg')
-            buffer = BytesIO()
-
-            # Create a pandas dataframe for the results table
-            data = {
-                'IP Address': [r.ip_address for r in results],
-                'Status': [r.status_code for r in results],
-                'SSH Status': ['Yes' if r.ssh_status else 'No' for r in results],
-                'Command Status': ['Yes' if r.command_status else 'No' for r in results],
-                'Execution Time (s)': [r.execution_time for r in results],
-            }
-            df = pd.DataFrame(data)
-            
-            # Create a summary figure
-            plt.figure(figsize=(11, 8))
-            
-            # Add a title with scan information
-            plt.suptitle(f'Subnet Whisperer Scan Results (ID: {scan_id})', fontsize=16)
-            plt.figtext(0.1, 0.92, f'Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}')
-            plt.figtext(0.1, 0.90, f'Username: {scan_session.username}')
-            plt.figtext(0.1, 0.88, f'Authentication: {scan_session.auth_type}')
-            plt.figtext(0.1, 0.86, f'Started: {scan_session.started_at.strftime("%Y-%m-%d %H:%M:%S") if scan_session.started_at else "N/A"}')
-            plt.figtext(0.1, 0.84, f'Completed: {scan_session.completed_at.strftime("%Y-%m-%d %H:%M:%S") if scan_session.completed_at else "N/A"}')
-            
-            # Add success/fail chart
-            plt.subplot(2, 2, 1)
-            plt.pie([success_count, failed_count], labels=['Success', 'Failed'], 
-                    autopct='%1.1f%%', colors=['#28a745', '#dc3545'])
-            plt.title('Scan Results')
-            
-            # Add status codes breakdown if we have successful results
-            status_categories = {}
-            for r in results:
-                if r.status_code not in status_categories:
-                    status_categories[r.status_code] = 0
-                status_categories[r.status_code] += 1
-            
-            plt.subplot(2, 2, 2)
-            if status_categories:
-                plt.bar(status_categories.keys(), status_categories.values())
-                plt.title('Status Breakdown')
-                plt.xticks(rotation=45)
-            
-            # Add results table
-            plt.subplot(2, 1, 2)
-            plt.axis('off')
-            if not df.empty:
-                table = plt.table(
-                    cellText=df.values[:20],  # Show only first 20 rows
-                    colLabels=df.columns,
-                    loc='center',
-                    cellLoc='center',
-                )
-                table.auto_set_font_size(False)
-                table.set_fontsize(8)
-                table.scale(1, 1.5)
-                plt.title('Scan Results (First 20 rows)')
-                
-                if len(df) > 20:
-                    plt.figtext(0.5, 0.25, f'... and {len(df) - 20} more results', 
-                             ha='center', fontsize=8, style='italic')
-            
-            # Save figure to buffer
-            plt.tight_layout(rect=[0, 0, 1, 0.8])
-            plt.savefig(buffer, format='pdf')
-            plt.close()
-            buffer.seek(0)
-
-            # Create response
-            response = make_response(buffer.getvalue())
-            response.headers["Content-Disposition"] = f"attachment; filename={filename}.pdf"
-            response.headers["Content-type"] = "application/pdf"
-            return response
-            
-        else:
-            return jsonify({'error': 'Unsupported export format'}), 400
-            
-    except Exception as e:
-        return jsonify({'error': f'Export failed: {str(e)}'}), 500
+        return Response(stream_with_context(chunks), mimetype=mimetype, headers={
+            'Content-Disposition': f"attachment; filename={filename}.{extension}",
+            'X-Accel-Buffering': 'no',
+        })
+    
+    return jsonify({'error': 'Unsupported export format'}), 400
+
+def export_job_payload(job):
+    """Job status plus the URLs to poll it and to download its file"""
+    payload = job.to_dict()
+    payload['status_url'] = url_for('export_job_status', job_id=job.id)
+    payload['download_url'] = url_for('download_export_job', job_id=job.id) if job.status == 'completed' else None
+    return payload
+
+@app.route('/scan_results/<int:scan_id>/export_jobs', methods=['POST'])
+@login_required
+def create_export_job(scan_id):
+    """Start exporting a scan in the background (or reuse an up-to-date export)"""
+    from models import ScanSession
+    import export_jobs
+    
+    scan_session = ScanSession.query.get_or_404(scan_id)
+    data = request.get_json(silent=True) or request.form
+    export_format = str(data.get('format', '')).lower()
+    compress = str(data.get('compress', '')).lower()
+    if export_format not in export_jobs.JOB_FORMATS:
+        return jsonify({'error': 'Unsupported export format'}), 400
+    if compress not in ('', 'gzip'):
+        return jsonify({'error': 'Unsupported compression'}), 400
+    
+    job = export_jobs.get_export_job_manager().submit(scan_session, export_format, compress == 'gzip')
+    return jsonify(export_job_payload(job)), 202
+
+@app.route('/export_jobs/<job_id>')
+@login_required
+def export_job_status(job_id):
+    import export_jobs
+    
+    job = export_jobs.get_export_job_manager().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Export job not found'}), 404
+    return jsonify(export_job_payload(job))
+
+@app.route('/export_jobs/<job_id>/download')
+@login_required
+def download_export_job(job_id):
+    from datetime import datetime
+    from flask import send_file
+    import export_jobs
+    
+    job = export_jobs.get_export_job_manager().get(job_id)
+    if job is None or job.status != 'completed' or not os.path.exists(job.path):
+        return jsonify({'error': 'Export is not available'}), 404
+    
+    timestamp = datetime.fromtimestamp(job.finished_at or job.created_at).strftime('%Y%m%d_%H%M%S')
+    extension = job.filename.split('.', 1)[1]
+    return send_file(job.path, mimetype=job.mimetype, as_attachment=True,
+                     download_name=f"subnet_whisperer_results_{job.scan_session_id}_{timestamp}.{extension}")
 
 @app.route('/templates', methods=['GET', 'POST'])
 @login_required
@@ -639,7 +876,8 @@ def templates():
         template = CommandTemplate(
             name=form.name.data,
             description=form.description.data,
-            commands=form.commands.data
+            commands=form.commands.data,
+            command_parallelism=form.command_parallelism.data or 1
         )
         db.session.add(template)
         db.session.commit()
@@ -937,13 +1175,14 @@ def add_credential():
 @login_required
 def edit_credential():
     from forms import CredentialSetForm
-    from models import CredentialSet
+    from models import CredentialSet, CredentialHostStat
     from encryption_utils import encrypt_data
     
     form = CredentialSetForm()
     
     if form.validate_on_submit():
         credential_set = CredentialSet.query.get_or_404(form.id.data)
+        previous_username = credential_set.username
         
         # Update basic info
         credential_set.username = form.username.data
@@ -963,6 +1202,10 @@ def edit_credential():
         if form.sudo_password.data:
             credential_set.sudo_password_encrypted = encrypt_data(form.sudo_password.data)
         
+        # Changed secrets invalidate what we learned about where they work
+        if form.password.data or form.private_key.data or credential_set.username != previous_username:
+            CredentialHostStat.query.filter_by(credential_set_id=credential_set.id).delete()
+        
         db.session.commit()
         flash('Credential set updated successfully!', 'success')
     else:
@@ -973,11 +1216,12 @@ def edit_credential():
 @app.route('/delete_credential', methods=['POST'])
 @login_required
 def delete_credential():
-    from models import CredentialSet
+    from models import CredentialSet, CredentialHostStat
     
     credential_id = request.form.get('credential_id')
     credential_set = CredentialSet.query.get_or_404(credential_id)
     
+    CredentialHostStat.query.filter_by(credential_set_id=credential_set.id).delete()
     db.session.delete(credential_set)
     db.session.commit()
     
@@ -0,0 +1,106 @@
+"""
+Measure the cost of falling back through several credential sets per host.
+
+Every stand-in host only accepts the last of --credentials credential sets, so
+each scan has to reject all the others first. The scan runs once with
+SSH_TRANSPORT_REUSE disabled (a new TCP connection and key exchange for every
+attempt) and once enabled (further attempts on the already negotiated
+transport, reconnecting only when the stand-in drops the connection after
+--max-auth-tries failures, like sshd's MaxAuthTries).
+
+    python benchmarks/bench_credential_fallback.py --hosts 20 --credentials 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from sshd_standin import SSHStandin, StandinStats, loopback_addresses
+from bench_scan_engine import setup_app
+
+
+def make_credentials(count):
+    from encryption_utils import encrypt_data
+    credentials = []
+    for index in range(count):
+        password = "benchpass" if index == count - 1 else f"wrong-{index}"
+        credentials.append(SimpleNamespace(
+            id=index + 1, username="bench", auth_type="password", priority=count - index,
+            password_encrypted=encrypt_data(password), private_key_encrypted=None,
+            sudo_password_encrypted=None,
+        ))
+    return credentials
+
+
+def run_scan(app_module, targets, port, credentials, concurrency):
+    import ssh_utils
+    from models import ScanSession, ScanResult
+
+    with app_module.app.app_context():
+        scan_session = ScanSession(username="bench", auth_type="password", total_ips=len(targets))
+        app_module.db.session.add(scan_session)
+        app_module.db.session.commit()
+        scan_session_id = scan_session.id
+
+    start = time.perf_counter()
+    ssh_utils.start_scan_session(
+        scan_session_id=scan_session_id,
+        ip_addresses=targets,
+        username="bench",
+        commands=["echo ok"],
+        credential_sets=credentials,
+        concurrency=concurrency,
+        port=port,
+    ).join()
+    elapsed = time.perf_counter() - start
+
+    with app_module.app.app_context():
+        success = ScanResult.query.filter_by(scan_session_id=scan_session_id, status_code="success").count()
+    return elapsed, success
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hosts", type=int, default=20, help="number of stand-in hosts")
+    parser.add_argument("--credentials", type=int, default=8, help="credential sets per scan (last one works)")
+    parser.add_argument("--max-auth-tries", type=int, default=6, help="failed logins before the stand-in disconnects")
+    parser.add_argument("--port", type=int, default=2298)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    db_file.close()
+    # Keep the ordering fixed: the credential cache would learn the working set
+    os.environ["CREDENTIAL_CACHE"] = "disabled"
+    app_module = setup_app(db_file.name)
+    credentials = make_credentials(args.credentials)
+
+    targets = loopback_addresses(args.hosts, third_octet=30)
+    stats = StandinStats()
+    standin = SSHStandin(targets, args.port, users={"bench": "benchpass"}, stats=stats,
+                         max_auth_tries=args.max_auth_tries).start()
+
+    try:
+        print(f"{args.hosts} hosts, {args.credentials} credential sets (last one valid), "
+              f"MaxAuthTries {args.max_auth_tries}")
+        for mode in ("disabled", "enabled"):
+            os.environ["SSH_TRANSPORT_REUSE"] = mode
+            connections, attempts = stats.connections, stats.auth_attempts
+            elapsed, success = run_scan(app_module, targets, args.port, credentials, args.concurrency)
+            label = "reuse transport" if mode == "enabled" else "reconnect per try"
+            print(f"{label:>18}: {elapsed:7.2f}s  {stats.connections - connections:5d} connections  "
+                  f"{stats.auth_attempts - attempts:5d} auth attempts  ({success}/{len(targets)} success)")
+    finally:
+        standin.stop()
+        os.unlink(db_file.name)
+
+
+if __name__ == "__main__":
+    main()
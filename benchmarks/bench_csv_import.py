@@ -0,0 +1,97 @@
+"""
+Measure time and memory of importing a large CSV inventory of targets.
+
+Writes a CMDB-style CSV file (hostname, owner, IP address and a few other
+columns; a share of the rows scattered addresses and some invalid), then
+imports it with import_csv_targets straight from the file, as the
+/import_targets route does, and reports the time and tracemalloc peak.
+--legacy also runs the previous approach for comparison: the whole file in a
+pandas DataFrame, the column joined into one string and parsed again.
+
+    python benchmarks/bench_csv_import.py --rows 500000 --legacy
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def write_inventory(path, rows, scattered):
+    random.seed(0)
+    with open(path, "w", newline="") as output:
+        output.write("hostname,owner,environment,ip_address,os,notes\n")
+        for index in range(rows):
+            if index % 1000 == 999:
+                address = "n/a"
+            elif random.random() < scattered:
+                address = f"172.{random.randint(16, 31)}.{random.randint(0, 255)}.{random.randint(1, 254)}"
+            else:
+                address = f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}"
+            output.write(f"host-{index:07d},team-{index % 40},prod,{address},linux,\"rack {index % 90}, row 3\"\n")
+
+
+def streaming_import(path):
+    from subnet_utils import import_csv_targets
+
+    with open(path, "rb") as upload:
+        text = io.TextIOWrapper(upload, encoding="utf-8-sig", errors="replace", newline="")
+        result = import_csv_targets(text)
+    return len(result.targets), result.error_count
+
+
+def legacy_import(path):
+    import pandas as pd
+    from subnet_utils import parse_subnet_input
+
+    with open(path) as upload:
+        csv_content = upload.read()
+    df = pd.read_csv(io.StringIO(csv_content))
+    # Missing values come back as NaN floats
+    addresses = parse_subnet_input('\n'.join(map(str, df["ip_address"].tolist())))
+    return len(addresses), None
+
+
+def measure(label, function, path):
+    start = time.perf_counter()
+    count, errors = function(path)
+    elapsed = time.perf_counter() - start
+    # Separate run for memory: tracing slows the import down several times
+    tracemalloc.start()
+    function(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    errors = "" if errors is None else f" ({errors} invalid)"
+    print(f"{label:>9}: {elapsed:6.2f} s  {count:>8} addresses{errors}  peak {peak / 1024 / 1024:8.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500000, help="rows in the generated inventory")
+    parser.add_argument("--scattered", type=float, default=0.1, help="share of rows with a random address")
+    parser.add_argument("--legacy", action="store_true", help="also run the pandas-based import (needs pandas)")
+    args = parser.parse_args()
+
+    import logging
+    import subnet_utils  # noqa: F401 - keep module import cost out of the measurements
+    logging.disable(logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "inventory.csv")
+        write_inventory(path, args.rows, args.scattered)
+        print(f"inventory: {args.rows} rows, {os.path.getsize(path) / 1024 / 1024:.1f} MiB")
+        measure("streaming", streaming_import, path)
+        if args.legacy:
+            import pandas  # noqa: F401
+            measure("legacy", legacy_import, path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Measure time and peak memory of the PDF report for large scan sessions.
+
+Fills a temporary SQLite database with scan sessions of the given sizes, then
+renders each report in a fresh subprocess so every run reports its own peak
+RSS. The multi-page report lists every host and its peak stays flat as the
+session grows; --legacy also runs the previous single-page renderer (pandas
+DataFrame of all results, pyplot, first 20 rows only) for comparison.
+
+    python benchmarks/bench_pdf_report.py --hosts 5000,50000 --legacy
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def setup_app(db_path):
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("SESSION_SECRET", "benchmark-session-secret")
+    os.environ.setdefault("ENCRYPTION_KEY", "MDAwMDAwMDAwMDAwMDAwMDAwMDAwMDAwMDAwMDAwMDA=")
+    os.environ["START_SCHEDULER"] = "false"
+    import logging
+    import warnings
+    import app as app_module
+    logging.disable(logging.CRITICAL)
+    warnings.filterwarnings("ignore")
+    return app_module
+
+
+def create_session(app_module, hosts):
+    from sqlalchemy import insert
+    from models import ScanSession, ScanResult
+
+    with app_module.app.app_context():
+        scan_session = ScanSession(username="bench", auth_type="password", status="completed",
+                                   total_ips=hosts, completed_count=hosts)
+        app_module.db.session.add(scan_session)
+        app_module.db.session.commit()
+        rows = []
+        for index in range(hosts):
+            failed = index % 7 == 0
+            rows.append({
+                "scan_session_id": scan_session.id,
+                "ip_address": f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}",
+                "status_code": "failed" if failed else "success",
+                "ssh_status": not failed,
+                "sudo_status": not failed and index % 3 == 0,
+                "command_status": not failed,
+                "command_output": "Linux bench 6.1.0 x86_64\n" * 20,
+                "error_message": "Authentication failed for user bench" if failed else None,
+                "execution_time": (index % 400) / 100,
+            })
+            if len(rows) == 5000:
+                app_module.db.session.execute(insert(ScanResult), rows)
+                rows = []
+        if rows:
+            app_module.db.session.execute(insert(ScanResult), rows)
+        app_module.db.session.commit()
+        return scan_session.id
+
+
+def legacy_write_pdf_report(scan_session, fileobj):
+    """The report as it was rendered before write_pdf_report: one page, first 20 rows"""
+    import pandas as pd
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from models import ScanResult
+
+    results = ScanResult.query.filter_by(scan_session_id=scan_session.id).all()
+    total = len(results)
+    success_count = sum(1 for r in results if r.status_code == 'success')
+    df = pd.DataFrame({
+        'IP Address': [r.ip_address for r in results],
+        'Status': [r.status_code for r in results],
+        'SSH Status': ['Yes' if r.ssh_status else 'No' for r in results],
+        'Command Status': ['Yes' if r.command_status else 'No' for r in results],
+        'Execution Time (s)': [r.execution_time for r in results],
+    })
+
+    plt.figure(figsize=(11, 8))
+    plt.suptitle(f'Subnet Whisperer Scan Results (ID: {scan_session.id})', fontsize=16)
+    plt.figtext(0.1, 0.92, f'Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}')
+    plt.subplot(2, 2, 1)
+    plt.pie([success_count, total - success_count], labels=['Success', 'Failed'],
+            autopct='%1.1f%%', colors=['#28a745', '#dc3545'])
+    status_categories = {}
+    for r in results:
+        status_categories[r.status_code] = status_categories.get(r.status_code, 0) + 1
+    plt.subplot(2, 2, 2)
+    plt.bar(status_categories.keys(), status_categories.values())
+    plt.subplot(2, 1, 2)
+    plt.axis('off')
+    table = plt.table(cellText=df.values[:20], colLabels=df.columns, loc='center', cellLoc='center')
+    table.auto_set_font_size(False)
+    table.set_fontsize(8)
+    plt.tight_layout(rect=[0, 0, 1, 0.8])
+    plt.savefig(fileobj, format='pdf')
+    plt.close()
+    return 1
+
+
+def render(db_path, scan_session_id, renderer):
+    """Subprocess side: render one report and print its measurements as JSON"""
+    app_module = setup_app(db_path)
+    import result_export
+    from models import ScanSession
+
+    write = legacy_write_pdf_report if renderer == "legacy" else result_export.write_pdf_report
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with app_module.app.app_context(), tempfile.TemporaryFile() as output:
+        scan_session = app_module.db.session.get(ScanSession, scan_session_id)
+        start = time.perf_counter()
+        pages = write(scan_session, output)
+        elapsed = time.perf_counter() - start
+        size = output.tell()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"seconds": elapsed, "pages": pages, "bytes": size,
+                      "baseline_kib": baseline, "peak_kib": peak}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hosts", default="5000,50000", help="comma-separated scan session sizes")
+    parser.add_argument("--legacy", action="store_true", help="also run the previous single-page renderer")
+    parser.add_argument("--render", nargs=3, metavar=("DB", "SCAN_ID", "RENDERER"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.render:
+        db_path, scan_session_id, renderer = args.render
+        render(db_path, int(scan_session_id), renderer)
+        return
+
+    sizes = [int(size) for size in args.hosts.split(",")]
+    renderers = ["paged", "legacy"] if args.legacy else ["paged"]
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, "bench.db")
+        app_module = setup_app(db_path)
+        for hosts in sizes:
+            scan_session_id = create_session(app_module, hosts)
+            for renderer in renderers:
+                process = subprocess.run(
+                    [sys.executable, __file__, "--render", db_path, str(scan_session_id), renderer],
+                    capture_output=True, text=True, check=True,
+                )
+                result = json.loads(process.stdout.strip().splitlines()[-1])
+                print(f"{hosts:>7} hosts  {renderer:>6}: {result['seconds']:7.2f} s  "
+                      f"{result['pages']:>5} pages  {result['bytes'] / 1024:9.1f} KiB  "
+                      f"peak RSS {result['peak_kib'] / 1024:7.1f} MiB "
+                      f"(+{(result['peak_kib'] - result['baseline_kib']) / 1024:6.1f} MiB while rendering)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Compare hosts/second of the thread-pool and asyncio scan engines.
+
+Live hosts are served by the local sshd stand-in; dead hosts are blackhole
+listeners that never complete the TCP handshake, so each one costs a full
+connect timeout.
+
+    python benchmarks/bench_scan_engine.py --live 20 --dead 200 --timeout 2
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from sshd_standin import SSHStandin, BlackholeListener, loopback_addresses
+
+
+def setup_app(db_path):
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("SESSION_SECRET", "benchmark-session-secret")
+    os.environ.setdefault("ENCRYPTION_KEY", "MDAwMDAwMDAwMDAwMDAwMDAwMDAwMDAwMDAwMDAwMDA=")
+    os.environ["START_SCHEDULER"] = "false"
+    import logging
+    import warnings
+    import app as app_module
+    logging.disable(logging.CRITICAL)
+    warnings.filterwarnings("ignore")
+    return app_module
+
+
+def run_engine(app_module, engine, targets, port, concurrency, connect_concurrency, discovery):
+    import ssh_utils
+    from models import ScanSession, ScanResult
+
+    with app_module.app.app_context():
+        scan_session = ScanSession(username="bench", auth_type="password", total_ips=len(targets))
+        app_module.db.session.add(scan_session)
+        app_module.db.session.commit()
+        scan_session_id = scan_session.id
+
+    start = time.perf_counter()
+    thread = ssh_utils.start_scan_session(
+        scan_session_id=scan_session_id,
+        ip_addresses=targets,
+        username="bench",
+        password="benchpass",
+        commands=["echo ok"],
+        concurrency=concurrency,
+        port=port,
+        engine=engine,
+        connect_concurrency=connect_concurrency,
+        discovery=discovery,
+    )
+    thread.join()
+    elapsed = time.perf_counter() - start
+
+    with app_module.app.app_context():
+        success = ScanResult.query.filter_by(scan_session_id=scan_session_id, status_code="success").count()
+        total = ScanResult.query.filter_by(scan_session_id=scan_session_id).count()
+    return elapsed, success, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--live", type=int, default=20, help="number of live stand-in hosts")
+    parser.add_argument("--dead", type=int, default=200, help="number of blackholed hosts")
+    parser.add_argument("--port", type=int, default=2299)
+    parser.add_argument("--timeout", type=float, default=2.0, help="per-host connect timeout (s)")
+    parser.add_argument("--concurrency", type=int, default=10, help="SSH worker threads")
+    parser.add_argument("--connect-concurrency", type=int, default=1000)
+    parser.add_argument("--engines", default="thread,asyncio")
+    parser.add_argument("--discovery", action="store_true", help="also run each engine with the port discovery pre-pass")
+    args = parser.parse_args()
+
+    db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    db_file.close()
+    app_module = setup_app(db_file.name)
+    import ssh_utils
+    ssh_utils.SSH_CONNECT_TIMEOUT = args.timeout
+
+    live = loopback_addresses(args.live, third_octet=10)
+    dead = loopback_addresses(args.dead, third_octet=20)
+    standin = SSHStandin(live, args.port, users={"bench": "benchpass"}).start()
+    blackholes = [BlackholeListener(address, args.port).start() for address in dead]
+    targets = sorted(live + dead)
+
+    try:
+        print(f"targets: {len(targets)} ({args.live} live, {args.dead} dead), "
+              f"connect timeout {args.timeout}s, {args.concurrency} SSH workers")
+        runs = [(engine, False) for engine in args.engines.split(",")]
+        if args.discovery:
+            runs += [(engine, True) for engine in args.engines.split(",")]
+        for engine, discovery in runs:
+            elapsed, success, total = run_engine(
+                app_module, engine, targets, args.port, args.concurrency, args.connect_concurrency, discovery
+            )
+            label = f"{engine}+discovery" if discovery else engine
+            print(f"{label:>18}: {elapsed:8.2f}s  {total / elapsed:9.1f} hosts/s  "
+                  f"({success} success / {total} results)")
+    finally:
+        standin.stop()
+        for blackhole in blackholes:
+            blackhole.stop()
+        os.unlink(db_file.name)
+
+
+if __name__ == "__main__":
+    main()
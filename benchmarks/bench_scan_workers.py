@@ -0,0 +1,131 @@
+"""
+Measure how scan throughput grows with the number of scan worker processes.
+
+Live hosts are served by the local sshd stand-in with a per-channel delay,
+so each host costs a round trip like on a remote network. For every worker
+count a scan is queued (see scan_queue) and that many `worker.py` processes
+are started with --exit-when-idle against a shared SQLite database; the time
+until the last one exits is reported. --in-process also runs the same scan
+in the benchmark process with start_scan_session, as the web app does
+without DISTRIBUTED_SCANS.
+
+    python benchmarks/bench_scan_workers.py --hosts 400 --workers 1,2,4 --in-process
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from sshd_standin import SSHStandin, loopback_addresses
+
+
+def setup_app(db_path):
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("SESSION_SECRET", "benchmark-session-secret")
+    os.environ.setdefault("ENCRYPTION_KEY", "MDAwMDAwMDAwMDAwMDAwMDAwMDAwMDAwMDAwMDAwMDA=")
+    os.environ["START_SCHEDULER"] = "false"
+    import logging
+    import warnings
+    import app as app_module
+    logging.disable(logging.CRITICAL)
+    warnings.filterwarnings("ignore")
+    return app_module
+
+
+def create_session(app_module, targets):
+    from models import ScanSession
+
+    with app_module.app.app_context():
+        scan_session = ScanSession(username="bench", auth_type="password", total_ips=len(targets))
+        app_module.db.session.add(scan_session)
+        app_module.db.session.commit()
+        return scan_session.id
+
+
+def count_results(app_module, scan_session_id):
+    from models import ScanSession
+
+    with app_module.app.app_context():
+        scan_session = app_module.db.session.get(ScanSession, scan_session_id)
+        return scan_session.status, scan_session.success_count, scan_session.completed_count
+
+
+def run_in_process(app_module, targets, port, concurrency):
+    import ssh_utils
+
+    scan_session_id = create_session(app_module, targets)
+    start = time.perf_counter()
+    ssh_utils.start_scan_session(
+        scan_session_id=scan_session_id, ip_addresses=targets, username="bench", password="benchpass",
+        commands=["echo ok"], concurrency=concurrency, port=port
+    ).join()
+    return time.perf_counter() - start, count_results(app_module, scan_session_id)
+
+
+def run_workers(app_module, targets, port, concurrency, workers, batch_size):
+    from scan_queue import enqueue_scan
+
+    scan_session_id = create_session(app_module, targets)
+    start = time.perf_counter()
+    enqueue_scan(scan_session_id, targets, "bench", password="benchpass", commands=["echo ok"],
+                 concurrency=concurrency, port=port, batch_size=batch_size)
+    processes = [
+        subprocess.Popen(
+            [sys.executable, str(PROJECT_ROOT / "worker.py"), "--exit-when-idle", "--poll-interval", "0.2",
+             "--worker-id", f"bench-{index}"],
+            cwd=PROJECT_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        for index in range(workers)
+    ]
+    for process in processes:
+        process.wait()
+    return time.perf_counter() - start, count_results(app_module, scan_session_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hosts", type=int, default=400, help="number of live stand-in hosts")
+    parser.add_argument("--port", type=int, default=2298)
+    parser.add_argument("--latency", type=float, default=0.5, help="stand-in delay per channel (s)")
+    parser.add_argument("--concurrency", type=int, default=10, help="hosts scanned at once per worker")
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker process counts")
+    parser.add_argument("--batch-size", type=int, default=100, help="addresses per queued batch")
+    parser.add_argument("--in-process", action="store_true", help="also run the scan inside this process")
+    args = parser.parse_args()
+
+    db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    db_file.close()
+    app_module = setup_app(db_file.name)
+
+    hosts = []
+    for third_octet in range(30, 30 + (args.hosts + 249) // 250):
+        hosts += loopback_addresses(min(args.hosts - len(hosts), 250), third_octet=third_octet)
+    standin = SSHStandin(hosts, args.port, users={"bench": "benchpass"}, channel_latency=args.latency).start()
+    try:
+        print(f"hosts: {args.hosts}, {args.latency}s per channel, {args.concurrency} hosts at once per worker, "
+              f"batches of {args.batch_size}")
+        runs = [("in-process", None)] if args.in_process else []
+        runs += [(f"{count} worker(s)", int(count)) for count in args.workers.split(",")]
+        for label, workers in runs:
+            if workers is None:
+                elapsed, (status, success, total) = run_in_process(app_module, hosts, args.port, args.concurrency)
+            else:
+                elapsed, (status, success, total) = run_workers(
+                    app_module, hosts, args.port, args.concurrency, workers, args.batch_size
+                )
+            print(f"{label:>12}: {elapsed:8.2f}s  {total / elapsed:8.1f} hosts/s  "
+                  f"({success} success / {total} results, {status})")
+    finally:
+        standin.stop()
+        os.unlink(db_file.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Compare per-command and batched server info collection over a slow link.
+
+The sshd stand-in delays every channel open by --latency seconds to emulate a
+round trip, so the per-command path pays one delay per probe while the batched
+path pays it once.
+
+    python benchmarks/bench_server_info.py --latency 0.05 --iterations 5
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import paramiko
+
+from sshd_standin import SSHStandin
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=2298)
+    parser.add_argument("--latency", type=float, default=0.05, help="delay per channel open (s)")
+    parser.add_argument("--iterations", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    os.environ.setdefault("ENCRYPTION_KEY", "MDAwMDAwMDAwMDAwMDAwMDAwMDAwMDAwMDAwMDAwMDA=")
+    os.environ["START_SCHEDULER"] = "false"
+    import logging
+    import warnings
+    logging.disable(logging.CRITICAL)
+    warnings.filterwarnings("ignore")
+    from ssh_utils import collect_server_info
+
+    standin = SSHStandin(["127.0.0.1"], args.port, users={"bench": "benchpass"},
+                         channel_latency=args.latency).start()
+    client = paramiko.SSHClient()
+    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    client.connect("127.0.0.1", port=args.port, username="bench", password="benchpass",
+                   look_for_keys=False, allow_agent=False)
+
+    try:
+        print(f"channel-open latency {args.latency * 1000:.0f} ms, {args.iterations} iterations")
+        for detailed in (False, True):
+            timings = {}
+            for batched in (False, True):
+                channels_before = standin.stats.channels
+                start = time.perf_counter()
+                for _ in range(args.iterations):
+                    info = collect_server_info(client, detailed=detailed, batched=batched)
+                elapsed = (time.perf_counter() - start) / args.iterations
+                channels = (standin.stats.channels - channels_before) / args.iterations
+                timings[batched] = elapsed
+                label = "batched" if batched else "per-command"
+                print(f"{'detailed' if detailed else 'basic':>8} {label:>12}: {elapsed * 1000:8.1f} ms/host  "
+                      f"{channels:4.0f} channels  {len(info)} keys")
+            print(f"{'':>8} {'speedup':>12}: {timings[False] / timings[True]:8.1f}x")
+    finally:
+        client.close()
+        standin.stop()
+
+
+if __name__ == "__main__":
+    main()
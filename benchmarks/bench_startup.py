@@ -0,0 +1,100 @@
+"""
+Measure the import time and memory of starting the application.
+
+Imports main.py (which imports app, runs its startup migrations and loads every
+module a gunicorn worker loads) in fresh interpreters against a temporary
+SQLite database. Reports the wall time of the import, peak RSS afterwards,
+whether pandas and matplotlib were loaded, and the import time spent per
+package according to `python -X importtime`. Neither should be loaded: the
+PDF report imports matplotlib when it renders, and CSV target files are parsed
+with the csv module.
+
+    python benchmarks/bench_startup.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+HEAVY_MODULES = ["pandas", "matplotlib", "matplotlib.pyplot", "numpy"]
+
+PROBE = """
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": elapsed,
+    "peak_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "loaded": [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+
+def probe_env(db_path):
+    env = dict(os.environ)
+    env["DATABASE_URL"] = f"sqlite:///{db_path}"
+    env.setdefault("SESSION_SECRET", "benchmark-session-secret")
+    env.setdefault("ENCRYPTION_KEY", "MDAwMDAwMDAwMDAwMDAwMDAwMDAwMDAwMDAwMDAwMDA=")
+    env["START_SCHEDULER"] = "false"
+    return env
+
+
+def run_probe(env, importtime=False):
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += ["-c", PROBE.format(root=str(PROJECT_ROOT), heavy=HEAVY_MODULES)]
+    process = subprocess.run(command, capture_output=True, text=True, env=env, cwd=PROJECT_ROOT, check=True)
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    return result, process.stderr
+
+
+def time_by_package(stderr, top):
+    """Sum the self times from -X importtime output per top-level package, slowest first"""
+    totals = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_time, _, name = line[len("import time:"):].split("|")
+        if not self_time.strip().isdigit():
+            continue  # column header
+        package = name.strip().split(".")[0]
+        totals[package] = totals.get(package, 0) + int(self_time)
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to time")
+    parser.add_argument("--top", type=int, default=10, help="packages to list")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = probe_env(os.path.join(directory, "bench.db"))
+        # The first start creates the database; only time starts against an existing one
+        run_probe(env)
+        results = [run_probe(env)[0] for _ in range(args.runs)]
+        _, stderr = run_probe(env, importtime=True)
+
+    times = [result["seconds"] for result in results]
+    peaks = [result["peak_kib"] / 1024 for result in results]
+    print(f"import main: median {statistics.median(times) * 1000:7.1f} ms  "
+          f"min {min(times) * 1000:7.1f} ms  over {args.runs} runs")
+    print(f"peak RSS:    median {statistics.median(peaks):7.1f} MiB")
+    print(f"heavy modules loaded: {', '.join(results[-1]['loaded']) or 'none'}")
+    print("import time by package:")
+    for package, microseconds in time_by_package(stderr, args.top):
+        print(f"  {microseconds / 1000:8.1f} ms  {package}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+CPU cost of waiting on many slow sudo commands.
+
+Starts --commands concurrent `sudo sleep` commands (pty + password on stdin,
+like execute_ssh_commands) on a local sshd stand-in and reads them either with
+the old busy-wait loop (recv_ready()/exit_status_ready() polling, 1 KB reads,
+string concatenation) or with channel_io.read_channel. Reports process CPU
+time over the run; the stand-in's sleeping commands cost next to nothing, so
+the difference is the readers.
+
+    python benchmarks/bench_sudo_reader.py --commands 200 --duration 3
+"""
+import argparse
+import resource
+import sys
+import threading
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import paramiko
+
+from sshd_standin import SSHStandin
+from channel_io import read_channel
+
+SUDO_PASSWORD = "benchpass"
+
+
+def busy_wait_reader(channel):
+    """The sudo read loop execute_ssh_commands used before channel_io"""
+    stdout_data = ''
+    stderr_data = ''
+    while not channel.exit_status_ready():
+        if channel.recv_ready():
+            stdout_data += channel.recv(1024).decode('utf-8', errors='replace')
+        if channel.recv_stderr_ready():
+            stderr_data += channel.recv_stderr(1024).decode('utf-8', errors='replace')
+    return channel.recv_exit_status()
+
+
+def event_reader(channel):
+    return read_channel(channel, timeout=60).exit_status
+
+
+def run_sudo(client, command, reader, statuses):
+    channel = client.get_transport().open_session()
+    channel.get_pty()
+    channel.exec_command(command)
+    channel.sendall((SUDO_PASSWORD + '\n').encode())
+    statuses.append(reader(channel))
+    channel.close()
+
+
+def measure(clients, commands, duration, reader):
+    statuses = []
+    threads = [
+        threading.Thread(target=run_sudo, args=(
+            clients[index % len(clients)], f"sudo -S -p '' sleep {duration}", reader, statuses
+        ))
+        for index in range(commands)
+    ]
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    cpu_start = usage.ru_utime + usage.ru_stime
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = usage.ru_utime + usage.ru_stime - cpu_start
+    return elapsed, cpu, statuses.count(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--commands", type=int, default=200, help="concurrent sudo commands")
+    parser.add_argument("--connections", type=int, default=20, help="SSH connections the commands are spread over")
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds each command sleeps")
+    parser.add_argument("--port", type=int, default=2297)
+    args = parser.parse_args()
+
+    standin = SSHStandin(["127.0.0.1"], args.port, users={"bench": SUDO_PASSWORD}).start()
+    clients = []
+    try:
+        for _ in range(args.connections):
+            client = paramiko.SSHClient()
+            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            client.connect("127.0.0.1", port=args.port, username="bench", password=SUDO_PASSWORD,
+                           allow_agent=False, look_for_keys=False)
+            clients.append(client)
+
+        print(f"{args.commands} concurrent `sudo sleep {args.duration:g}` over {args.connections} connections")
+        for label, reader in (("busy-wait loop", busy_wait_reader), ("read_channel", event_reader)):
+            elapsed, cpu, ok = measure(clients, args.commands, args.duration, reader)
+            print(f"{label:>15}: {elapsed:6.2f}s wall  {cpu:7.2f}s CPU  "
+                  f"({cpu / elapsed:4.2f} cores)  {ok}/{args.commands} exit 0")
+    finally:
+        for client in clients:
+            client.close()
+        standin.stop()
+
+
+if __name__ == "__main__":
+    main()
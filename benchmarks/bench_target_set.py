@@ -0,0 +1,74 @@
+"""
+Measure memory and speed of TargetSet for large scan inputs.
+
+Parses /8-, /12- and /16-sized inputs with exclusions, runs membership lookups
+and partially iterates each set, reporting the tracemalloc peak. The peak stays
+flat as the input grows because addresses are generated on demand from merged
+integer intervals. For comparison, --materialise also builds the old-style list.
+
+    python benchmarks/bench_target_set.py --lookups 100000
+"""
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from itertools import islice
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+INPUTS = [
+    ("/16", "10.1.0.0/16 except 10.1.200.0/24"),
+    ("/12", "172.16.0.0/12 except 172.20.0.0/16 and 172.31.255.0/24"),
+    ("/8", "10.0.0.0/8 except 10.20.0.0/16 and 10.99.1.0/24\n!10.0.0.0/24"),
+]
+
+
+def measure(label, text, lookups, iterate, materialise):
+    from subnet_utils import parse_target_set
+
+    probes = [random.randint(0, 2 ** 32 - 1) for _ in range(lookups)]
+    tracemalloc.start()
+    start = time.perf_counter()
+    targets = parse_target_set(text)
+    parse_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    hits = sum(1 for value in probes if value in targets)
+    lookup_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in islice(targets, iterate):
+        pass
+    iterate_time = time.perf_counter() - start
+
+    if materialise:
+        addresses = list(targets)
+        del addresses
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{label:>4}: {len(targets):>10} hosts in {len(targets.intervals)} intervals  "
+          f"parse {parse_time * 1000:7.2f} ms  "
+          f"{lookups / lookup_time:>10.0f} lookups/s ({hits} hits)  "
+          f"iterate {iterate / iterate_time:>9.0f} addr/s  "
+          f"peak {peak / 1024:10.1f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lookups", type=int, default=100000, help="random membership lookups per input")
+    parser.add_argument("--iterate", type=int, default=100000, help="addresses consumed from each set")
+    parser.add_argument("--materialise", action="store_true", help="also build a full address list (slow for /8)")
+    args = parser.parse_args()
+
+    import subnet_utils  # noqa: F401 - keep module import cost out of the measurements
+    random.seed(0)
+    for label, text in INPUTS:
+        measure(label, text, args.lookups, args.iterate, args.materialise)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Local sshd stand-in used by the benchmarks.
+
+Serves password and public-key logins with paramiko on loopback addresses and
+runs exec requests through /bin/sh. A per-channel delay can be configured to
+emulate high-latency links, and like sshd's MaxAuthTries a connection can be
+dropped after a number of failed logins. Blackhole listeners emulate dead hosts
+by never completing the TCP handshake.
+"""
+import shlex
+import socket
+import struct
+import subprocess
+import threading
+import time
+import logging
+
+import paramiko
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+_HOST_KEY = None
+_HOST_KEY_LOCK = threading.Lock()
+
+
+def get_host_key():
+    """Generate (once) the RSA host key shared by all stand-in servers"""
+    global _HOST_KEY
+    with _HOST_KEY_LOCK:
+        if _HOST_KEY is None:
+            _HOST_KEY = paramiko.RSAKey.generate(2048)
+        return _HOST_KEY
+
+
+class StandinStats:
+    """Counters shared by all stand-in servers of one benchmark run"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.auth_attempts = 0
+        self.channels = 0
+
+    def incr(self, name, amount=1):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+
+class _StandinTransport(paramiko.Transport):
+    """Transport that starts exec workers only after the request's reply is sent
+
+    sshd answers an exec request before running the command; starting the
+    worker from the request handler instead lets a fast command close its
+    channel before the client has seen the reply, which paramiko reports as
+    "Channel closed".
+    """
+    def __init__(self, sock):
+        super().__init__(sock)
+        self.pending_workers = {}
+
+    def _send_user_message(self, data):
+        super()._send_user_message(data)
+        raw = data.asbytes() if isinstance(data, paramiko.Message) else bytes(data)
+        if raw[:1] in (paramiko.common.cMSG_CHANNEL_SUCCESS, paramiko.common.cMSG_CHANNEL_FAILURE):
+            worker = self.pending_workers.pop(struct.unpack('>I', raw[1:5])[0], None)
+            if worker is not None and raw[:1] == paramiko.common.cMSG_CHANNEL_SUCCESS:
+                worker.start()
+
+
+class _StandinServer(paramiko.ServerInterface):
+    def __init__(self, standin, transport=None):
+        self.standin = standin
+        self.transport = transport
+        self.pty_channels = set()
+        self.auth_failures = 0
+
+    def get_allowed_auths(self, username):
+        return 'password,publickey'
+
+    def _auth_result(self, success):
+        max_tries = self.standin.max_auth_tries
+        if max_tries and self.auth_failures >= max_tries and self.transport is not None:
+            # Like sshd's MaxAuthTries: no further attempts on this connection
+            self.transport.close()
+            return paramiko.AUTH_FAILED
+        self.standin.stats.incr('auth_attempts')
+        if success:
+            return paramiko.AUTH_SUCCESSFUL
+        self.auth_failures += 1
+        return paramiko.AUTH_FAILED
+
+    def check_auth_password(self, username, password):
+        return self._auth_result(self.standin.users.get(username) == password)
+
+    def check_auth_publickey(self, username, key):
+        authorized = self.standin.authorized_keys.get(username)
+        return self._auth_result(authorized is not None and authorized == key)
+
+    def check_channel_request(self, kind, chanid):
+        if kind != 'session':
+            return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+        self.standin.stats.incr('channels')
+        if self.standin.channel_latency:
+            time.sleep(self.standin.channel_latency)
+        return paramiko.OPEN_SUCCEEDED
+
+    def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+        self.pty_channels.add(channel.get_id())
+        return True
+
+    def check_channel_exec_request(self, channel, command):
+        command = command.decode('utf-8', errors='replace') if isinstance(command, bytes) else command
+        worker = threading.Thread(
+            target=self.standin.run_command,
+            args=(channel, command, channel.get_id() in self.pty_channels)
+        )
+        worker.daemon = True
+        if isinstance(self.transport, _StandinTransport):
+            self.transport.pending_workers[channel.remote_chanid] = worker
+        else:
+            worker.start()
+        return True
+
+
+class SSHStandin:
+    """A paramiko-based SSH server listening on one or more loopback addresses"""
+    def __init__(self, addresses, port, users=None, authorized_keys=None,
+                 channel_latency=0.0, stats=None, max_auth_tries=0):
+        self.addresses = list(addresses)
+        self.port = port
+        self.users = users or {}
+        self.authorized_keys = authorized_keys or {}
+        self.channel_latency = channel_latency
+        self.stats = stats or StandinStats()
+        # Failed logins after which a connection is dropped (0: unlimited)
+        self.max_auth_tries = max_auth_tries
+        self._listeners = []
+        self._stop = threading.Event()
+
+    def start(self):
+        host_key = get_host_key()
+        for address in self.addresses:
+            listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            listener.bind((address, self.port))
+            listener.listen(1024)
+            listener.settimeout(0.5)
+            self._listeners.append(listener)
+            thread = threading.Thread(target=self._accept_loop, args=(listener, host_key))
+            thread.daemon = True
+            thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        for listener in self._listeners:
+            listener.close()
+
+    def _accept_loop(self, listener, host_key):
+        while not self._stop.is_set():
+            try:
+                conn, _ = listener.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            self.stats.incr('connections')
+            thread = threading.Thread(target=self._serve_connection, args=(conn, host_key))
+            thread.daemon = True
+            thread.start()
+
+    def _serve_connection(self, conn, host_key):
+        transport = _StandinTransport(conn)
+        transport.add_server_key(host_key)
+        try:
+            transport.start_server(server=_StandinServer(self, transport))
+        except (paramiko.SSHException, EOFError, OSError):
+            transport.close()
+            return
+        # Hold references to accepted channels; paramiko closes them when collected
+        channels = []
+        while transport.is_active() and not self._stop.is_set():
+            channel = transport.accept(timeout=1)
+            if channel is not None:
+                channels = [c for c in channels if not c.closed] + [channel]
+        transport.close()
+
+    def run_command(self, channel, command, has_pty):
+        """Run an exec request through /bin/sh, emulating sudo locally"""
+        try:
+            tokens = shlex.split(command)
+            read_password = False
+            if tokens and tokens[0] == 'sudo':
+                index = 1
+                while index < len(tokens) and tokens[index].startswith('-'):
+                    if tokens[index] == '-S':
+                        read_password = True
+                    elif tokens[index] == '-p':
+                        index += 1
+                    index += 1
+                command = shlex.join(tokens[index:])
+                read_password = read_password or (has_pty and '-n' not in tokens[1:index])
+            if read_password:
+                buffered = b''
+                while b'\n' not in buffered:
+                    chunk = channel.recv(1024)
+                    if not chunk:
+                        break
+                    buffered += chunk
+            stdin_data = None
+            if command.strip() == 'sh -s':
+                # Script on stdin: read until the client shuts down its write side
+                chunks = []
+                while True:
+                    chunk = channel.recv(32768)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                stdin_data = b''.join(chunks)
+            process = subprocess.run(['/bin/sh', '-c', command], input=stdin_data, capture_output=True)
+            channel.sendall(process.stdout)
+            if process.stderr:
+                if has_pty:
+                    channel.sendall(process.stderr)
+                else:
+                    channel.sendall_stderr(process.stderr)
+            channel.send_exit_status(process.returncode)
+        except Exception as e:
+            logger.debug(f"Stand-in command failed: {e}")
+            try:
+                channel.send_exit_status(255)
+            except Exception:
+                pass
+        finally:
+            channel.close()
+
+
+class BlackholeListener:
+    """A listener whose accept queue is full, so new SYNs are silently dropped"""
+    def __init__(self, address, port):
+        self.address = address
+        self.port = port
+        self._listener = None
+        self._fillers = []
+
+    def start(self):
+        self._listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._listener.bind((self.address, self.port))
+        self._listener.listen(0)
+        for _ in range(4):
+            filler = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            filler.setblocking(False)
+            try:
+                filler.connect((self.address, self.port))
+            except BlockingIOError:
+                pass
+            self._fillers.append(filler)
+        time.sleep(0.05)
+        return self
+
+    def stop(self):
+        for filler in self._fillers:
+            filler.close()
+        if self._listener:
+            self._listener.close()
+
+
+def loopback_addresses(count, third_octet=0, start=2):
+    """Return `count` distinct 127.0.<third_octet>.x addresses"""
+    return [f"127.0.{third_octet}.{start + i}" for i in range(count)]
@@ -0,0 +1,185 @@
+"""
+Event-driven reading of SSH command channels.
+
+read_channel blocks on an event that paramiko sets when stdout or stderr data
+arrives (the same mechanism behind Channel.fileno() for select(), without the
+extra pipe per channel) instead of polling recv_ready()/exit_status_ready() in
+a loop. It reads in large chunks and collects them in lists of bytes, so a
+worker waiting on a slow command sleeps instead of spinning a core.
+
+Each read is bounded by a per-command timeout and a maximum number of stored
+bytes per stream. Output beyond the limit is drained from the channel and
+counted, but only the first and the last part of it are kept (head/tail
+capture), so a `journalctl` or `find /` costs a bounded amount of memory and
+the result still shows how the command ended.
+"""
+import os
+import time
+import threading
+import logging
+from collections import deque
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Bytes requested from the channel per recv call
+READ_CHUNK_SIZE = 32768
+
+# Longest single wait, so exit status and timeouts are noticed without data arriving
+MAX_WAIT_SLICE = 1.0
+
+
+def _float_setting(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def get_command_timeout():
+    """Return the per-command timeout in seconds (COMMAND_TIMEOUT, default 30; 0 disables it)"""
+    return _float_setting('COMMAND_TIMEOUT', 30)
+
+
+def get_max_output_bytes():
+    """Return the bytes kept per output stream (COMMAND_MAX_OUTPUT_KB, default 10240; 0 = unlimited)"""
+    return int(_float_setting('COMMAND_MAX_OUTPUT_KB', 10240) * 1024)
+
+
+def get_output_tail_bytes():
+    """Return how many of the kept bytes come from the end of the output (COMMAND_OUTPUT_TAIL_KB, default 1024)"""
+    return int(_float_setting('COMMAND_OUTPUT_TAIL_KB', 1024) * 1024)
+
+
+def truncation_marker(omitted_bytes, total_bytes):
+    """Line inserted between the head and the tail of truncated output"""
+    return f"\n[... {omitted_bytes} bytes omitted, {total_bytes} bytes total ...]\n"
+
+
+class OutputBuffer:
+    """Keeps the first and last bytes of one output stream, counting the rest
+
+    At most `max_bytes` are stored: `max_bytes - tail_bytes` from the start of
+    the stream and the last `tail_bytes` (the tail never exceeds half of
+    `max_bytes`). A `max_bytes` of 0 keeps everything.
+    """
+    def __init__(self, max_bytes=0, tail_bytes=0):
+        self.max_bytes = max_bytes
+        self.tail_bytes = min(tail_bytes, max_bytes // 2) if max_bytes else 0
+        self.head_bytes = max_bytes - self.tail_bytes
+        self.head = []
+        self.head_size = 0
+        self.tail = deque()
+        self.tail_size = 0
+        self.total_bytes = 0
+
+    @property
+    def stored_bytes(self):
+        return self.head_size + min(self.tail_size, self.tail_bytes)
+
+    @property
+    def omitted_bytes(self):
+        return self.total_bytes - self.stored_bytes
+
+    @property
+    def truncated(self):
+        return self.omitted_bytes > 0
+
+    def append(self, data):
+        self.total_bytes += len(data)
+        if not self.max_bytes:
+            self.head.append(data)
+            self.head_size += len(data)
+            return
+        room = self.head_bytes - self.head_size
+        if room > 0:
+            self.head.append(data[:room])
+            self.head_size += min(len(data), room)
+            data = data[room:]
+        if data and self.tail_bytes:
+            self.tail.append(data)
+            self.tail_size += len(data)
+            # Drop whole chunks that lie entirely before the last tail_bytes
+            while self.tail_size - len(self.tail[0]) >= self.tail_bytes:
+                self.tail_size -= len(self.tail.popleft())
+
+    def head_value(self):
+        return b''.join(self.head)
+
+    def tail_value(self):
+        data = b''.join(self.tail)
+        return data[-self.tail_bytes:] if self.tail_bytes else b''
+
+    def getvalue(self):
+        return self.head_value() + self.tail_value()
+
+    def text(self):
+        """Decoded output; truncated output gets a marker between head and tail"""
+        head = self.head_value().decode('utf-8', errors='replace')
+        if not self.truncated:
+            return head + self.tail_value().decode('utf-8', errors='replace')
+        return (head + truncation_marker(self.omitted_bytes, self.total_bytes)
+                + self.tail_value().decode('utf-8', errors='replace'))
+
+
+class ChannelResult:
+    """Outcome of reading a command channel to completion"""
+    __slots__ = ('exit_status', 'stdout', 'stderr', 'timed_out')
+
+    def __init__(self, exit_status, stdout, stderr, timed_out=False):
+        self.exit_status = exit_status
+        self.stdout = stdout
+        self.stderr = stderr
+        self.timed_out = timed_out
+
+
+def _drain(channel, stdout, stderr):
+    while channel.recv_ready():
+        stdout.append(channel.recv(READ_CHUNK_SIZE))
+    while channel.recv_stderr_ready():
+        stderr.append(channel.recv_stderr(READ_CHUNK_SIZE))
+
+
+def read_channel(channel, timeout=None, max_output_bytes=None, tail_bytes=0):
+    """Read stdout/stderr of an exec'd channel until the command exits
+
+    Args:
+        channel: paramiko Channel the command was started on
+        timeout: Seconds to wait for the command, None/0 to wait indefinitely
+        max_output_bytes: Bytes kept per stream, None/0 for no limit
+        tail_bytes: How many of those bytes are taken from the end of the stream
+
+    Returns:
+        ChannelResult; on timeout the channel is closed, exit_status is -1 and
+        timed_out is True
+    """
+    stdout = OutputBuffer(max_output_bytes or 0, tail_bytes)
+    stderr = OutputBuffer(max_output_bytes or 0, tail_bytes)
+    deadline = time.monotonic() + timeout if timeout else None
+
+    # Set by either buffer when data arrives or the stream is closed
+    data_ready = threading.Event()
+    channel.in_buffer.set_event(data_ready)
+    channel.in_stderr_buffer.set_event(data_ready)
+
+    while True:
+        _drain(channel, stdout, stderr)
+        if channel.exit_status_ready():
+            # The server sends all output before the exit status
+            _drain(channel, stdout, stderr)
+            return ChannelResult(channel.recv_exit_status(), stdout, stderr)
+
+        wait = MAX_WAIT_SLICE
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                channel.close()
+                return ChannelResult(-1, stdout, stderr, timed_out=True)
+            wait = min(wait, remaining)
+
+        if channel.eof_received:
+            # Output is complete and the buffers stay signalled from here on;
+            # only the exit status is outstanding.
+            channel.status_event.wait(wait)
+        else:
+            data_ready.wait(wait)
@@ -0,0 +1,310 @@
+"""
+Persistent "last working credential" cache for multi-credential scans.
+
+When several credential sets are tried against a host, every failed attempt is a
+full TCP + key exchange + authentication cycle. CredentialCache remembers, per
+host and credential set, when authentication last succeeded or failed and uses
+that to order the credential sets of the next scan:
+
+1. the credential set that last worked on this host,
+2. credential sets that currently work on other hosts of the same /24,
+3. everything else.
+
+Within each tier, credential sets that recently failed on the host are pushed
+back by a penalty that halves every CREDENTIAL_FAILURE_HALF_LIFE_HOURS, and the
+configured priority breaks the remaining ties. Nothing is skipped outright:
+credentials get rotated, so a known-bad set is still tried, just last.
+
+Outcomes are collected in memory during the scan and written back in bulk by
+flush() when the scan finishes. What is written are the changes this scan
+made, merged into whatever is stored by then, so scans and scan workers
+flushing the same hosts at the same time add up instead of overwriting each
+other; if the bulk write fails, for instance because another scan inserted
+the same row first, the outcomes are merged one row at a time. load() can be
+limited to the /24s of the targets, so a scan worker does not read the
+history of every host for each batch.
+"""
+import os
+import threading
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime
+from sqlalchemy import insert, update, select, bindparam, case, func, or_
+from sqlalchemy.exc import IntegrityError
+from app import app, db
+from models import CredentialHostStat
+from subnet_utils import TargetSet, int_to_ip
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Rows written per bulk statement when flushing
+FLUSH_BATCH_SIZE = 1000
+
+# /24s matched per query when loading the outcomes of a scan's targets; scans
+# spanning more than LOAD_SUBNET_LIMIT of them load everything instead
+LOAD_SUBNET_CHUNK = 100
+LOAD_SUBNET_LIMIT = 1024
+
+_STAT_COLUMNS = [
+    'success_count', 'failure_count', 'failure_streak', 'last_success_at', 'last_failure_at'
+]
+
+_stats_table = CredentialHostStat.__table__
+
+# Adds the outcomes one scan recorded since its last flush to a stored row.
+# b_reset is 1 if the host accepted the credential set in between, and
+# b_streak counts the failures since then.
+_MERGE_STATEMENT = update(_stats_table).where(
+    _stats_table.c.ip_address == bindparam('b_ip_address'),
+    _stats_table.c.credential_set_id == bindparam('b_credential_set_id')
+).values(
+    success_count=func.coalesce(_stats_table.c.success_count, 0) + bindparam('b_success_count'),
+    failure_count=func.coalesce(_stats_table.c.failure_count, 0) + bindparam('b_failure_count'),
+    failure_streak=case(
+        (bindparam('b_reset') == 1, bindparam('b_failure_streak')),
+        else_=func.coalesce(_stats_table.c.failure_streak, 0) + bindparam('b_failure_streak')
+    ),
+    last_success_at=func.coalesce(bindparam('b_last_success_at', type_=db.DateTime),
+                                  _stats_table.c.last_success_at),
+    last_failure_at=func.coalesce(bindparam('b_last_failure_at', type_=db.DateTime),
+                                  _stats_table.c.last_failure_at),
+)
+
+
+def is_credential_cache_enabled():
+    """Check the CREDENTIAL_CACHE setting ('enabled' by default)"""
+    return os.environ.get('CREDENTIAL_CACHE', 'enabled').lower() != 'disabled'
+
+
+def get_failure_half_life_hours():
+    """Return the half-life of the failure penalty in hours"""
+    try:
+        return max(float(os.environ.get('CREDENTIAL_FAILURE_HALF_LIFE_HOURS', '72')), 0.01)
+    except ValueError:
+        return 72.0
+
+
+def subnet_key(ip):
+    """Return the /24 an IPv4 address belongs to (the address itself otherwise)"""
+    return ip.rsplit('.', 1)[0] if ip.count('.') == 3 else ip
+
+
+def target_subnets(targets):
+    """Return the /24 keys (see subnet_key) of a TargetSet or a list of addresses"""
+    if isinstance(targets, TargetSet):
+        return {subnet_key(int_to_ip(block << 8))
+                for start, end in targets.intervals for block in range(start >> 8, (end >> 8) + 1)}
+    return {subnet_key(ip) for ip in targets}
+
+
+def _is_known_good(stat):
+    return stat is not None and stat['last_success_at'] is not None and not stat['failure_streak']
+
+
+class CredentialCache:
+    """In-memory view of credential_host_stats for the credential sets of one scan"""
+    def __init__(self, credential_set_ids, half_life_hours=None):
+        self.credential_set_ids = set(credential_set_ids)
+        self.half_life_hours = half_life_hours or get_failure_half_life_hours()
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._dirty = {}
+        self._subnet_good = defaultdict(Counter)
+
+    @classmethod
+    def load(cls, credential_set_ids, targets=None):
+        """Create a cache preloaded with the stored outcomes of `credential_set_ids`
+
+        Args:
+            targets: Optional TargetSet or list of the addresses about to be
+                scanned; only outcomes within their /24s are read
+        """
+        cache = cls(credential_set_ids)
+        if not cache.credential_set_ids:
+            return cache
+        in_sets = CredentialHostStat.credential_set_id.in_(cache.credential_set_ids)
+        subnets = sorted(target_subnets(targets)) if targets is not None else None
+        if subnets is None or len(subnets) > LOAD_SUBNET_LIMIT:
+            queries = [select(CredentialHostStat).where(in_sets)]
+        else:
+            queries = [
+                select(CredentialHostStat).where(in_sets, or_(*[
+                    # Addresses that are not IPv4 are their own subnet key
+                    CredentialHostStat.ip_address.like(f"{subnet}.%") if subnet.count('.') == 2
+                    else CredentialHostStat.ip_address == subnet
+                    for subnet in subnets[start:start + LOAD_SUBNET_CHUNK]
+                ]))
+                for start in range(0, len(subnets), LOAD_SUBNET_CHUNK)
+            ]
+        with app.app_context():
+            rows = [row for query in queries for row in db.session.execute(query).scalars()]
+            for row in rows:
+                stat = {'id': row.id}
+                stat.update({column: getattr(row, column) or (None if column.startswith('last_') else 0)
+                             for column in _STAT_COLUMNS})
+                cache._stats[(row.ip_address, row.credential_set_id)] = stat
+                if _is_known_good(stat):
+                    cache._subnet_good[subnet_key(row.ip_address)][row.credential_set_id] += 1
+        logger.info(f"Loaded {len(cache._stats)} credential outcomes for "
+                    f"{len(cache.credential_set_ids)} credential sets")
+        return cache
+
+    def _penalty(self, stat, now):
+        if not stat or not stat['failure_streak'] or stat['last_failure_at'] is None:
+            return 0.0
+        age_hours = max((now - stat['last_failure_at']).total_seconds() / 3600.0, 0.0)
+        return stat['failure_streak'] * 0.5 ** (age_hours / self.half_life_hours)
+
+    def order(self, ip, credentials):
+        """Return `credentials` sorted so the most promising set for `ip` comes first
+
+        Args:
+            ip: Target address
+            credentials: Objects with `id` and `priority` attributes
+        """
+        now = datetime.utcnow()
+        with self._lock:
+            subnet_good = self._subnet_good.get(subnet_key(ip), Counter())
+
+            def sort_key(cred):
+                stat = self._stats.get((ip, cred.id))
+                if _is_known_good(stat):
+                    tier = 0
+                elif subnet_good[cred.id] > 0:
+                    tier = 1
+                else:
+                    tier = 2
+                return (tier, -subnet_good[cred.id], self._penalty(stat, now), -(cred.priority or 0))
+
+            return sorted(credentials, key=sort_key)
+
+    def record_success(self, ip, credential_set_id):
+        """Remember that `credential_set_id` authenticated on `ip`"""
+        now = datetime.utcnow()
+        with self._lock:
+            stat, change = self._stat(ip, credential_set_id)
+            if not _is_known_good(stat):
+                self._subnet_good[subnet_key(ip)][credential_set_id] += 1
+            stat['success_count'] += 1
+            stat['failure_streak'] = 0
+            stat['last_success_at'] = now
+            change['success_count'] += 1
+            change['reset'] = 1
+            change['failure_streak'] = 0
+            change['last_success_at'] = now
+
+    def record_failure(self, ip, credential_set_id):
+        """Remember that `credential_set_id` was rejected by `ip`"""
+        now = datetime.utcnow()
+        with self._lock:
+            stat, change = self._stat(ip, credential_set_id)
+            if _is_known_good(stat):
+                subnet = self._subnet_good[subnet_key(ip)]
+                subnet[credential_set_id] = max(subnet[credential_set_id] - 1, 0)
+            stat['failure_count'] += 1
+            stat['failure_streak'] += 1
+            stat['last_failure_at'] = now
+            change['failure_count'] += 1
+            change['failure_streak'] += 1
+            change['last_failure_at'] = now
+
+    def _stat(self, ip, credential_set_id):
+        """Return the outcome of a host and credential set, and its change since the last flush"""
+        key = (ip, credential_set_id)
+        stat = self._stats.get(key)
+        if stat is None:
+            stat = {'id': None, 'success_count': 0, 'failure_count': 0, 'failure_streak': 0,
+                    'last_success_at': None, 'last_failure_at': None}
+            self._stats[key] = stat
+        change = self._dirty.get(key)
+        if change is None:
+            change = {'success_count': 0, 'failure_count': 0, 'failure_streak': 0, 'reset': 0,
+                      'last_success_at': None, 'last_failure_at': None}
+            self._dirty[key] = change
+        return stat, change
+
+    def flush(self):
+        """Write the outcomes recorded since the last flush in bulk
+
+        Each change is added to the stored row, so concurrent flushes of the
+        same host and credential set do not overwrite each other.
+        """
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            inserts = []
+            merges = []
+            for (ip, credential_set_id), change in dirty.items():
+                if self._stats[(ip, credential_set_id)]['id'] is None:
+                    inserts.append(dict(
+                        {column: change[column] for column in _STAT_COLUMNS},
+                        ip_address=ip, credential_set_id=credential_set_id
+                    ))
+                else:
+                    merges.append(_merge_params(ip, credential_set_id, change))
+        if not inserts and not merges:
+            return
+
+        with app.app_context():
+            try:
+                row_ids = {}
+                for start in range(0, len(inserts), FLUSH_BATCH_SIZE):
+                    rows = db.session.execute(
+                        insert(_stats_table).returning(
+                            _stats_table.c.id, _stats_table.c.ip_address, _stats_table.c.credential_set_id
+                        ),
+                        inserts[start:start + FLUSH_BATCH_SIZE]
+                    )
+                    row_ids.update(((row.ip_address, row.credential_set_id), row.id) for row in rows)
+                for start in range(0, len(merges), FLUSH_BATCH_SIZE):
+                    db.session.execute(_MERGE_STATEMENT, merges[start:start + FLUSH_BATCH_SIZE])
+                db.session.commit()
+                saved = len(dirty)
+            except Exception as e:
+                db.session.rollback()
+                logger.warning(f"Bulk save of credential outcomes failed, merging them row by row: {str(e)}")
+                row_ids = self._merge_rows(dirty)
+                saved = len(row_ids)
+        with self._lock:
+            for key, row_id in row_ids.items():
+                self._stats[key]['id'] = row_id
+        logger.info(f"Saved {saved} credential outcomes")
+
+    def _merge_rows(self, dirty):
+        """Merge changes into their rows one transaction at a time, inserting missing rows
+
+        Returns:
+            Dict of (ip, credential set ID) to the row ID of the rows written
+        """
+        row_ids = {}
+        merge = _MERGE_STATEMENT.returning(_stats_table.c.id)
+        for (ip, credential_set_id), change in dirty.items():
+            params = _merge_params(ip, credential_set_id, change)
+            try:
+                row_id = db.session.execute(merge, params).scalar()
+                if row_id is None:
+                    try:
+                        row_id = db.session.execute(insert(_stats_table).returning(_stats_table.c.id), dict(
+                            {column: change[column] for column in _STAT_COLUMNS},
+                            ip_address=ip, credential_set_id=credential_set_id
+                        )).scalar()
+                        db.session.commit()
+                    except IntegrityError:
+                        # Inserted by another scan in the meantime
+                        db.session.rollback()
+                        row_id = db.session.execute(merge, params).scalar()
+                        db.session.commit()
+                else:
+                    db.session.commit()
+                row_ids[(ip, credential_set_id)] = row_id
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Error saving credential outcome for {ip}: {str(e)}")
+        return row_ids
+
+
+def _merge_params(ip, credential_set_id, change):
+    """Parameters of _MERGE_STATEMENT for one host and credential set"""
+    params = {f'b_{column}': change[column] for column in _STAT_COLUMNS + ['reset']}
+    params.update(b_ip_address=ip, b_credential_set_id=credential_set_id)
+    return params
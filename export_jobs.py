@@ -0,0 +1,236 @@
+"""
+Background export jobs with exported files cached on disk.
+
+Building an export, the PDF report in particular, can take long enough to tie
+up one of the few gunicorn threads. ExportJobManager runs exports on its own
+small pool of worker threads instead: a request submits a job and gets its ID
+back right away, then polls /export_jobs/<id> until the file can be
+downloaded.
+
+Finished files are kept in EXPORT_DIR, named after the scan, a fingerprint of
+the scan's state (status, finished count, number and highest ID of its result
+rows) and the format. As long as the scan does not change, every later request
+for the same format is served from that file without running anything; once
+it changes, the fingerprint no longer matches, the next export is built again
+and replaces the old file. Requests for an export that is already being built
+share the running job.
+"""
+import os
+import time
+import uuid
+import hashlib
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import select, func
+from app import app, db
+from models import ScanResult, ScanSession
+import result_export
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Seconds a finished job stays queryable by its ID
+JOB_RETENTION = 3600
+
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+
+# Formats that can be exported in the background, with their mimetype and extension
+JOB_FORMATS = dict(result_export.EXPORT_FORMATS, pdf=('application/pdf', 'pdf'))
+
+
+def _int_setting(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def get_export_dir():
+    """Return the directory for exported files (EXPORT_DIR, default instance/exports)"""
+    default = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'exports')
+    return os.environ.get('EXPORT_DIR') or default
+
+
+def scan_fingerprint(scan_session):
+    """Short hash that changes whenever the results of a scan session change"""
+    row_count, max_id = db.session.execute(
+        select(func.count(ScanResult.id), func.max(ScanResult.id))
+        .where(ScanResult.scan_session_id == scan_session.id)
+    ).one()
+    state = f"{scan_session.status}:{scan_session.completed_count}:{row_count}:{max_id}"
+    return hashlib.sha1(state.encode()).hexdigest()[:12]
+
+
+def artifact_name(scan_session_id, export_format, compress, fingerprint):
+    """File name of an export; `compress` only applies to text formats"""
+    _, extension = JOB_FORMATS[export_format]
+    if compress and export_format != 'pdf':
+        extension += '.gz'
+    return f"scan_{scan_session_id}_{export_format}_{fingerprint}.{extension}"
+
+
+def artifact_mimetype(export_format, compress):
+    if compress and export_format != 'pdf':
+        return 'application/gzip'
+    return JOB_FORMATS[export_format][0]
+
+
+class ExportJob:
+    """One export of a scan session in one format"""
+    def __init__(self, scan_session_id, export_format, compress, fingerprint, path):
+        self.id = uuid.uuid4().hex
+        self.scan_session_id = scan_session_id
+        self.export_format = export_format
+        self.compress = compress
+        self.fingerprint = fingerprint
+        self.path = path
+        self.status = QUEUED
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    @property
+    def filename(self):
+        return os.path.basename(self.path)
+
+    @property
+    def mimetype(self):
+        return artifact_mimetype(self.export_format, self.compress)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'scan_id': self.scan_session_id,
+            'format': self.export_format,
+            'compress': self.compress,
+            'status': self.status,
+            'error': self.error,
+            'size': os.path.getsize(self.path) if self.status == COMPLETED else None,
+        }
+
+
+class ExportJobManager:
+    """Runs export jobs on worker threads and keeps their files in `export_dir`"""
+    def __init__(self, export_dir, max_workers=1):
+        self.export_dir = export_dir
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='export')
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._active = {}
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cached_path(self, scan_session, export_format, compress=False):
+        """Path of an up-to-date exported file, or None if there is none"""
+        compress = bool(compress) and export_format != 'pdf'
+        name = artifact_name(scan_session.id, export_format, compress, scan_fingerprint(scan_session))
+        path = os.path.join(self.export_dir, name)
+        return path if os.path.exists(path) else None
+
+    def submit(self, scan_session, export_format, compress=False):
+        """Return a job for the export, reusing a cached file or a running job
+
+        Must be called within an application context.
+        """
+        if export_format not in JOB_FORMATS:
+            raise ValueError(f"Unsupported export format: {export_format}")
+        compress = bool(compress) and export_format != 'pdf'
+        fingerprint = scan_fingerprint(scan_session)
+        name = artifact_name(scan_session.id, export_format, compress, fingerprint)
+        path = os.path.join(self.export_dir, name)
+
+        with self._lock:
+            self._prune()
+            job_id = self._active.get(name)
+            if job_id is not None:
+                active = self._jobs[job_id]
+                if active.status in (QUEUED, RUNNING) or (active.status == COMPLETED and os.path.exists(path)):
+                    return active
+
+            job = ExportJob(scan_session.id, export_format, compress, fingerprint, path)
+            self._jobs[job.id] = job
+            self._active[name] = job.id
+            if os.path.exists(path):
+                # Exported before and the scan has not changed since
+                job.status = COMPLETED
+                job.finished_at = time.time()
+                return job
+
+        self._executor.submit(self._run, job)
+        return job
+
+    def _run(self, job):
+        job.status = RUNNING
+        os.makedirs(self.export_dir, exist_ok=True)
+        partial_path = f"{job.path}.{job.id}.part"
+        try:
+            with app.app_context():
+                scan_session = db.session.get(ScanSession, job.scan_session_id)
+                if scan_session is None:
+                    raise ValueError(f"Scan session {job.scan_session_id} no longer exists")
+                with open(partial_path, 'wb') as output:
+                    if job.export_format == 'pdf':
+                        result_export.write_pdf_report(scan_session, output)
+                    else:
+                        chunks = result_export.export_chunks(scan_session, job.export_format)
+                        if job.compress:
+                            for data in result_export.gzip_chunks(chunks):
+                                output.write(data)
+                        else:
+                            for chunk in chunks:
+                                output.write(chunk.encode('utf-8'))
+            os.replace(partial_path, job.path)
+            self._remove_stale_artifacts(job)
+            job.status = COMPLETED
+            logger.info(f"Exported scan {job.scan_session_id} as {job.export_format} to {job.path}")
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+            logger.error(f"Export of scan {job.scan_session_id} as {job.export_format} failed: {str(e)}")
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+        finally:
+            job.finished_at = time.time()
+
+    def _remove_stale_artifacts(self, job):
+        """Delete files of the same scan and format made for an older fingerprint"""
+        prefix = f"scan_{job.scan_session_id}_{job.export_format}_"
+        for name in os.listdir(self.export_dir):
+            if name.startswith(prefix) and name != job.filename and not name.endswith('.part'):
+                same_kind = name.endswith('.gz') == job.filename.endswith('.gz')
+                if same_kind:
+                    try:
+                        os.remove(os.path.join(self.export_dir, name))
+                    except OSError as e:
+                        logger.debug(f"Could not remove stale export {name}: {str(e)}")
+
+    def _prune(self):
+        """Forget finished jobs older than JOB_RETENTION (their files stay cached)"""
+        cutoff = time.time() - JOB_RETENTION
+        for job_id, job in list(self._jobs.items()):
+            if job.finished_at is not None and job.finished_at < cutoff:
+                del self._jobs[job_id]
+                if self._active.get(job.filename) == job_id:
+                    del self._active[job.filename]
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_export_job_manager():
+    """Return the process-wide export job manager"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = ExportJobManager(get_export_dir(), max_workers=max(_int_setting('EXPORT_WORKERS', 1), 1))
+        return _manager
@@ -7,7 +7,7 @@ from models import ScheduleFrequency
 class ScanForm(FlaskForm):
     """Form for initiating a subnet scan"""
     subnets = TextAreaField('Subnets', validators=[DataRequired()], 
-                           description='Enter subnets in CIDR notation (e.g., 192.168.1.0/24) or IP ranges (e.g., 192.168.1.1-192.168.1.10), one per line or comma-separated')
+                           description='Enter subnets in CIDR notation (e.g., 192.168.1.0/24) or IP ranges (e.g., 192.168.1.1-192.168.1.10), one per line or comma-separated. Prefix an entry with ! (or use "except") to exclude it')
     
     # Authentication Options
     use_credential_sets = BooleanField('Use Saved Credential Sets', default=False,
@@ -80,6 +80,10 @@ class CommandTemplateForm(FlaskForm):
     
     commands = TextAreaField('Commands', validators=[DataRequired()],
                            description='Enter commands to execute, one per line')
+    
+    command_parallelism = IntegerField('Parallel Commands', validators=[Optional(), NumberRange(min=1, max=10)],
+                                       default=1,
+                                       description='Number of independent commands run at the same time on each host')
 
 class ImportForm(FlaskForm):
     """Form for importing CSV files"""
@@ -93,7 +97,7 @@ class ScheduledScanForm(FlaskForm):
     
     # Scan configuration - reuse fields from ScanForm
     subnets = TextAreaField('Subnets', validators=[DataRequired()], 
-                           description='Enter subnets in CIDR notation (e.g., 192.168.1.0/24) or IP ranges (e.g., 192.168.1.1-192.168.1.10), one per line or comma-separated')
+                           description='Enter subnets in CIDR notation (e.g., 192.168.1.0/24) or IP ranges (e.g., 192.168.1.1-192.168.1.10), one per line or comma-separated. Prefix an entry with ! (or use "except") to exclude it')
     
     username = StringField('SSH Username', validators=[DataRequired()])
     
@@ -0,0 +1,45 @@
+"""
+Migration script to add the command_parallelism column to command_templates
+"""
+import os
+import logging
+from sqlalchemy import create_engine, inspect, text
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def migrate_database():
+    """
+    Add command_parallelism to existing command_templates tables
+    """
+    try:
+        # Get database URL from environment or use default SQLite database
+        database_url = os.environ.get('DATABASE_URL', 'sqlite:///instance/subnet_whisperer.db')
+
+        # Create engine
+        engine = create_engine(database_url)
+
+        # New databases get the column from db.create_all()
+        insp = inspect(engine)
+        if not insp.has_table('command_templates'):
+            logger.info("command_templates table does not exist yet, skipping migration")
+            return True
+
+        columns = {column['name'] for column in insp.get_columns('command_templates')}
+        if 'command_parallelism' in columns:
+            logger.info("command_templates.command_parallelism already exists, skipping migration")
+            return True
+
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE command_templates ADD COLUMN command_parallelism INTEGER DEFAULT 1"))
+
+        logger.info("Database migration for command template parallelism completed successfully")
+        return True
+
+    except Exception as e:
+        logger.error(f"Error during migration: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    migrate_database()
@@ -0,0 +1,67 @@
+"""
+Migration script to add the credential_host_stats table used to remember which
+credential set last worked on each host
+"""
+import os
+import logging
+from sqlalchemy import (
+    create_engine, inspect, Column, Integer, String, DateTime, ForeignKey, Table, UniqueConstraint
+)
+from sqlalchemy.orm import declarative_base
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def migrate_database():
+    """
+    Add the credential_host_stats table
+    """
+    try:
+        # Get database URL from environment or use default SQLite database
+        database_url = os.environ.get('DATABASE_URL', 'sqlite:///instance/subnet_whisperer.db')
+
+        # Create engine
+        engine = create_engine(database_url)
+
+        # Check if the table already exists
+        insp = inspect(engine)
+        if insp.has_table('credential_host_stats'):
+            logger.info("credential_host_stats table already exists, skipping migration")
+            return True
+
+        # Create Base class
+        Base = declarative_base()
+
+        # Reflect the referenced table so the foreign key can be resolved
+        Table('credential_sets', Base.metadata, autoload_with=engine)
+
+        # Define models for migration
+        class CredentialHostStat(Base):
+            __tablename__ = 'credential_host_stats'
+            __table_args__ = (
+                UniqueConstraint('ip_address', 'credential_set_id', name='uq_credential_host_stats_ip_credential'),
+            )
+
+            id = Column(Integer, primary_key=True)
+            ip_address = Column(String(45), nullable=False, index=True)
+            credential_set_id = Column(Integer, ForeignKey('credential_sets.id', ondelete='CASCADE'),
+                                       nullable=False, index=True)
+            success_count = Column(Integer, default=0)
+            failure_count = Column(Integer, default=0)
+            failure_streak = Column(Integer, default=0)
+            last_success_at = Column(DateTime)
+            last_failure_at = Column(DateTime)
+
+        # Create the table
+        Base.metadata.create_all(engine, tables=[CredentialHostStat.__table__])
+
+        logger.info("Database migration for credential host stats completed successfully")
+        return True
+
+    except Exception as e:
+        logger.error(f"Error during migration: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    migrate_database()
@@ -0,0 +1,73 @@
+"""
+Migration script to add result counters to scan_sessions and a composite
+(scan_session_id, status_code) index to scan_results
+"""
+import os
+import logging
+from sqlalchemy import create_engine, inspect, text
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+COUNTER_COLUMNS = ['completed_count', 'success_count', 'failed_count']
+
+INDEX_NAME = 'ix_scan_results_session_status'
+
+def migrate_database():
+    """
+    Add completed/success/failed counters to existing scan_sessions tables,
+    fill them from scan_results, and index scan_results by session and status
+    """
+    try:
+        # Get database URL from environment or use default SQLite database
+        database_url = os.environ.get('DATABASE_URL', 'sqlite:///instance/subnet_whisperer.db')
+
+        # Create engine
+        engine = create_engine(database_url)
+
+        # New databases get the columns and the index from db.create_all()
+        insp = inspect(engine)
+        if not insp.has_table('scan_sessions') or not insp.has_table('scan_results'):
+            logger.info("scan tables do not exist yet, skipping migration")
+            return True
+
+        columns = {column['name'] for column in insp.get_columns('scan_sessions')}
+        missing_columns = [column for column in COUNTER_COLUMNS if column not in columns]
+        indexes = {index['name'] for index in insp.get_indexes('scan_results')}
+
+        if not missing_columns and INDEX_NAME in indexes:
+            logger.info("scan progress counters and index already exist, skipping migration")
+            return True
+
+        with engine.begin() as conn:
+            for column in missing_columns:
+                conn.execute(text(f"ALTER TABLE scan_sessions ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0"))
+
+            if INDEX_NAME not in indexes:
+                conn.execute(text(
+                    f"CREATE INDEX {INDEX_NAME} ON scan_results (scan_session_id, status_code)"
+                ))
+
+            if missing_columns:
+                # Count the results of existing sessions once
+                conn.execute(text("""
+                    UPDATE scan_sessions SET
+                        success_count = (SELECT COUNT(*) FROM scan_results
+                                         WHERE scan_results.scan_session_id = scan_sessions.id
+                                         AND scan_results.status_code = 'success'),
+                        failed_count = (SELECT COUNT(*) FROM scan_results
+                                        WHERE scan_results.scan_session_id = scan_sessions.id
+                                        AND scan_results.status_code = 'failed')
+                """))
+                conn.execute(text("UPDATE scan_sessions SET completed_count = success_count + failed_count"))
+
+        logger.info("Database migration for scan progress counters completed successfully")
+        return True
+
+    except Exception as e:
+        logger.error(f"Error during migration: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    migrate_database()
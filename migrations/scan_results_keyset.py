@@ -0,0 +1,78 @@
+"""
+Migration script to add the numeric ip_int column to scan_results and the
+(scan_session_id, ip_int, id) index that paginated scan_results queries walk
+"""
+import os
+import logging
+from sqlalchemy import create_engine, inspect, text
+
+from subnet_utils import ip_sort_key
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = 'ix_scan_results_session_ip_int'
+
+# Index of the previous (scan_session_id, ip_address, id) ordering
+OLD_INDEX_NAME = 'ix_scan_results_session_ip'
+
+BACKFILL_BATCH_SIZE = 5000
+
+def migrate_database():
+    """
+    Add ip_int to scan_results, fill it for existing rows and index
+    scan_results by session, numeric IP address and ID for keyset pagination
+    """
+    try:
+        # Get database URL from environment or use default SQLite database
+        database_url = os.environ.get('DATABASE_URL', 'sqlite:///instance/subnet_whisperer.db')
+
+        # Create engine
+        engine = create_engine(database_url)
+
+        # New databases get the column and the index from db.create_all()
+        insp = inspect(engine)
+        if not insp.has_table('scan_results'):
+            logger.info("scan_results table does not exist yet, skipping migration")
+            return True
+
+        columns = {column['name'] for column in insp.get_columns('scan_results')}
+        indexes = {index['name'] for index in insp.get_indexes('scan_results')}
+
+        if 'ip_int' in columns and INDEX_NAME in indexes and OLD_INDEX_NAME not in indexes:
+            logger.info("scan_results pagination index already exists, skipping migration")
+            return True
+
+        with engine.begin() as conn:
+            if 'ip_int' not in columns:
+                conn.execute(text("ALTER TABLE scan_results ADD COLUMN ip_int BIGINT"))
+
+            # Fill the column in batches; rows written from now on get it on insert
+            while True:
+                rows = conn.execute(text(
+                    "SELECT id, ip_address FROM scan_results WHERE ip_int IS NULL LIMIT :limit"
+                ), {"limit": BACKFILL_BATCH_SIZE}).all()
+                if not rows:
+                    break
+                conn.execute(
+                    text("UPDATE scan_results SET ip_int = :ip_int WHERE id = :id"),
+                    [{"id": row.id, "ip_int": ip_sort_key(row.ip_address)} for row in rows]
+                )
+
+            if INDEX_NAME not in indexes:
+                conn.execute(text(
+                    f"CREATE INDEX {INDEX_NAME} ON scan_results (scan_session_id, ip_int, id)"
+                ))
+            if OLD_INDEX_NAME in indexes:
+                conn.execute(text(f"DROP INDEX {OLD_INDEX_NAME}"))
+
+        logger.info("Database migration for scan_results pagination index completed successfully")
+        return True
+
+    except Exception as e:
+        logger.error(f"Error during migration: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    migrate_database()
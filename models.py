@@ -1,9 +1,11 @@
 from app import db
 from datetime import datetime, timedelta
+from sqlalchemy import update, select, func, case
 import json
 from enum import Enum
 from flask_login import UserMixin
 import bcrypt
+from subnet_utils import ip_sort_key
 
 
 class User(UserMixin, db.Model):
@@ -77,6 +79,23 @@ class CredentialSet(db.Model):
             'updated_at': self.updated_at.isoformat()
         }
     
+class CredentialHostStat(db.Model):
+    """Per-host outcome of authenticating with a credential set, used to order retries"""
+    __tablename__ = 'credential_host_stats'
+    __table_args__ = (
+        db.UniqueConstraint('ip_address', 'credential_set_id', name='uq_credential_host_stats_ip_credential'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    ip_address = db.Column(db.String(45), nullable=False, index=True)
+    credential_set_id = db.Column(db.Integer, db.ForeignKey('credential_sets.id', ondelete='CASCADE'),
+                                  nullable=False, index=True)
+    success_count = db.Column(db.Integer, default=0)
+    failure_count = db.Column(db.Integer, default=0)
+    failure_streak = db.Column(db.Integer, default=0)  # Failures since the last success
+    last_success_at = db.Column(db.DateTime)
+    last_failure_at = db.Column(db.DateTime)
+
 class ScheduleFrequency(str, Enum):
     HOURLY = 'hourly'
     DAILY = 'daily'
@@ -97,11 +116,38 @@ class ScanSession(db.Model):
     started_at = db.Column(db.DateTime, default=datetime.utcnow)
     completed_at = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Finished results, maintained as they are written (see count_results)
+    completed_count = db.Column(db.Integer, default=0, nullable=False)
+    success_count = db.Column(db.Integer, default=0, nullable=False)
+    failed_count = db.Column(db.Integer, default=0, nullable=False)
     
     # Relationships
     results = db.relationship('ScanResult', backref='session', lazy=True, cascade='all, delete-orphan')
+
+    @classmethod
+    def count_results(cls, scan_session_id, success=0, failed=0):
+        """UPDATE statement adding finished results to a session's counters
+
+        The increment happens in the database, so concurrent writers never lose
+        updates; execute it in the transaction that writes the results.
+        """
+        return update(cls).where(cls.id == scan_session_id).values(
+            completed_count=cls.completed_count + (success + failed),
+            success_count=cls.success_count + success,
+            failed_count=cls.failed_count + failed
+        ).execution_options(synchronize_session=False)
     
-    def to_dict(self):
+    def to_dict(self, total_count=None):
+        """Serialise the session
+
+        Args:
+            total_count: Number of its result rows, pending ones included, if the
+                caller already counted them; otherwise counted with one query
+        """
+        if total_count is None:
+            total_count = db.session.scalar(
+                select(func.count(ScanResult.id)).where(ScanResult.scan_session_id == self.id)
+            )
         return {
             'id': self.id,
             'username': self.username,
@@ -112,17 +158,131 @@ class ScanSession(db.Model):
             'started_at': self.started_at.isoformat() if self.started_at else None,
             'completed_at': self.completed_at.isoformat() if self.completed_at else None,
             'created_at': self.created_at.isoformat(),
-            'success_count': sum(1 for r in self.results if r.status_code == 'success'),
-            'failed_count': sum(1 for r in self.results if r.status_code == 'failed'),
-            'total_count': len(self.results)
+            # Stored counters, so serialising a session never loads its results
+            'success_count': self.success_count or 0,
+            'failed_count': self.failed_count or 0,
+            'total_count': total_count
         }
 
+class ScanJob(db.Model):
+    """Settings and encrypted credentials of a scan session queued for scan workers"""
+    __tablename__ = 'scan_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    scan_session_id = db.Column(db.Integer, db.ForeignKey('scan_sessions.id', ondelete='CASCADE'),
+                                nullable=False, unique=True)
+    username = db.Column(db.String(100), nullable=False)
+    # JSON: commands, collection flags, concurrency, port, engine and credential set IDs
+    options = db.Column(db.Text, nullable=False)
+    # Manual credentials, cleared once the scan has finished
+    password_encrypted = db.Column(db.Text)
+    private_key_encrypted = db.Column(db.Text)
+    sudo_password_encrypted = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class ScanBatch(db.Model):
+    """A slice of a queued scan's targets that one scan worker claims at a time"""
+    __tablename__ = 'scan_batches'
+    __table_args__ = (
+        # Workers look for the oldest claimable batch
+        db.Index('ix_scan_batches_claim', 'status', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    scan_session_id = db.Column(db.Integer, db.ForeignKey('scan_sessions.id', ondelete='CASCADE'),
+                                nullable=False, index=True)
+    targets = db.Column(db.Text, nullable=False)  # Ranges in parse_target_set syntax, one per line
+    size = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, leased, done, failed
+    worker_id = db.Column(db.String(255))
+    lease_expires_at = db.Column(db.DateTime)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime)
+
 class ScanResult(db.Model):
     __tablename__ = 'scan_results'
+    __table_args__ = (
+        db.Index('ix_scan_results_session_status', 'scan_session_id', 'status_code'),
+        # Keyset pagination of a session's results in numeric IP order
+        db.Index('ix_scan_results_session_ip_int', 'scan_session_id', 'ip_int', 'id'),
+    )
+
+    # Large columns that are only serialised when asked for
+    DETAIL_FIELDS = ('command_output', 'server_info')
+
+    # Upper bounds (seconds) of the execution time histogram; the last bucket is open
+    EXECUTION_TIME_BUCKETS = (1, 5, 10, 30)
+
+    @classmethod
+    def summarize(cls, scan_session_ids):
+        """Aggregate the results of scan sessions with one grouped query
+
+        Only narrow columns are read, never command output or server info.
+
+        Returns:
+            Dict of scan session ID to a dict with total, success, failed,
+            pending, ssh_success, sudo_success, avg_execution_time and
+            execution_time_buckets (host counts per EXECUTION_TIME_BUCKETS range)
+        """
+        def count_where(condition):
+            return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+        execution_time = func.coalesce(cls.execution_time, 0)
+        bucket_columns = []
+        lower = None
+        for upper in cls.EXECUTION_TIME_BUCKETS + (None,):
+            if lower is None:
+                condition = execution_time < upper
+            elif upper is None:
+                condition = execution_time >= lower
+            else:
+                condition = (execution_time >= lower) & (execution_time < upper)
+            bucket_columns.append(count_where(condition))
+            lower = upper
+
+        statement = select(
+            cls.scan_session_id,
+            func.count(cls.id),
+            count_where(cls.status_code == 'success'),
+            count_where(cls.status_code == 'failed'),
+            count_where(cls.status_code == 'pending'),
+            count_where(cls.ssh_status.is_(True)),
+            count_where(cls.sudo_status.is_(True)),
+            func.avg(cls.execution_time),
+            *bucket_columns
+        ).where(cls.scan_session_id.in_(list(scan_session_ids))).group_by(cls.scan_session_id)
+
+        summaries = {}
+        for row in db.session.execute(statement):
+            session_id, total, success, failed, pending, ssh_success, sudo_success, avg_time = row[:8]
+            summaries[session_id] = {
+                'total': total,
+                'success': int(success),
+                'failed': int(failed),
+                'pending': int(pending),
+                'ssh_success': int(ssh_success),
+                'sudo_success': int(sudo_success),
+                'avg_execution_time': float(avg_time) if avg_time is not None else None,
+                'execution_time_buckets': [int(count) for count in row[8:]],
+            }
+        return summaries
+
+    @classmethod
+    def empty_summary(cls):
+        """Summary of a session without results"""
+        return {
+            'total': 0, 'success': 0, 'failed': 0, 'pending': 0,
+            'ssh_success': 0, 'sudo_success': 0, 'avg_execution_time': None,
+            'execution_time_buckets': [0] * (len(cls.EXECUTION_TIME_BUCKETS) + 1),
+        }
     
     id = db.Column(db.Integer, primary_key=True)
     scan_session_id = db.Column(db.Integer, db.ForeignKey('scan_sessions.id'), nullable=False)
     ip_address = db.Column(db.String(50), nullable=False)
+    # ip_sort_key(ip_address), filled in on insert; 10.0.0.2 sorts before 10.0.0.10
+    ip_int = db.Column(db.BigInteger, default=lambda context: ip_sort_key(
+        context.get_current_parameters().get('ip_address')))
     status_code = db.Column(db.String(20), nullable=False)  # success, failed, pending
     ssh_status = db.Column(db.Boolean, default=False)
     sudo_status = db.Column(db.Boolean, default=False)
@@ -133,21 +293,32 @@ class ScanResult(db.Model):
     execution_time = db.Column(db.Float)  # in seconds
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    def to_dict(self):
-        return {
+    def to_dict(self, fields=None):
+        """Serialise the result
+
+        Args:
+            fields: DETAIL_FIELDS to include, all of them if None; leaving
+                them out avoids loading deferred columns
+        """
+        data = {
             'id': self.id,
             'scan_session_id': self.scan_session_id,
             'ip_address': self.ip_address,
+            # Sorts IPv4 addresses numerically, e.g. for the results table
+            'ip_int': self.ip_int,
             'status_code': self.status_code,
             'ssh_status': self.ssh_status,
             'sudo_status': self.sudo_status,
             'command_status': self.command_status,
-            'command_output': self.command_output,
-            'server_info': json.loads(self.server_info) if self.server_info else None,
             'error_message': self.error_message,
             'execution_time': self.execution_time,
             'created_at': self.created_at.isoformat()
         }
+        if fields is None or 'command_output' in fields:
+            data['command_output'] = self.command_output
+        if fields is None or 'server_info' in fields:
+            data['server_info'] = json.loads(self.server_info) if self.server_info else None
+        return data
 
 class CommandTemplate(db.Model):
     __tablename__ = 'command_templates'
@@ -156,6 +327,7 @@ class CommandTemplate(db.Model):
     name = db.Column(db.String(100), nullable=False, unique=True)
     description = db.Column(db.Text)
     commands = db.Column(db.Text, nullable=False)
+    command_parallelism = db.Column(db.Integer, default=1)  # Commands run concurrently per host
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def to_dict(self):
@@ -164,6 +336,7 @@ class CommandTemplate(db.Model):
             'name': self.name,
             'description': self.description,
             'commands': self.commands,
+            'command_parallelism': self.command_parallelism or 1,
             'created_at': self.created_at.isoformat()
         }
         
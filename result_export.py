@@ -0,0 +1,331 @@
+"""
+Streaming CSV, JSON and NDJSON exports of scan results.
+
+The exports are generators of text chunks, so a response can send a scan of
+any size without holding all of its rows, or the whole document, in memory.
+Results are read in pages of EXPORT_BATCH_SIZE rows in (ip_int, id) order,
+continuing after the last row of the previous page (the same keyset the
+paginated results API uses). Each page is a short query of plain column
+tuples: no ORM objects pile up in the session, and a slow download never keeps
+a read transaction open that would block the result writer on SQLite.
+
+gzip_chunks() compresses any of the streams on the fly. write_pdf_report()
+renders the multi-page PDF report.
+"""
+import csv
+import json
+import zlib
+import logging
+from datetime import datetime
+from io import StringIO
+from sqlalchemy import select, tuple_
+from app import db
+from models import ScanResult
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Results read per query
+EXPORT_BATCH_SIZE = 500
+
+# Text collected before a chunk is handed to the response
+CHUNK_SIZE = 65536
+
+# Format name -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'json': ('application/json', 'json'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+CSV_HEADER = ['IP Address', 'Status', 'SSH Status', 'Sudo Status', 'Command Status',
+              'Execution Time (s)', 'Error Message', 'Created At']
+
+_SUMMARY_COLUMNS = [
+    ScanResult.id, ScanResult.ip_address, ScanResult.ip_int, ScanResult.status_code,
+    ScanResult.ssh_status, ScanResult.sudo_status, ScanResult.command_status, ScanResult.error_message,
+    ScanResult.execution_time, ScanResult.created_at,
+]
+
+_DETAIL_COLUMNS = [ScanResult.command_output, ScanResult.server_info]
+
+
+def _format_time(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else None
+
+
+def iter_result_rows(scan_session_id, details=True, batch_size=None):
+    """Yield the results of a scan session as rows, ordered by IP address
+
+    Args:
+        scan_session_id: ID of the scan session
+        details: Also read command_output and server_info
+        batch_size: Rows per query, EXPORT_BATCH_SIZE by default
+
+    Yields:
+        SQLAlchemy Row objects with the ScanResult columns as attributes
+    """
+    batch_size = batch_size or EXPORT_BATCH_SIZE
+    columns = _SUMMARY_COLUMNS + (_DETAIL_COLUMNS if details else [])
+    after = None
+    while True:
+        statement = select(*columns).where(ScanResult.scan_session_id == scan_session_id)
+        if after is not None:
+            statement = statement.where(tuple_(ScanResult.ip_int, ScanResult.id) > after)
+        statement = statement.order_by(ScanResult.ip_int, ScanResult.id).limit(batch_size)
+        rows = db.session.execute(statement).all()
+        # End the read transaction between pages
+        db.session.rollback()
+        yield from rows
+        if len(rows) < batch_size:
+            return
+        after = (rows[-1].ip_int, rows[-1].id)
+
+
+def export_record(row):
+    """Dict written for one result by the JSON and NDJSON exports"""
+    return {
+        'ip_address': row.ip_address,
+        'status_code': row.status_code,
+        'ssh_status': row.ssh_status,
+        'sudo_status': row.sudo_status,
+        'command_status': row.command_status,
+        'command_output': row.command_output,
+        'server_info': row.server_info,
+        'error_message': row.error_message,
+        'execution_time': row.execution_time,
+        'created_at': _format_time(row.created_at)
+    }
+
+
+def _buffered(pieces):
+    """Join small text pieces into chunks of about CHUNK_SIZE characters"""
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= CHUNK_SIZE:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def csv_chunks(scan_session):
+    """Stream the CSV export of a scan session"""
+    def lines():
+        output = StringIO()
+        writer = csv.writer(output)
+        writer.writerow(CSV_HEADER)
+        for row in iter_result_rows(scan_session.id, details=False):
+            writer.writerow([
+                row.ip_address,
+                row.status_code,
+                'Yes' if row.ssh_status else 'No',
+                'Yes' if row.sudo_status else 'No',
+                'Yes' if row.command_status else 'No',
+                row.execution_time,
+                row.error_message,
+                _format_time(row.created_at)
+            ])
+            if output.tell() >= CHUNK_SIZE:
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate()
+        yield output.getvalue()
+
+    return _buffered(lines())
+
+
+def json_chunks(scan_session):
+    """Stream the JSON export of a scan session
+
+    The document has the same shape as a json.dumps() of the whole export:
+    session fields, a summary computed in the database and the results list.
+    """
+    summary = ScanResult.summarize([scan_session.id]).get(scan_session.id) or ScanResult.empty_summary()
+    total = summary['total']
+    success_count = summary['success']
+    header = {
+        'scan_id': scan_session.id,
+        'username': scan_session.username,
+        'auth_type': scan_session.auth_type,
+        'status': scan_session.status,
+        'started_at': _format_time(scan_session.started_at),
+        'completed_at': _format_time(scan_session.completed_at),
+        'summary': {
+            'total': total,
+            'success': success_count,
+            'failed': total - success_count,
+            'success_rate': (success_count / total * 100) if total > 0 else 0
+        },
+    }
+
+    def pieces():
+        # Everything but the closing brace, then the results one per line
+        yield json.dumps(header, indent=2)[:-2] + ',\n  "results": ['
+        separator = '\n    '
+        for row in iter_result_rows(scan_session.id):
+            yield separator + json.dumps(export_record(row))
+            separator = ',\n    '
+        yield '\n  ]\n}\n'
+
+    return _buffered(pieces())
+
+
+def ndjson_chunks(scan_session):
+    """Stream the results of a scan session as newline-delimited JSON"""
+    return _buffered(
+        json.dumps(export_record(row)) + '\n' for row in iter_result_rows(scan_session.id)
+    )
+
+
+def export_chunks(scan_session, export_format):
+    """Text chunks of an export in one of EXPORT_FORMATS"""
+    if export_format == 'csv':
+        return csv_chunks(scan_session)
+    if export_format == 'json':
+        return json_chunks(scan_session)
+    if export_format == 'ndjson':
+        return ndjson_chunks(scan_session)
+    raise ValueError(f"Unsupported export format: {export_format}")
+
+
+def gzip_chunks(chunks, level=6):
+    """Compress a stream of text chunks into a gzip stream as it is produced"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# Host rows per page of the PDF report
+PDF_ROWS_PER_PAGE = 50
+
+# Landscape letter, in inches
+PDF_PAGE_SIZE = (11, 8.5)
+
+# Draw text in the standard PDF fonts: they need no glyph layout or embedding,
+# which is what made large reports slow
+PDF_RC_PARAMS = {
+    'pdf.use14corefonts': True,
+    'font.sans-serif': ['Helvetica'],
+    'font.monospace': ['Courier'],
+}
+
+PDF_COLUMNS = [
+    # (header, x position as a fraction of the page width, characters kept)
+    ('IP Address', 0.05, 39),
+    ('Status', 0.22, 10),
+    ('SSH', 0.30, 3),
+    ('Sudo', 0.35, 3),
+    ('Commands', 0.40, 3),
+    ('Time (s)', 0.48, 9),
+    ('Error', 0.56, 70),
+]
+
+
+def _clip(text, width):
+    text = ' '.join(str(text).split())
+    return text if len(text) <= width else text[:width - 3] + '...'
+
+
+def _pdf_row(row):
+    return [
+        row.ip_address,
+        row.status_code,
+        'Yes' if row.ssh_status else 'No',
+        'Yes' if row.sudo_status else 'No',
+        'Yes' if row.command_status else 'No',
+        f"{row.execution_time:.2f}" if row.execution_time is not None else 'N/A',
+        row.error_message or '',
+    ]
+
+
+def _draw_summary_page(figure, scan_session, summary, generated_at):
+    """Title, scan details and the result charts"""
+    figure.suptitle(f'Subnet Whisperer Scan Results (ID: {scan_session.id})', fontsize=16)
+    details = [
+        f'Generated: {generated_at}',
+        f'Username: {scan_session.username}',
+        f'Authentication: {scan_session.auth_type}',
+        f'Started: {_format_time(scan_session.started_at) or "N/A"}',
+        f'Completed: {_format_time(scan_session.completed_at) or "N/A"}',
+        f'Hosts: {summary["total"]} ({summary["success"]} successful, {summary["failed"]} failed)',
+    ]
+    figure.text(0.1, 0.90, '\n'.join(details), va='top', fontsize=10, linespacing=1.6, parse_math=False)
+
+    pie = figure.add_axes([0.08, 0.08, 0.38, 0.5])
+    if summary['success'] or summary['failed']:
+        pie.pie([summary['success'], summary['failed']], labels=['Success', 'Failed'],
+                autopct='%1.1f%%', colors=['#28a745', '#dc3545'])
+    pie.set_title('Scan Results')
+
+    statuses = {status: summary[status] for status in ('success', 'failed', 'pending') if summary[status]}
+    bars = figure.add_axes([0.58, 0.14, 0.36, 0.42])
+    if statuses:
+        bars.bar(list(statuses.keys()), list(statuses.values()))
+        bars.tick_params(axis='x', labelrotation=45)
+    bars.set_title('Status Breakdown')
+
+
+def _draw_host_page(figure, rows, first_number, total, page_number):
+    """One page of the host table, one text block per column"""
+    figure.text(0.05, 0.95, f'Hosts {first_number}-{first_number + len(rows) - 1} of {total}',
+                fontsize=11, weight='bold', parse_math=False)
+    for index, (header, x, width) in enumerate(PDF_COLUMNS):
+        column = '\n'.join(_clip(row[index], width) for row in rows)
+        figure.text(x, 0.91, header, fontsize=8, weight='bold', family='monospace', parse_math=False)
+        figure.text(x, 0.89, column, va='top', fontsize=7, family='monospace', linespacing=1.45,
+                    parse_math=False)
+    figure.text(0.95, 0.03, f'Page {page_number}', ha='right', fontsize=8, parse_math=False)
+
+
+def write_pdf_report(scan_session, fileobj):
+    """Render the PDF report of a scan session into a binary file object
+
+    The first page holds the scan details and charts, drawn from aggregate
+    queries; it is followed by a table of every host, PDF_ROWS_PER_PAGE per
+    page. Hosts are read in batches and each page is written to the file as
+    soon as it is drawn, on one reused figure, so memory does not grow with
+    the number of hosts. Text uses the standard PDF fonts (PDF_RC_PARAMS).
+
+    Returns:
+        Number of pages written
+    """
+    # Only imported here: plotting is the heaviest dependency and only reports need it
+    import matplotlib
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    summary = ScanResult.summarize([scan_session.id]).get(scan_session.id) or ScanResult.empty_summary()
+    generated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    with matplotlib.rc_context(PDF_RC_PARAMS), \
+            PdfPages(fileobj, metadata={'Title': f'Subnet Whisperer Scan {scan_session.id}'}) as pdf:
+        figure = Figure(figsize=PDF_PAGE_SIZE)
+        _draw_summary_page(figure, scan_session, summary, generated_at)
+        pdf.savefig(figure)
+        page_number = 1
+
+        rows = []
+        first_number = 1
+        for row in iter_result_rows(scan_session.id, details=False):
+            rows.append(_pdf_row(row))
+            if len(rows) == PDF_ROWS_PER_PAGE:
+                figure.clear()
+                page_number += 1
+                _draw_host_page(figure, rows, first_number, summary['total'], page_number)
+                pdf.savefig(figure)
+                first_number += len(rows)
+                rows = []
+        if rows:
+            figure.clear()
+            page_number += 1
+            _draw_host_page(figure, rows, first_number, summary['total'], page_number)
+            pdf.savefig(figure)
+    return page_number
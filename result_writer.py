@@ -0,0 +1,228 @@
+"""
+Buffered writer for ScanResult rows.
+
+Scan workers push 'pending' markers and finished results onto a queue instead of
+committing from every thread. A single writer thread drains the queue and flushes
+it with bulk INSERT/UPDATE statements in one transaction whenever `flush_size`
+items are buffered or `flush_interval` seconds have passed. Pending rows are
+still written first so progress reporting sees hosts in flight; a result that
+finishes before its pending marker was flushed is inserted directly as final.
+The session's completed/success/failed counters are advanced in the same
+transaction as the results they count, and the IDs of the finished rows are
+published to scan_events after the commit. A batch that cannot be written is
+retried and then written item by item, so a database error costs at most the
+rows that actually fail. An optional fence runs first in every transaction;
+when it returns False the batch is dropped (see scan_queue.lease_fence).
+"""
+import queue
+import threading
+import time
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime
+from sqlalchemy import insert, update
+from app import app, db
+from models import ScanResult, ScanSession
+from scan_events import publish_results
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Columns written when a result is finalised (the pending row already has the rest)
+RESULT_UPDATE_COLUMNS = [
+    'status_code', 'ssh_status', 'sudo_status', 'command_status',
+    'command_output', 'server_info', 'error_message', 'execution_time'
+]
+
+# Attempts at writing a whole batch before it is written one item at a time,
+# and the delay (seconds) before the first retry, growing with each attempt
+FLUSH_ATTEMPTS = 3
+FLUSH_RETRY_DELAY = 0.5
+
+_PENDING = 'pending'
+_FINAL = 'final'
+_STOP = object()
+
+
+def result_values(result):
+    """Return the column values of a transient ScanResult as a dict"""
+    return {
+        'scan_session_id': result.scan_session_id,
+        'ip_address': result.ip_address,
+        'status_code': result.status_code,
+        'ssh_status': bool(result.ssh_status),
+        'sudo_status': bool(result.sudo_status),
+        'command_status': bool(result.command_status),
+        'command_output': result.command_output,
+        'server_info': result.server_info,
+        'error_message': result.error_message,
+        'execution_time': result.execution_time,
+        'created_at': result.created_at or datetime.utcnow(),
+    }
+
+
+class ScanResultWriter:
+    """Single-threaded, batching writer for ScanResult rows"""
+    def __init__(self, flush_size=200, flush_interval=1.0, fence=None):
+        """
+        Args:
+            fence: Optional callable run in each write transaction; the batch
+                is rolled back and dropped if it returns False
+        """
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.fence = fence
+        self._queue = queue.Queue()
+        self._pending_ids = {}
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def mark_pending(self, scan_session_id, ip_address):
+        """Record that a host is being scanned"""
+        self._queue.put((_PENDING, {
+            'scan_session_id': scan_session_id,
+            'ip_address': ip_address,
+            'status_code': 'pending',
+            'created_at': datetime.utcnow(),
+        }))
+
+    def submit(self, result):
+        """Queue a finished ScanResult (transient instance) for writing"""
+        self._queue.put((_FINAL, result_values(result)))
+
+    def close(self):
+        """Flush everything still queued and stop the writer thread"""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = None
+            while len(batch) < self.flush_size:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            if batch:
+                self._flush(batch)
+
+    def _flush(self, batch):
+        """Write a batch, retrying it on errors and finally writing it one item at a time"""
+        for attempt in range(1, FLUSH_ATTEMPTS + 1):
+            try:
+                self._write(batch)
+                return
+            except Exception as e:
+                logger.warning(f"Error writing {len(batch)} scan results (attempt {attempt} "
+                               f"of {FLUSH_ATTEMPTS}): {str(e)}")
+                time.sleep(FLUSH_RETRY_DELAY * attempt)
+
+        # Write items on their own so one bad row only loses itself
+        for item in batch:
+            try:
+                self._write([item])
+            except Exception as e:
+                _, values = item
+                logger.error(f"Error writing scan result for {values['ip_address']}: {str(e)}")
+
+    def _write(self, batch):
+        """Write a batch in one transaction and publish the finished rows
+
+        _pending_ids only changes once the transaction is committed, so a failed
+        batch can be written again.
+        """
+        pending = {}
+        finals = []
+        for kind, values in batch:
+            key = (values['scan_session_id'], values['ip_address'])
+            if kind == _PENDING:
+                pending[key] = values
+            elif key in pending:
+                # Finished before its pending marker reached the database
+                del pending[key]
+                finals.append((key, None, values))
+            else:
+                finals.append((key, self._pending_ids.get(key), values))
+
+        # Finished results per (session, status) for the progress counters
+        finished = Counter(
+            (values['scan_session_id'], values['status_code']) for _, _, values in finals
+        )
+
+        inserts = [values for _, row_id, values in finals if row_id is None]
+        updates = [
+            dict({'id': row_id}, **{column: values[column] for column in RESULT_UPDATE_COLUMNS})
+            for _, row_id, values in finals if row_id is not None
+        ]
+
+        # Finished row IDs per session, announced once the transaction is committed
+        finished_ids = defaultdict(list)
+        for _, row_id, values in finals:
+            if row_id is not None:
+                finished_ids[values['scan_session_id']].append(row_id)
+
+        pending_ids = {}
+        with app.app_context():
+            try:
+                if self.fence is not None and not self.fence():
+                    db.session.rollback()
+                    logger.warning(f"Dropped {len(batch)} scan results, the writer's fence failed")
+                    return
+                if pending:
+                    rows = db.session.execute(
+                        insert(ScanResult).returning(
+                            ScanResult.id, ScanResult.scan_session_id, ScanResult.ip_address
+                        ),
+                        list(pending.values())
+                    )
+                    for row in rows:
+                        pending_ids[(row.scan_session_id, row.ip_address)] = row.id
+                if inserts:
+                    rows = db.session.execute(
+                        insert(ScanResult).returning(ScanResult.id, ScanResult.scan_session_id),
+                        inserts
+                    )
+                    for row in rows:
+                        finished_ids[row.scan_session_id].append(row.id)
+                if updates:
+                    db.session.execute(update(ScanResult), updates)
+                for scan_session_id in {session_id for session_id, _ in finished}:
+                    if scan_session_id is not None:
+                        db.session.execute(ScanSession.count_results(
+                            scan_session_id,
+                            success=finished[(scan_session_id, 'success')],
+                            failed=finished[(scan_session_id, 'failed')]
+                        ))
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+
+        self._pending_ids.update(pending_ids)
+        for key, _, _ in finals:
+            self._pending_ids.pop(key, None)
+        for scan_session_id, result_ids in finished_ids.items():
+            publish_results(scan_session_id, result_ids)
@@ -0,0 +1,266 @@
+"""
+Asyncio scan engine and TCP discovery sweep.
+
+TCP connects for every target are driven from a single event loop, so thousands
+of handshakes can be in flight without a thread per host. Only hosts that accept
+the connection are handed, together with their connected socket, to a bounded
+thread pool that runs the blocking paramiko work in execute_ssh_commands; at
+most `concurrency` connected hosts wait for it, the others are reconnected by
+the SSH worker when it gets to them. Unreachable hosts are recorded with the
+same ScanResult semantics as the thread engine ('failed', with the error
+message execute_ssh_commands writes when it cannot connect).
+
+discover_live_hosts runs the same non-blocking connects as an optional pre-pass
+for either engine: only hosts accepting on the SSH port are returned, and the
+rest are bulk-recorded as failed.
+"""
+import asyncio
+import socket
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from sqlalchemy import insert
+from app import app, db
+from models import ScanResult, ScanSession
+from security_utils import mask_sensitive_data
+from scan_events import publish_results
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Default number of TCP connects kept in flight by the event loop
+DEFAULT_CONNECT_CONCURRENCY = 1000
+
+# Maximum number of unreachable hosts written per bulk insert
+FAILURE_INSERT_BATCH_SIZE = 5000
+
+
+async def open_tcp_connection(ip, port, timeout):
+    """Open a TCP connection without blocking the event loop.
+
+    Returns:
+        A connected, blocking socket ready to be handed to paramiko
+    """
+    loop = asyncio.get_running_loop()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setblocking(False)
+    try:
+        await asyncio.wait_for(loop.sock_connect(sock, (ip, port)), timeout)
+    except BaseException:
+        sock.close()
+        raise
+    sock.setblocking(True)
+    return sock
+
+
+def record_connection_failures(scan_session_id, failures, fence=None):
+    """Bulk-insert failed ScanResults for hosts that never accepted the TCP connection
+
+    Args:
+        scan_session_id: ID of the scan session
+        failures: List of (ip, error_message, execution_time) tuples
+        fence: Optional callable run in the transaction; nothing is written if it returns False
+    """
+    if not failures:
+        return
+    with app.app_context():
+        if fence is not None and not fence():
+            db.session.rollback()
+            logger.warning(f"Dropped {len(failures)} connection failures, the fence failed")
+            return
+        rows = db.session.execute(insert(ScanResult).returning(ScanResult.id), [
+            {
+                'scan_session_id': scan_session_id,
+                'ip_address': ip,
+                'status_code': 'failed',
+                'error_message': error_message,
+                'execution_time': execution_time
+            }
+            for ip, error_message, execution_time in failures
+        ])
+        if scan_session_id is not None:
+            db.session.execute(ScanSession.count_results(scan_session_id, failed=len(failures)))
+        result_ids = [row.id for row in rows]
+        db.session.commit()
+    publish_results(scan_session_id, result_ids)
+
+
+def record_connection_failure(ip, scan_session_id, error_message, execution_time):
+    """Store a failed ScanResult for a single unreachable host"""
+    record_connection_failures(scan_session_id, [(ip, error_message, execution_time)])
+
+
+async def _probe_host(ip, port, timeout, semaphore):
+    """Return None if `ip` accepts on `port`, otherwise the failure message"""
+    async with semaphore:
+        try:
+            sock = await open_tcp_connection(ip, port, timeout)
+        except asyncio.TimeoutError:
+            return "Connection timed out"
+        except OSError as e:
+            return f"Socket error: {mask_sensitive_data(str(e))}"
+    sock.close()
+    return None
+
+
+async def discover_hosts(ip_addresses, port, scan_session_id, timeout, concurrency=None, fence=None):
+    """Sweep all targets with non-blocking connects and return the reachable ones"""
+    concurrency = concurrency or DEFAULT_CONNECT_CONCURRENCY
+    semaphore = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    live_hosts = []
+    failures = []
+
+    async def probe(ip):
+        start_time = time.time()
+        error_message = await _probe_host(ip, port, timeout, semaphore)
+        if error_message is None:
+            live_hosts.append(ip)
+        else:
+            failures.append((ip, error_message, time.time() - start_time))
+
+    with ThreadPoolExecutor(max_workers=1) as db_executor:
+        pending = set()
+        for ip in ip_addresses:
+            if len(pending) >= concurrency * 2:
+                _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            pending.add(asyncio.create_task(probe(ip)))
+            if len(failures) >= FAILURE_INSERT_BATCH_SIZE:
+                batch, failures[:] = failures[:], []
+                await loop.run_in_executor(
+                    db_executor, record_connection_failures, scan_session_id, batch, fence
+                )
+        if pending:
+            await asyncio.wait(pending)
+        await loop.run_in_executor(db_executor, record_connection_failures, scan_session_id, failures, fence)
+
+    logger.info(f"Discovery found {len(live_hosts)} reachable hosts on port {port} "
+                f"for scan session {scan_session_id}")
+    return live_hosts
+
+
+def discover_live_hosts(ip_addresses, port=22, scan_session_id=None, timeout=None, concurrency=None,
+                        fence=None):
+    """Run the discovery sweep on a private event loop.
+
+    Unreachable hosts are recorded as failed ScanResults (fenced by `fence`, see
+    record_connection_failures); the reachable ones are returned as a TargetSet
+    for the SSH workers.
+    """
+    from ssh_utils import SSH_CONNECT_TIMEOUT
+    from subnet_utils import TargetSet
+    return TargetSet.from_addresses(asyncio.run(discover_hosts(
+        ip_addresses, port, scan_session_id, timeout or SSH_CONNECT_TIMEOUT, concurrency, fence
+    )))
+
+
+async def _connect_host(ip, ssh_kwargs, connect_semaphore, handoff, db_executor):
+    """Connect to one target and queue it for the SSH workers, or record its failure
+
+    The connect slot is given back as soon as the connect finishes. A
+    connected socket only waits in `handoff` if there is room; otherwise it is
+    closed and the SSH worker connects itself, so no more than `handoff`'s
+    size of connected, unauthenticated sockets sit idle while sshd's
+    LoginGraceTime runs.
+    """
+    from ssh_utils import SSH_CONNECT_TIMEOUT, connection_failure_message
+
+    loop = asyncio.get_running_loop()
+    start_time = time.time()
+    error = None
+
+    async with connect_semaphore:
+        try:
+            sock = await open_tcp_connection(ip, ssh_kwargs.get('port', 22), SSH_CONNECT_TIMEOUT)
+        except asyncio.TimeoutError:
+            error = socket.timeout("timed out")
+        except OSError as e:
+            error = e
+
+    if error is not None:
+        # Recorded with the message the thread engine writes for the same failure
+        error_message = connection_failure_message(ip, error, **ssh_kwargs)
+        result_writer = ssh_kwargs.get('result_writer')
+        if result_writer:
+            result_writer.submit(ScanResult(
+                scan_session_id=ssh_kwargs.get('scan_session_id'),
+                ip_address=ip,
+                status_code='failed',
+                error_message=error_message,
+                execution_time=time.time() - start_time
+            ))
+        else:
+            await loop.run_in_executor(
+                db_executor, record_connection_failure,
+                ip, ssh_kwargs.get('scan_session_id'), error_message, time.time() - start_time
+            )
+        return
+
+    try:
+        handoff.put_nowait((ip, sock))
+    except asyncio.QueueFull:
+        sock.close()
+        await handoff.put((ip, None))
+
+
+async def _serve_hosts(ssh_kwargs, handoff, ssh_executor):
+    """SSH worker: scan queued hosts until it takes None from `handoff`"""
+    from ssh_utils import execute_ssh_commands
+
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await handoff.get()
+        if item is None:
+            return
+        ip, sock = item
+        try:
+            await loop.run_in_executor(
+                ssh_executor, partial(execute_ssh_commands, ip, sock=sock, **ssh_kwargs)
+            )
+        except Exception as e:
+            logger.error(f"Async scan task error: {mask_sensitive_data(str(e))}")
+
+
+async def scan_targets(ip_addresses, ssh_kwargs, concurrency=10, connect_concurrency=None):
+    """Scan every target, keeping at most `connect_concurrency` connects in flight
+
+    `concurrency` SSH workers take connected hosts from a handoff queue of the
+    same size. Results go through ssh_kwargs['result_writer'] when one is supplied.
+    """
+    connect_concurrency = connect_concurrency or DEFAULT_CONNECT_CONCURRENCY
+    connect_semaphore = asyncio.Semaphore(connect_concurrency)
+    handoff = asyncio.Queue(maxsize=concurrency)
+    # Bound the number of scheduled tasks so large target lists are consumed lazily
+    max_pending = connect_concurrency + concurrency
+
+    with ThreadPoolExecutor(max_workers=concurrency) as ssh_executor, \
+            ThreadPoolExecutor(max_workers=1) as db_executor:
+        workers = [asyncio.create_task(_serve_hosts(ssh_kwargs, handoff, ssh_executor))
+                   for _ in range(concurrency)]
+        pending = set()
+        for ip in ip_addresses:
+            if len(pending) >= max_pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                _log_task_errors(done)
+            pending.add(asyncio.create_task(_connect_host(
+                ip, ssh_kwargs, connect_semaphore, handoff, db_executor
+            )))
+        if pending:
+            done, _ = await asyncio.wait(pending)
+            _log_task_errors(done)
+        for _ in workers:
+            await handoff.put(None)
+        await asyncio.wait(workers)
+
+
+def _log_task_errors(tasks):
+    for task in tasks:
+        if task.exception() is not None:
+            logger.error(f"Async scan task error: {mask_sensitive_data(str(task.exception()))}")
+
+
+def run_async_scan(ip_addresses, ssh_kwargs, concurrency=10, connect_concurrency=None):
+    """Run the asyncio engine to completion on a private event loop"""
+    asyncio.run(scan_targets(ip_addresses, ssh_kwargs, concurrency=concurrency,
+                             connect_concurrency=connect_concurrency))
@@ -0,0 +1,102 @@
+"""
+In-process notifications for live scan progress.
+
+Code that commits finished ScanResults calls publish_results() with their IDs,
+and mark_scan_session_completed() calls publish_completed(). Each open
+/scan_events stream holds a subscription for one scan session and turns the
+notifications into server-sent events, so browsers no longer poll for progress
+or re-fetch the whole result list.
+
+Scans run in the web process (app threads and the scheduler), which is why a
+process-local broker is enough; with several worker processes a stream only
+hears about scans started in its own process, and still picks up progress from
+the session counters on every keep-alive. Subscriptions are bounded: a stream
+that falls too far behind is told to resynchronise instead of buffering
+without limit.
+"""
+import queue
+import threading
+import logging
+from collections import defaultdict
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Notifications buffered per subscription before it is marked as overflowed
+SUBSCRIPTION_QUEUE_SIZE = 1000
+
+RESULTS = 'results'
+COMPLETED = 'completed'
+
+
+class Subscription:
+    """Queue of notifications for one scan session"""
+    def __init__(self, scan_session_id, maxsize=SUBSCRIPTION_QUEUE_SIZE):
+        self.scan_session_id = scan_session_id
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def put(self, kind, payload=None):
+        try:
+            self.queue.put_nowait((kind, payload))
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout=None):
+        """Return the next (kind, payload), or None if nothing arrived in time"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def get_nowait(self):
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            return None
+
+
+class ScanEventBroker:
+    """Fans out scan notifications to the subscriptions of each scan session"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, scan_session_id):
+        subscription = Subscription(scan_session_id)
+        with self._lock:
+            self._subscriptions[scan_session_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.scan_session_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.scan_session_id]
+
+    def publish(self, scan_session_id, kind, payload=None):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(scan_session_id, ()))
+        for subscription in subscriptions:
+            subscription.put(kind, payload)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+
+broker = ScanEventBroker()
+
+
+def publish_results(scan_session_id, result_ids):
+    """Announce finished, committed ScanResults of a scan session"""
+    if scan_session_id is None or not result_ids:
+        return
+    broker.publish(scan_session_id, RESULTS, list(result_ids))
+
+
+def publish_completed(scan_session_id):
+    """Announce that a scan session has finished"""
+    broker.publish(scan_session_id, COMPLETED)
@@ -0,0 +1,509 @@
+"""
+Database-backed scan queue for running scans on separate worker nodes.
+
+With DISTRIBUTED_SCANS=enabled, start_scan_session does not scan in the web
+process. enqueue_scan stores the scan's settings (manual credentials
+encrypted) as a ScanJob and splits its targets into ScanBatches of
+SCAN_BATCH_SIZE addresses. Scan workers (worker.py), on any number of
+processes or hosts sharing the database, claim batches one at a time and
+write the results straight into scan_results, so the web app only
+coordinates and adding workers adds throughput.
+
+A claim is a conditional UPDATE that takes a queued batch, or one whose
+lease has expired, and sets a lease of SCAN_BATCH_LEASE seconds; it works the
+same on SQLite and PostgreSQL and only one worker can win it. The worker
+renews the lease while it scans and stops starting hosts if the renewal
+fails because another worker took the batch over. Every write of results
+checks the lease in its own transaction (lease_fence), so hosts still in
+flight on a worker that lost its batch write nothing. Results left behind by
+an earlier attempt are removed, and taken off the session's counters, before
+a batch is scanned again. A batch claimed more than SCAN_BATCH_MAX_ATTEMPTS
+times records its hosts as failed instead of being scanned. The worker that
+finishes the last batch marks the session completed and deletes its job and
+batches.
+"""
+import io
+import os
+import json
+import uuid
+import socket
+import threading
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import insert, update, delete, select, func, or_, and_
+from app import app, db
+from models import CredentialSet, ScanBatch, ScanJob, ScanResult, ScanSession
+from encryption_utils import encrypt_data, decrypt_data
+from scan_events import publish_completed
+from subnet_utils import TargetSet, parse_target_set
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+# Batch rows inserted per statement when a scan is queued
+INSERT_CHUNK = 1000
+
+# Claimable batches a worker tries before giving up on one poll
+CLAIM_CANDIDATES = 16
+
+
+def is_distributed_scanning_enabled():
+    """Check the DISTRIBUTED_SCANS setting ('disabled' by default)"""
+    return os.environ.get('DISTRIBUTED_SCANS', 'disabled').lower() == 'enabled'
+
+
+def _int_setting(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def get_batch_size():
+    """Return the number of addresses per batch (SCAN_BATCH_SIZE, default 256)"""
+    return max(_int_setting('SCAN_BATCH_SIZE', 256), 1)
+
+
+def get_lease_seconds():
+    """Return how long a claimed batch stays leased without renewal (SCAN_BATCH_LEASE, default 300)"""
+    return max(_int_setting('SCAN_BATCH_LEASE', 300), 10)
+
+
+def get_max_attempts():
+    """Return how often a batch is claimed before its hosts are failed (SCAN_BATCH_MAX_ATTEMPTS, default 3)"""
+    return max(_int_setting('SCAN_BATCH_MAX_ATTEMPTS', 3), 1)
+
+
+def _encrypt(value):
+    return encrypt_data(value) if value else None
+
+
+def _decrypt(value):
+    return decrypt_data(value) if value else None
+
+
+def enqueue_scan(scan_session_id, ip_addresses, username, password=None, private_key=None,
+                 commands=None, collect_server_info=False, collect_detailed_info=False,
+                 sudo_password=None, credential_sets=None, concurrency=10, port=22,
+                 engine='thread', connect_concurrency=None, discovery=False,
+                 command_parallelism=1, batch_size=None):
+    """Queue a scan session for scan workers
+
+    Takes the arguments of start_scan_session. Credential sets are stored by
+    ID and read again by the workers.
+
+    Returns:
+        The number of batches queued
+    """
+    import paramiko
+    if isinstance(private_key, paramiko.PKey):
+        key_file = io.StringIO()
+        private_key.write_private_key(key_file)
+        private_key = key_file.getvalue()
+
+    options = {
+        'commands': commands or [],
+        'collect_server_info': bool(collect_server_info),
+        'collect_detailed_info': bool(collect_detailed_info),
+        'concurrency': concurrency,
+        'port': port,
+        'engine': engine,
+        'connect_concurrency': connect_concurrency,
+        'discovery': bool(discovery),
+        'command_parallelism': command_parallelism or 1,
+        'credential_set_ids': [cred.id for cred in credential_sets or []],
+    }
+    if not isinstance(ip_addresses, TargetSet):
+        ip_addresses = TargetSet.from_addresses(ip_addresses)
+
+    batch_count = 0
+    with app.app_context():
+        db.session.add(ScanJob(
+            scan_session_id=scan_session_id,
+            username=username,
+            options=json.dumps(options),
+            password_encrypted=_encrypt(password),
+            private_key_encrypted=_encrypt(private_key),
+            sudo_password_encrypted=_encrypt(sudo_password)
+        ))
+        rows = []
+        for chunk in ip_addresses.chunks(batch_size or get_batch_size()):
+            rows.append({
+                'scan_session_id': scan_session_id,
+                'targets': '\n'.join(chunk.ranges()),
+                'size': len(chunk),
+                'status': QUEUED,
+                'attempts': 0,
+                'created_at': datetime.utcnow(),
+            })
+            if len(rows) >= INSERT_CHUNK:
+                db.session.execute(insert(ScanBatch), rows)
+                batch_count += len(rows)
+                rows = []
+        if rows:
+            db.session.execute(insert(ScanBatch), rows)
+            batch_count += len(rows)
+        db.session.commit()
+
+    logger.info(f"Queued scan session {scan_session_id} as {batch_count} batches")
+    if not batch_count:
+        complete_session_if_finished(scan_session_id)
+    return batch_count
+
+
+def _claimable(now):
+    return or_(
+        ScanBatch.status == QUEUED,
+        and_(ScanBatch.status == LEASED, ScanBatch.lease_expires_at < now)
+    )
+
+
+def claim_batch(worker_id, lease_seconds=None):
+    """Lease the oldest claimable batch to `worker_id`
+
+    Returns:
+        The claimed ScanBatch (detached, with `attempts` counting this claim), or None
+    """
+    lease_seconds = lease_seconds or get_lease_seconds()
+    with app.app_context():
+        now = datetime.utcnow()
+        candidates = db.session.execute(
+            select(ScanBatch.id).where(_claimable(now)).order_by(ScanBatch.id).limit(CLAIM_CANDIDATES)
+        ).scalars().all()
+        for batch_id in candidates:
+            # Compare-and-set: the WHERE clause only matches while nobody else holds the batch
+            claimed = db.session.execute(
+                update(ScanBatch)
+                .where(ScanBatch.id == batch_id, _claimable(now))
+                .values(status=LEASED, worker_id=worker_id,
+                        lease_expires_at=now + timedelta(seconds=lease_seconds),
+                        attempts=ScanBatch.attempts + 1)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.session.commit()
+            if claimed == 1:
+                batch = db.session.get(ScanBatch, batch_id)
+                db.session.expunge(batch)
+                return batch
+        return None
+
+
+def _own_batch_update(batch_id, worker_id, values):
+    """UPDATE statement that only matches while `worker_id` holds the batch's lease"""
+    return (
+        update(ScanBatch)
+        .where(ScanBatch.id == batch_id, ScanBatch.worker_id == worker_id, ScanBatch.status == LEASED)
+        .values(values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _update_own_batch(batch_id, worker_id, values):
+    """Update a batch only while `worker_id` holds its lease; returns True if it did"""
+    with app.app_context():
+        updated = db.session.execute(_own_batch_update(batch_id, worker_id, values)).rowcount
+        db.session.commit()
+        return updated == 1
+
+
+def lease_fence(batch_id, worker_id, lease_seconds=None):
+    """Return a fence for the result writes of a leased batch
+
+    The fence runs in the transaction of each write: it renews the lease and
+    returns True while `worker_id` still holds the batch, False once another
+    worker has taken it over, and the write is then rolled back. Its UPDATE
+    locks the batch row until that transaction ends, so a takeover is ordered
+    either before the write (which is dropped) or after it (and the new owner
+    clears the write again).
+    """
+    lease_seconds = lease_seconds or get_lease_seconds()
+
+    def fence():
+        values = {'lease_expires_at': datetime.utcnow() + timedelta(seconds=lease_seconds)}
+        return db.session.execute(_own_batch_update(batch_id, worker_id, values)).rowcount == 1
+    return fence
+
+
+def renew_lease(batch_id, worker_id, lease_seconds=None):
+    """Extend a batch's lease; returns False once another worker has taken it over"""
+    lease_seconds = lease_seconds or get_lease_seconds()
+    return _update_own_batch(batch_id, worker_id,
+                             {'lease_expires_at': datetime.utcnow() + timedelta(seconds=lease_seconds)})
+
+
+def release_batch(batch_id, worker_id, count_attempt=True):
+    """Put a leased batch back in the queue
+
+    Args:
+        count_attempt: False when the worker is shutting down, so the interrupted
+            run does not count towards SCAN_BATCH_MAX_ATTEMPTS
+    """
+    values = dict(status=QUEUED, worker_id=None, lease_expires_at=None)
+    if not count_attempt:
+        values['attempts'] = ScanBatch.attempts - 1
+    return _update_own_batch(batch_id, worker_id, values)
+
+
+def finish_batch(batch, worker_id, status=DONE):
+    """Mark a leased batch done (or failed) and complete its session if it was the last one
+
+    Returns:
+        False if the lease had been lost and the batch was left to its new owner
+    """
+    if not _update_own_batch(batch.id, worker_id, {'status': status, 'completed_at': datetime.utcnow()}):
+        return False
+    complete_session_if_finished(batch.scan_session_id)
+    return True
+
+
+def complete_session_if_finished(scan_session_id):
+    """Mark a queued scan session completed once none of its batches are left
+
+    Only one caller wins the status change; it also removes the session's job,
+    with the stored credentials, and its batches.
+
+    Returns:
+        True if this call completed the session
+    """
+    with app.app_context():
+        remaining = db.session.execute(
+            select(func.count(ScanBatch.id))
+            .where(ScanBatch.scan_session_id == scan_session_id,
+                   ScanBatch.status.in_([QUEUED, LEASED]))
+        ).scalar()
+        if remaining:
+            return False
+        completed = db.session.execute(
+            update(ScanSession)
+            .where(ScanSession.id == scan_session_id, ScanSession.status == 'running')
+            .values(status='completed', completed_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if completed:
+            db.session.execute(delete(ScanBatch).where(ScanBatch.scan_session_id == scan_session_id))
+            db.session.execute(delete(ScanJob).where(ScanJob.scan_session_id == scan_session_id))
+        db.session.commit()
+    if completed:
+        logger.info(f"Scan session {scan_session_id} completed by the scan workers")
+        publish_completed(scan_session_id)
+    return bool(completed)
+
+
+def batch_addresses(batch):
+    """Return the addresses of a batch as a list of dotted-quad strings"""
+    return list(parse_target_set(batch.targets))
+
+
+def clear_batch_results(batch, addresses=None, fence=None):
+    """Delete the results an earlier attempt wrote for a batch's hosts
+
+    Finished results are taken off the session's counters in the same transaction.
+
+    Args:
+        fence: Optional lease_fence(); nothing is deleted once it fails
+
+    Returns:
+        The number of result rows deleted, None if the fence failed
+    """
+    addresses = addresses if addresses is not None else batch_addresses(batch)
+    in_batch = and_(ScanResult.scan_session_id == batch.scan_session_id,
+                    ScanResult.ip_address.in_(addresses))
+    with app.app_context():
+        if fence is not None and not fence():
+            db.session.rollback()
+            return None
+        counts = dict(db.session.execute(
+            select(ScanResult.status_code, func.count(ScanResult.id))
+            .where(in_batch)
+            .group_by(ScanResult.status_code)
+        ).all())
+        if not counts:
+            db.session.commit()
+            return 0
+        db.session.execute(delete(ScanResult).where(in_batch).execution_options(synchronize_session=False))
+        db.session.execute(ScanSession.count_results(
+            batch.scan_session_id, success=-counts.get('success', 0), failed=-counts.get('failed', 0)
+        ))
+        db.session.commit()
+    return sum(counts.values())
+
+
+def load_scan_job(scan_session_id):
+    """Return the start_scan_session arguments of a queued scan, or None if it is gone
+
+    Secrets are decrypted and the session's credential sets are read from the
+    database as ScanCredentials, in the order they were queued.
+    """
+    from ssh_utils import prepare_credentials
+    with app.app_context():
+        job = ScanJob.query.filter_by(scan_session_id=scan_session_id).first()
+        if job is None:
+            return None
+        options = json.loads(job.options)
+        credential_sets = None
+        credential_set_ids = options.pop('credential_set_ids')
+        if credential_set_ids:
+            by_id = {cred.id: cred for cred in
+                     CredentialSet.query.filter(CredentialSet.id.in_(credential_set_ids)).all()}
+            credential_sets = prepare_credentials(
+                [by_id[cred_id] for cred_id in credential_set_ids if cred_id in by_id]
+            )
+        return dict(
+            options,
+            username=job.username,
+            password=_decrypt(job.password_encrypted),
+            private_key=_decrypt(job.private_key_encrypted),
+            sudo_password=_decrypt(job.sudo_password_encrypted),
+            credential_sets=credential_sets
+        )
+
+
+class _LeaseKeeper:
+    """Renews a batch's lease in a background thread while the worker scans it"""
+    def __init__(self, batch_id, worker_id, lease_seconds):
+        self.batch_id = batch_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.lost = threading.Event()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+
+    def _run(self):
+        while not self._done.wait(self.lease_seconds / 3):
+            try:
+                renewed = renew_lease(self.batch_id, self.worker_id, self.lease_seconds)
+            except Exception as e:
+                # The lease may still be valid; try again on the next round
+                logger.error(f"Could not renew the lease of batch {self.batch_id}: {str(e)}")
+                continue
+            if not renewed:
+                logger.warning(f"Lost the lease of batch {self.batch_id}, stopping it")
+                self.lost.set()
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._done.set()
+        self._thread.join()
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class ScanWorker:
+    """Claims batches from the scan queue and scans them, one batch at a time
+
+    Run one per process; start more processes or nodes for more throughput.
+    """
+    def __init__(self, worker_id=None, concurrency=None, poll_interval=5.0, lease_seconds=None,
+                 max_attempts=None):
+        """
+        Args:
+            concurrency: Hosts scanned at once; defaults to each scan's own setting
+            poll_interval: Seconds to wait when the queue is empty
+        """
+        self.worker_id = worker_id or default_worker_id()
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds or get_lease_seconds()
+        self.max_attempts = max_attempts or get_max_attempts()
+        self.stop_event = threading.Event()
+
+    def stop(self):
+        """Stop after the hosts that are already being scanned; the rest of the batch is released"""
+        self.stop_event.set()
+
+    def run(self, stop_when_idle=False):
+        """Process batches until stop() is called (or the queue is empty, with stop_when_idle)"""
+        logger.info(f"Scan worker {self.worker_id} started")
+        while not self.stop_event.is_set():
+            try:
+                processed = self.run_once()
+            except Exception as e:
+                logger.error(f"Scan worker {self.worker_id} error: {str(e)}")
+                processed = False
+            if not processed:
+                if stop_when_idle:
+                    break
+                self.stop_event.wait(self.poll_interval)
+        logger.info(f"Scan worker {self.worker_id} stopped")
+
+    def run_once(self):
+        """Claim and process one batch; returns False if there was nothing to claim"""
+        batch = claim_batch(self.worker_id, self.lease_seconds)
+        if batch is None:
+            return False
+        try:
+            self.process_batch(batch)
+        except Exception:
+            release_batch(batch.id, self.worker_id)
+            raise
+        return True
+
+    def process_batch(self, batch):
+        from ssh_utils import prepare_scan, run_scan
+        from scan_engine import record_connection_failures
+
+        job = load_scan_job(batch.scan_session_id)
+        addresses = batch_addresses(batch)
+        # Every result write checks that this worker still holds the batch
+        fence = lease_fence(batch.id, self.worker_id, self.lease_seconds)
+        cleared = clear_batch_results(batch, addresses, fence=fence)
+        if cleared is None:
+            logger.warning(f"Lost the lease of batch {batch.id} before scanning it")
+            return
+        if cleared:
+            logger.info(f"Removed {cleared} results of an earlier attempt at batch {batch.id}")
+
+        if job is None or batch.attempts > self.max_attempts:
+            reason = ("Scan job is missing" if job is None
+                      else f"Scan batch failed after {batch.attempts - 1} attempts")
+            logger.error(f"Batch {batch.id} of scan session {batch.scan_session_id}: {reason}")
+            record_connection_failures(batch.scan_session_id, [(ip, reason, 0) for ip in addresses],
+                                       fence=fence)
+            finish_batch(batch, self.worker_id, FAILED)
+            return
+
+        logger.info(f"Scanning batch {batch.id} ({batch.size} hosts) of scan session "
+                    f"{batch.scan_session_id}, attempt {batch.attempts}")
+        with app.app_context():
+            ssh_kwargs, credential_cache = prepare_scan(
+                batch.scan_session_id, job['username'], password=job['password'],
+                private_key=job['private_key'], commands=job['commands'],
+                collect_server_info=job['collect_server_info'],
+                collect_detailed_info=job['collect_detailed_info'],
+                sudo_password=job['sudo_password'], credential_sets=job['credential_sets'],
+                port=job['port'], command_parallelism=job['command_parallelism'], targets=addresses
+            )
+
+        interrupted = threading.Event()
+        with _LeaseKeeper(batch.id, self.worker_id, self.lease_seconds) as lease:
+            def should_stop():
+                if lease.lost.is_set() or self.stop_event.is_set():
+                    interrupted.set()
+                return interrupted.is_set()
+
+            run_scan(addresses, ssh_kwargs, concurrency=self.concurrency or job['concurrency'],
+                     port=job['port'], engine=job['engine'],
+                     connect_concurrency=job['connect_concurrency'], discovery=job['discovery'],
+                     should_stop=should_stop, fence=fence)
+        if credential_cache is not None:
+            credential_cache.flush()
+
+        if lease.lost.is_set():
+            return
+        if interrupted.is_set():
+            release_batch(batch.id, self.worker_id, count_attempt=False)
+            logger.info(f"Released batch {batch.id} for another worker")
+            return
+        finish_batch(batch, self.worker_id)
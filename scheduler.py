@@ -9,7 +9,8 @@ import os
 from app import db, app
 from models import ScheduledScan, ScanSession
 from ssh_utils import start_scan_session
-from subnet_utils import parse_subnet_input
+from ssh_pool import get_connection_pool
+from subnet_utils import parse_target_set
 from encryption_utils import decrypt_data
 
 # Configure logging
@@ -60,6 +61,11 @@ class SchedulerService:
             except Exception as e:
                 logger.error(f"Error in scheduler: {str(e)}")
             
+            # Close pooled connections that no schedule has used for a while
+            connection_pool = get_connection_pool()
+            if connection_pool is not None:
+                connection_pool.prune()
+            
             # Wait for the next check interval or until stop_event is set
             self.stop_event.wait(self.check_interval)
     
@@ -92,15 +98,17 @@ class SchedulerService:
         """Execute a scheduled scan"""
         try:
             # Parse subnets to get IP addresses
-            ip_addresses = parse_subnet_input(scheduled_scan.subnets)
+            ip_addresses = parse_target_set(scheduled_scan.subnets)
             if not ip_addresses:
                 logger.warning(f"No valid IP addresses found for scheduled scan {scheduled_scan.id}")
                 return
             
             # Get commands
             commands = []
+            command_parallelism = 1
             if scheduled_scan.command_template_id:
                 commands = scheduled_scan.command_template.commands.splitlines()
+                command_parallelism = scheduled_scan.command_template.command_parallelism or 1
             if scheduled_scan.custom_commands:
                 commands.extend(scheduled_scan.custom_commands.splitlines())
             
@@ -144,7 +152,9 @@ class SchedulerService:
                 commands=commands,
                 collect_server_info=scheduled_scan.collect_server_info,
                 collect_detailed_info=scheduled_scan.collect_detailed_info,
-                concurrency=scheduled_scan.concurrency
+                concurrency=scheduled_scan.concurrency,
+                connection_pool=get_connection_pool(),
+                command_parallelism=command_parallelism
             )
             
             logger.info(f"Scheduled scan {scheduled_scan.id} started with scan session {scan_session.id}")
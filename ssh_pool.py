@@ -0,0 +1,176 @@
+"""
+Opt-in pool of authenticated SSH connections for repeated scans of the same hosts.
+
+Scheduled scans hit the same fleet over and over, and each run normally pays for
+a TCP connect, key exchange and authentication per host. With the pool enabled
+(SSH_CONNECTION_POOL=enabled), a host's client is handed back to the pool after a
+successful scan instead of being closed, keyed by (host, port, username), and
+the next run picks it up again.
+
+Connections are checked out exclusively, so a pooled client is only ever used by
+one worker at a time. The pool is bounded: beyond SSH_CONNECTION_POOL_SIZE the
+least recently used connection is closed, connections idle for longer than
+SSH_CONNECTION_POOL_IDLE_TIMEOUT seconds are closed, and every checkout opens
+and closes a session channel first so connections the server has dropped are
+discarded rather than used.
+
+The pool only pays off when a scan's hosts fit into it: a scan with more
+targets than SSH_CONNECTION_POOL_SIZE, run in the same order every time,
+would evict each connection before the next run reached its host again, so
+such scans do not use the pool at all (see SSHConnectionPool.for_scan).
+"""
+import os
+import time
+import atexit
+import threading
+import logging
+from collections import OrderedDict
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Seconds a health check may take before the connection is considered dead
+HEALTH_CHECK_TIMEOUT = 5
+
+
+def is_connection_pool_enabled():
+    """Check the SSH_CONNECTION_POOL setting ('disabled' by default)"""
+    return os.environ.get('SSH_CONNECTION_POOL', 'disabled').lower() == 'enabled'
+
+
+def _int_setting(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+class _PoolEntry:
+    __slots__ = ('client', 'credential_id', 'last_used')
+
+    def __init__(self, client, credential_id):
+        self.client = client
+        self.credential_id = credential_id
+        self.last_used = time.monotonic()
+
+
+def _close_client(client):
+    try:
+        client.close()
+    except Exception as e:
+        logger.debug(f"Error closing pooled SSH connection: {str(e)}")
+
+
+def is_client_healthy(client, timeout=HEALTH_CHECK_TIMEOUT):
+    """Return True if the client's transport is authenticated and answers a channel open"""
+    transport = client.get_transport()
+    if transport is None or not transport.is_active() or not transport.is_authenticated():
+        return False
+    try:
+        channel = transport.open_session(timeout=timeout)
+        channel.close()
+        return True
+    except Exception as e:
+        logger.debug(f"Pooled SSH connection failed health check: {str(e)}")
+        return False
+
+
+class SSHConnectionPool:
+    """LRU pool of authenticated paramiko SSHClients keyed by (host, port, username)"""
+    def __init__(self, max_size=500, idle_timeout=3900):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def for_scan(self, target_count):
+        """Return the pool if a scan of `target_count` hosts can reuse its connections, else None
+
+        With more targets than the pool holds, an LRU pool scanned in the same
+        order every run evicts every connection before it is reused.
+        """
+        if target_count > self.max_size:
+            logger.info(f"Not pooling SSH connections for a scan of {target_count} hosts "
+                        f"(pool size {self.max_size})")
+            return None
+        return self
+
+    def acquire(self, host, port, username):
+        """Check out a live pooled connection
+
+        Returns:
+            (client, credential_id) of the pooled connection, or (None, None)
+        """
+        with self._lock:
+            entry = self._entries.pop((host, port, username), None)
+        if entry is None:
+            return None, None
+        if time.monotonic() - entry.last_used > self.idle_timeout or not is_client_healthy(entry.client):
+            _close_client(entry.client)
+            return None, None
+        return entry.client, entry.credential_id
+
+    def release(self, host, port, username, client, credential_id=None):
+        """Return a connection to the pool, evicting the least recently used one if full"""
+        transport = client.get_transport()
+        if self.max_size <= 0 or transport is None or not transport.is_active():
+            _close_client(client)
+            return
+        evicted = []
+        with self._lock:
+            key = (host, port, username)
+            previous = self._entries.pop(key, None)
+            if previous is not None and previous.client is not client:
+                evicted.append(previous.client)
+            self._entries[key] = _PoolEntry(client, credential_id)
+            while len(self._entries) > self.max_size:
+                _, oldest = self._entries.popitem(last=False)
+                evicted.append(oldest.client)
+        for evicted_client in evicted:
+            _close_client(evicted_client)
+
+    def prune(self):
+        """Close connections that have been idle for longer than the idle timeout"""
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if now - entry.last_used > self.idle_timeout:
+                    expired.append(self._entries.pop(key).client)
+        for client in expired:
+            _close_client(client)
+        if expired:
+            logger.info(f"Closed {len(expired)} idle pooled SSH connections")
+        return len(expired)
+
+    def close_all(self):
+        """Close every pooled connection"""
+        with self._lock:
+            entries, self._entries = list(self._entries.values()), OrderedDict()
+        for entry in entries:
+            _close_client(entry.client)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_connection_pool():
+    """Return the process-wide connection pool, or None if pooling is disabled"""
+    global _pool
+    if not is_connection_pool_enabled():
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = SSHConnectionPool(
+                max_size=_int_setting('SSH_CONNECTION_POOL_SIZE', 500),
+                idle_timeout=_int_setting('SSH_CONNECTION_POOL_IDLE_TIMEOUT', 3900),
+            )
+            atexit.register(_pool.close_all)
+            logger.info(f"SSH connection pool enabled (max {_pool.max_size} connections, "
+                        f"idle timeout {_pool.idle_timeout}s)")
+        return _pool
@@ -1,3 +1,5 @@
+import os
+import errno
 import paramiko
 import socket
 import threading
@@ -5,23 +7,103 @@ import time
 import logging
 import json
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from app import app, db
 from models import ScanResult, ScanSession
 from encryption_utils import encrypt_data, decrypt_data
+from credential_cache import CredentialCache, is_credential_cache_enabled
+from scan_events import publish_results, publish_completed
+from subnet_utils import TargetSet
+from channel_io import read_channel, get_command_timeout, get_max_output_bytes, get_output_tail_bytes
 from security_utils import (
-    sanitize_command, validate_commands_list, get_safe_commands,
+    sanitize_command, get_safe_commands, partition_commands,
     mask_sensitive_data, mask_command_output
 )
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Seconds to wait for the TCP connection and SSH banner of a single host
+SSH_CONNECT_TIMEOUT = 10
+
+# Seconds to wait for the sudo permission check
+SUDO_CHECK_TIMEOUT = 10
+
+# Upper bound for commands run concurrently on one host (sshd's MaxSessions defaults to 10)
+MAX_COMMAND_PARALLELISM = 10
+
+
+# PEM armour labels that name the key type directly
+_PEM_KEY_TYPES = {
+    'RSA PRIVATE KEY': 'RSAKey',
+    'EC PRIVATE KEY': 'ECDSAKey',
+    'DSA PRIVATE KEY': 'DSSKey',
+}
+
+# Public key algorithm names found inside OpenSSH-format private keys
+_OPENSSH_KEY_TYPES = {
+    'ssh-rsa': 'RSAKey',
+    'ssh-ed25519': 'Ed25519Key',
+    'ssh-dss': 'DSSKey',
+}
+
+_OPENSSH_MAGIC = b'openssh-key-v1\x00'
+
+
+def _read_ssh_string(data, offset):
+    length = int.from_bytes(data[offset:offset + 4], 'big')
+    start = offset + 4
+    return data[start:start + length], start + length
+
+
+def detect_key_class(key_data):
+    """Return the paramiko key class for a private key, or None if it cannot be told
+
+    Classic PEM keys name their type in the armour line. OpenSSH-format keys
+    carry the public key, whose first field is the algorithm name, in the
+    unencrypted header, so no parsing attempt is needed for either.
+    """
+    import base64
+    import binascii
+    lines = key_data.strip().splitlines()
+    if not lines or not lines[0].startswith('-----BEGIN '):
+        return None
+    label = lines[0][len('-----BEGIN '):].rstrip('-').strip()
+    if label in _PEM_KEY_TYPES:
+        return getattr(paramiko, _PEM_KEY_TYPES[label], None)
+    if label != 'OPENSSH PRIVATE KEY':
+        return None
+    body = ''.join(line.strip() for line in lines[1:] if not line.startswith('-----'))
+    try:
+        blob = base64.b64decode(body)
+    except (binascii.Error, ValueError):
+        return None
+    if not blob.startswith(_OPENSSH_MAGIC):
+        return None
+    offset = len(_OPENSSH_MAGIC)
+    for _ in range(3):  # cipher name, KDF name, KDF options
+        _, offset = _read_ssh_string(blob, offset)
+    offset += 4  # number of keys
+    public_key, _ = _read_ssh_string(blob, offset)
+    key_type, _ = _read_ssh_string(public_key, 0)
+    key_type = key_type.decode('ascii', errors='replace')
+    if key_type.startswith('ecdsa-sha2-'):
+        return getattr(paramiko, 'ECDSAKey', None)
+    return getattr(paramiko, _OPENSSH_KEY_TYPES.get(key_type, ''), None)
+
 
 def load_private_key(key_data):
-    """Load a private key, trying multiple key types (RSA, Ed25519, ECDSA, DSA)"""
+    """Load a private key, detecting its type (RSA, Ed25519, ECDSA, DSA) from the key data
+
+    Falls back to trying each key type in turn for formats whose type cannot be
+    read from the header (e.g. PKCS#8).
+    """
     import io
     key_file = io.StringIO(key_data)
+    detected_class = detect_key_class(key_data)
+    if detected_class is not None:
+        return detected_class.from_private_key(file_obj=key_file)
+
     key_classes = [
         getattr(paramiko, "RSAKey", None),
         getattr(paramiko, "Ed25519Key", None),
@@ -38,136 +120,301 @@ def load_private_key(key_data):
             continue
     raise paramiko.SSHException("Unable to parse private key - unsupported key type")
 
-def collect_server_info(ssh_client, detailed=False):
+
+class ScanCredential:
+    """Decrypted copy of a CredentialSet, prepared once per scan session
+
+    Workers only read these, so one instance is safely shared by every thread
+    of the scan and no ORM instance has to outlive the request that started it.
+    """
+    __slots__ = ('id', 'username', 'auth_type', 'priority', 'password', 'pkey', 'sudo_password', 'error')
+
+    def __init__(self, id, username, auth_type, priority=0, password=None, pkey=None,
+                 sudo_password=None, error=None):
+        self.id = id
+        self.username = username
+        self.auth_type = auth_type
+        self.priority = priority or 0
+        self.password = password
+        self.pkey = pkey
+        self.sudo_password = sudo_password
+        self.error = error
+
+    @classmethod
+    def from_credential_set(cls, credential_set):
+        """Decrypt the secrets of a CredentialSet and parse its private key"""
+        credential = cls(credential_set.id, credential_set.username, credential_set.auth_type,
+                         credential_set.priority)
+        try:
+            if credential_set.auth_type == 'key' and credential_set.private_key_encrypted:
+                credential.pkey = load_private_key(decrypt_data(credential_set.private_key_encrypted))
+            elif credential_set.auth_type == 'password' and credential_set.password_encrypted:
+                credential.password = decrypt_data(credential_set.password_encrypted)
+            if credential_set.sudo_password_encrypted:
+                credential.sudo_password = decrypt_data(credential_set.sudo_password_encrypted)
+        except Exception as e:
+            # Reported per host, like a failed login, instead of aborting the scan
+            credential.error = str(e)
+        return credential
+
+
+def prepare_credentials(credential_sets):
+    """Return ScanCredentials for `credential_sets`, decrypting each one only once"""
+    if not credential_sets:
+        return credential_sets
+    return [
+        cred if isinstance(cred, ScanCredential) else ScanCredential.from_credential_set(cred)
+        for cred in credential_sets
+    ]
+
+
+def prepare_private_key(private_key):
+    """Parse a private key once for a whole scan; unparseable keys are left as text
+    so the error is reported per host"""
+    if not private_key or isinstance(private_key, paramiko.PKey):
+        return private_key
+    try:
+        return load_private_key(private_key)
+    except Exception:
+        return private_key
+
+def _parse_lines(output):
+    return output.split('\n')
+
+def _parse_os_release(output):
+    os_info = {}
+    for line in output.split('\n'):
+        if '=' in line:
+            key, value = line.split('=', 1)
+            os_info[key] = value.strip('"')
+    return os_info
+
+def _parse_lscpu(output):
+    cpu_info = {}
+    for line in output.split('\n'):
+        if ':' in line:
+            key, value = line.split(':', 1)
+            cpu_info[key.strip()] = value.strip()
+    return cpu_info
+
+def _parse_free(output):
+    memory_lines = output.split('\n')
+    if len(memory_lines) < 2:
+        return None
+    memory_parts = memory_lines[1].split()
+    return {
+        'total': f"{memory_parts[1]} MB",
+        'used': f"{memory_parts[2]} MB",
+        'free': f"{memory_parts[3]} MB"
+    }
+
+def _parse_network(output):
+    try:
+        return json.loads(output)
+    except json.JSONDecodeError:
+        # Fallback output of `ip addr` when json output is not available
+        return output.split('\n')
+
+def _parse_virtualization(output):
+    return output if output else "Not detected"
+
+# Server information probes: (key, command, parser, detailed_only).
+# Parsers receive the stripped stdout of the command; returning None skips the key.
+SERVER_INFO_PROBES = [
+    ('hostname', "hostname -f", None, False),
+    ('os', "cat /etc/os-release", _parse_os_release, False),
+    ('kernel', "uname -r", None, False),
+    ('cpu', "lscpu", _parse_lscpu, False),
+    ('memory', "free -m", _parse_free, False),
+    ('disk', "df -h", _parse_lines, False),
+    ('network', "ip -j addr", _parse_network, False),
+    ('uptime', "uptime -p", None, False),
+    ('dns_config', "cat /etc/resolv.conf", _parse_lines, True),
+    ('running_services', "systemctl list-units --type=service --state=running", _parse_lines, True),
+    # Installed packages (limit to 100 to avoid huge data transfer)
+    ('installed_packages', "dpkg-query -l | head -100", _parse_lines, True),
+    ('network_connections', "ss -tuln", _parse_lines, True),
+    ('ethernet_cards', "lshw -class network -short", _parse_lines, True),
+    ('user_accounts', "cat /etc/passwd | grep -v nologin | grep -v false", _parse_lines, True),
+    ('load_average', "cat /proc/loadavg", None, True),
+    ('default_gateway', "ip route | grep default", None, True),
+    ('firewall_rules', "iptables -L -n", _parse_lines, True),
+    ('virtualization', "hostnamectl | grep Virtualization", _parse_virtualization, True),
+]
+
+# In batched mode `ip -j addr` falls back to plain `ip addr` inside the script
+_BATCHED_COMMAND_OVERRIDES = {
+    'network': "ip -j addr 2>/dev/null || ip addr",
+}
+
+def _server_info_probes(detailed):
+    return [probe for probe in SERVER_INFO_PROBES if detailed or not probe[3]]
+
+def _apply_probe(server_info, key, parser, output):
+    value = parser(output) if parser else output
+    if value is not None:
+        server_info[key] = value
+
+def _is_server_info_batching_enabled():
+    """Check if single-channel server info collection is enabled via environment variable."""
+    return os.environ.get('SERVER_INFO_BATCHING', 'enabled').lower() != 'disabled'
+
+def _collect_server_info_per_command(ssh_client, detailed):
+    """Run every probe on its own exec channel (one round trip per probe)"""
+    server_info = {}
+    for key, command, parser, _ in _server_info_probes(detailed):
+        stdin, stdout, stderr = ssh_client.exec_command(command)
+        output = stdout.read().decode().strip()
+        if key == 'network':
+            try:
+                server_info['network'] = json.loads(output)
+            except json.JSONDecodeError:
+                # Fallback if json output not available
+                stdin, stdout, stderr = ssh_client.exec_command("ip addr")
+                server_info['network'] = stdout.read().decode().strip().split('\n')
+            continue
+        _apply_probe(server_info, key, parser, output)
+    return server_info
+
+def build_server_info_script(probes, marker):
+    """Build a shell script running all probes with a section marker before each output"""
+    lines = []
+    for key, command, _, _ in probes:
+        command = _BATCHED_COMMAND_OVERRIDES.get(key, command)
+        lines.append(f"printf '\\n{marker} %s\\n' '{key}'")
+        lines.append(f"{{ {command} ; }} 2>/dev/null")
+    return '\n'.join(lines) + '\n'
+
+def parse_server_info_sections(output, marker):
+    """Split batched script output into {key: stripped section output}"""
+    sections = {}
+    current_key = None
+    current_lines = []
+    for line in output.split('\n'):
+        if line.startswith(marker + ' '):
+            if current_key is not None:
+                sections[current_key] = '\n'.join(current_lines).strip()
+            current_key = line[len(marker) + 1:].strip()
+            current_lines = []
+        elif current_key is not None:
+            current_lines.append(line)
+    if current_key is not None:
+        sections[current_key] = '\n'.join(current_lines).strip()
+    return sections
+
+def _collect_server_info_batched(ssh_client, detailed):
+    """Run all probes as one script over a single exec channel"""
+    import uuid
+    probes = _server_info_probes(detailed)
+    marker = f"__SUBNET_WHISPERER_{uuid.uuid4().hex}__"
+
+    # The script is fed to `sh -s` on stdin so it runs the same under any login shell
+    stdin, stdout, stderr = ssh_client.exec_command("sh -s")
+    stdin.write(build_server_info_script(probes, marker))
+    stdin.flush()
+    stdin.channel.shutdown_write()
+    sections = parse_server_info_sections(stdout.read().decode(errors='replace'), marker)
+    if not sections:
+        raise paramiko.SSHException("Batched server info script produced no output")
+
+    server_info = {}
+    for key, _, parser, _ in probes:
+        _apply_probe(server_info, key, parser, sections.get(key, ''))
+    return server_info
+
+def collect_server_info(ssh_client, detailed=False, batched=None):
     """Collect server information using SSH client
     
     Args:
         ssh_client: Paramiko SSH client
         detailed: Whether to collect detailed information (more commands, deeper analysis)
+        batched: Send all probes as one script over a single channel instead of one
+            channel per probe. Defaults to the SERVER_INFO_BATCHING environment variable.
     
     Returns:
         Dictionary containing server information
     """
-    server_info = {}
-    
-    try:
-        # Hostname information
-        stdin, stdout, stderr = ssh_client.exec_command("hostname -f")
-        server_info['hostname'] = stdout.read().decode().strip()
-        
-        # OS information
-        stdin, stdout, stderr = ssh_client.exec_command("cat /etc/os-release")
-        os_data = stdout.read().decode().strip()
-        os_info = {}
-        for line in os_data.split('\n'):
-            if '=' in line:
-                key, value = line.split('=', 1)
-                os_info[key] = value.strip('"')
-        server_info['os'] = os_info
-        
-        # Kernel information
-        stdin, stdout, stderr = ssh_client.exec_command("uname -r")
-        server_info['kernel'] = stdout.read().decode().strip()
-        
-        # Hardware information
-        stdin, stdout, stderr = ssh_client.exec_command("lscpu")
-        cpu_info = {}
-        for line in stdout.read().decode().strip().split('\n'):
-            if ':' in line:
-                key, value = line.split(':', 1)
-                cpu_info[key.strip()] = value.strip()
-        server_info['cpu'] = cpu_info
-        
-        # Memory information
-        stdin, stdout, stderr = ssh_client.exec_command("free -m")
-        memory_lines = stdout.read().decode().strip().split('\n')
-        if len(memory_lines) >= 2:
-            memory_parts = memory_lines[1].split()
-            server_info['memory'] = {
-                'total': f"{memory_parts[1]} MB",
-                'used': f"{memory_parts[2]} MB",
-                'free': f"{memory_parts[3]} MB"
-            }
-        
-        # Disk information
-        stdin, stdout, stderr = ssh_client.exec_command("df -h")
-        disk_info = stdout.read().decode().strip().split('\n')
-        server_info['disk'] = disk_info
-        
-        # Network interfaces
-        stdin, stdout, stderr = ssh_client.exec_command("ip -j addr")
+    if batched is None:
+        batched = _is_server_info_batching_enabled()
+
+    if batched:
         try:
-            network_info = json.loads(stdout.read().decode().strip())
-            server_info['network'] = network_info
-        except json.JSONDecodeError:
-            # Fallback if json output not available
-            stdin, stdout, stderr = ssh_client.exec_command("ip addr")
-            server_info['network'] = stdout.read().decode().strip().split('\n')
-        
-        # Uptime
-        stdin, stdout, stderr = ssh_client.exec_command("uptime -p")
-        server_info['uptime'] = stdout.read().decode().strip()
-        
-        # Only collect detailed information if requested
-        if detailed:
-            # DNS configuration
-            stdin, stdout, stderr = ssh_client.exec_command("cat /etc/resolv.conf")
-            dns_info = stdout.read().decode().strip().split('\n')
-            server_info['dns_config'] = dns_info
-            
-            # Running services
-            stdin, stdout, stderr = ssh_client.exec_command("systemctl list-units --type=service --state=running")
-            services = stdout.read().decode().strip().split('\n')
-            server_info['running_services'] = services
-            
-            # Installed packages (limit to 100 to avoid huge data transfer)
-            stdin, stdout, stderr = ssh_client.exec_command("dpkg-query -l | head -100")
-            packages_info = stdout.read().decode().strip().split('\n')
-            server_info['installed_packages'] = packages_info
-            
-            # Active network connections
-            stdin, stdout, stderr = ssh_client.exec_command("ss -tuln")
-            network_connections = stdout.read().decode().strip().split('\n')
-            server_info['network_connections'] = network_connections
-            
-            # Ethernet card information
-            stdin, stdout, stderr = ssh_client.exec_command("lshw -class network -short")
-            ethernet_info = stdout.read().decode().strip().split('\n')
-            server_info['ethernet_cards'] = ethernet_info
-            
-            # User accounts
-            stdin, stdout, stderr = ssh_client.exec_command("cat /etc/passwd | grep -v nologin | grep -v false")
-            user_accounts = stdout.read().decode().strip().split('\n')
-            server_info['user_accounts'] = user_accounts
-            
-            # System load
-            stdin, stdout, stderr = ssh_client.exec_command("cat /proc/loadavg")
-            load_avg = stdout.read().decode().strip()
-            server_info['load_average'] = load_avg
-            
-            # Default gateway
-            stdin, stdout, stderr = ssh_client.exec_command("ip route | grep default")
-            default_route = stdout.read().decode().strip()
-            server_info['default_gateway'] = default_route
-            
-            # Host-based firewall status
-            stdin, stdout, stderr = ssh_client.exec_command("iptables -L -n")
-            firewall_rules = stdout.read().decode().strip().split('\n')
-            server_info['firewall_rules'] = firewall_rules
-            
-            # Check if the server is a VM
-            stdin, stdout, stderr = ssh_client.exec_command("hostnamectl | grep Virtualization")
-            virtualization = stdout.read().decode().strip()
-            server_info['virtualization'] = virtualization if virtualization else "Not detected"
-        
-        return server_info
+            return _collect_server_info_batched(ssh_client, detailed)
+        except Exception as e:
+            logger.warning(f"Batched server info collection failed, falling back to per-command: {str(e)}")
+
+    try:
+        return _collect_server_info_per_command(ssh_client, detailed)
     except Exception as e:
         logger.error(f"Error collecting server info: {str(e)}")
         return {"error": str(e)}
 
+def _is_transport_reuse_enabled():
+    """Check whether successive login attempts may share one SSH transport"""
+    return os.environ.get('SSH_TRANSPORT_REUSE', 'enabled').lower() != 'disabled'
+
+def _checkout_pooled_client(connection_pool, ip, port, username, credentials):
+    """Find a pooled connection for `ip` matching one of the scan's credentials
+
+    Returns:
+        (client, credential) where credential is None for the manual credentials,
+        or (None, None) if nothing usable is pooled
+    """
+    by_id = {cred.id: cred for cred in credentials}
+    usernames = list(dict.fromkeys(cred.username for cred in credentials)) or [username]
+    for candidate in usernames:
+        client, credential_id = connection_pool.acquire(ip, port, candidate)
+        if client is None:
+            continue
+        if credential_id is None and not credentials:
+            return client, None
+        if credential_id in by_id:
+            return client, by_id[credential_id]
+        # Authenticated with credentials this scan does not use
+        client.close()
+    return None, None
+
+def connection_failure_message(ip, error, username, private_key=None, credential_sets=None,
+                               credential_cache=None, port=22, **_):
+    """error_message execute_ssh_commands records when every TCP connect to `ip` fails
+
+    For engines that open the connection themselves (scan_engine): `error` is the
+    exception of their connect, reported the way paramiko's own connect would
+    have raised it for each credential tried. Takes the execute_ssh_commands
+    keyword arguments; the ones not needed here are ignored.
+    """
+    if isinstance(error, OSError) and error.errno in (errno.ECONNREFUSED, errno.EHOSTUNREACH):
+        error = paramiko.ssh_exception.NoValidConnectionsError({(ip, port): error})
+
+    auth_errors = []
+    if credential_sets:
+        credential_sets = prepare_credentials(credential_sets)
+        if credential_cache is not None:
+            credential_sets = credential_cache.order(ip, credential_sets)
+        else:
+            credential_sets = sorted(credential_sets, key=lambda x: x.priority, reverse=True)
+        for cred in credential_sets:
+            if cred.error:
+                auth_errors.append(f"Connection error for user {cred.username}: {cred.error}")
+            elif (cred.auth_type == 'key' and cred.pkey is not None) or \
+                    (cred.auth_type == 'password' and cred.password is not None):
+                auth_errors.append(f"Connection error for user {cred.username}: {str(error)}")
+
+    # The manual credentials are tried last; a key that does not parse fails before connecting
+    fallback_error = error
+    if private_key and not isinstance(private_key, paramiko.PKey):
+        try:
+            load_private_key(private_key)
+        except Exception as e:
+            fallback_error = e
+    auth_errors.append(f"Connection error for user {username}: {str(fallback_error)}")
+    return "Authentication failed with all credentials: " + "; ".join(auth_errors)
+
 def execute_ssh_commands(ip, username, password=None, private_key=None, sudo_password=None,
                        commands=None, collect_info=False, collect_detailed_info=False, scan_session_id=None,
-                       credential_sets=None, port=22):
+                       credential_sets=None, port=22, sock=None, result_writer=None,
+                       credential_cache=None, connection_pool=None, command_parallelism=1,
+                       validated_commands=None):
     """
     Execute SSH commands on a remote host and return results.
 
@@ -175,16 +422,67 @@ def execute_ssh_commands(ip, username, password=None, private_key=None, sudo_pas
         ip: IP address of target host
         username: SSH username
         password: SSH password (if using password auth)
-        private_key: SSH private key content (if using key auth)
+        private_key: SSH private key content or parsed paramiko key (if using key auth)
         sudo_password: Password for sudo commands
         commands: List of commands to execute
         collect_info: Whether to collect server information
         collect_detailed_info: Whether to collect detailed server information
         scan_session_id: ID of the scan session
-        credential_sets: List of credential sets to try (overrides username/password/private_key if provided)
+        credential_sets: List of credential sets (CredentialSet or prepared ScanCredential) to try
+            (overrides username/password/private_key if provided)
+        port: SSH port of the target host
+        sock: Optional already-connected socket to use for the first connection attempt
+        result_writer: Optional ScanResultWriter; when given, the pending marker and the
+            final result are queued for a bulk write instead of committed from this thread
+        credential_cache: Optional CredentialCache used to try the credential set that
+            last worked on this host first and to record the outcome of each attempt
+        connection_pool: Optional SSHConnectionPool; an authenticated connection to this
+            host is taken from it instead of logging in, and returned to it afterwards
+        command_parallelism: Number of commands run at the same time, each on its own
+            channel of the host's SSH transport (capped at MAX_COMMAND_PARALLELISM)
+        validated_commands: Optional (safe_commands, blocked_commands) from
+            partition_commands(commands), computed once per scan session
     """
     client = paramiko.SSHClient()
     client.set_missing_host_key_policy(paramiko.WarningPolicy())
+    preconnected_sock = sock
+
+    reuse_transport = _is_transport_reuse_enabled()
+
+    def connect(**kwargs):
+        # The pre-connected socket can only carry one handshake; later
+        # attempts fall back to opening their own connection.
+        nonlocal preconnected_sock
+        if preconnected_sock is not None:
+            kwargs['sock'] = preconnected_sock
+            preconnected_sock = None
+        if client.get_transport() is not None:
+            client.close()
+        client.connect(ip, port=port, timeout=SSH_CONNECT_TIMEOUT, **kwargs)
+
+    def authenticate(username, password=None, pkey=None):
+        # A failed login leaves the negotiated transport open, so further
+        # credentials are tried on it directly instead of repeating the TCP
+        # handshake and key exchange. Reconnect only if the server dropped us.
+        transport = client.get_transport()
+        if reuse_transport and transport is not None and transport.is_active() \
+                and not transport.is_authenticated():
+            try:
+                if pkey is not None:
+                    transport.auth_publickey(username, pkey)
+                else:
+                    transport.auth_password(username, password)
+                return
+            except (paramiko.SSHException, EOFError, socket.error):
+                # paramiko reports a dropped connection as an authentication
+                # failure too; only a rejection on a live transport is final.
+                if transport.is_active():
+                    raise
+                logger.debug(f"Server {ip} closed the connection during authentication, reconnecting")
+        if pkey is not None:
+            connect(username=username, pkey=pkey)
+        else:
+            connect(username=username, password=password)
 
     start_time = time.time()
     connection_successful = False
@@ -198,47 +496,78 @@ def execute_ssh_commands(ip, username, password=None, private_key=None, sudo_pas
             ip_address=ip,
             status_code='pending'
         )
-        db.session.add(result)
-        db.session.commit()
+        if result_writer:
+            result_writer.mark_pending(scan_session_id, ip)
+        else:
+            db.session.add(result)
+            db.session.commit()
 
         try:
-            # If credential sets are provided, try them in order of priority
+            sorted_credentials = []
             if credential_sets:
-                sorted_credentials = sorted(credential_sets, key=lambda x: x.priority, reverse=True)
+                credential_sets = prepare_credentials(credential_sets)
+                if credential_cache is not None:
+                    sorted_credentials = credential_cache.order(ip, credential_sets)
+                else:
+                    sorted_credentials = sorted(credential_sets, key=lambda x: x.priority, reverse=True)
+
+            # Reuse an authenticated connection left by an earlier scan of this host
+            if connection_pool is not None:
+                pooled_client, used_credentials = _checkout_pooled_client(
+                    connection_pool, ip, port, username, sorted_credentials
+                )
+                if pooled_client is not None:
+                    client.close()
+                    client = pooled_client
+                    connection_successful = True
+                    logger.info(f"Reusing pooled SSH connection to {ip}")
 
+            # If credential sets are provided, try them in order of priority
+            if sorted_credentials and not connection_successful:
                 for cred in sorted_credentials:
                     try:
                         logger.info(f"Trying credentials for user {cred.username} (auth type: {cred.auth_type})")
 
-                        if cred.auth_type == 'key' and cred.private_key_encrypted:
-                            private_key_data = decrypt_data(cred.private_key_encrypted)
-                            pkey = load_private_key(private_key_data)
-                            client.connect(ip, port=port, username=cred.username, pkey=pkey, timeout=10)
+                        if cred.error:
+                            raise Exception(cred.error)
+                        if cred.auth_type == 'key' and cred.pkey is not None:
+                            authenticate(cred.username, pkey=cred.pkey)
                             used_credentials = cred
                             connection_successful = True
                             break
-                        elif cred.auth_type == 'password' and cred.password_encrypted:
-                            password_data = decrypt_data(cred.password_encrypted)
-                            client.connect(ip, port=port, username=cred.username, password=password_data, timeout=10)
+                        elif cred.auth_type == 'password' and cred.password is not None:
+                            authenticate(cred.username, password=cred.password)
                             used_credentials = cred
                             connection_successful = True
                             break
-                    except (paramiko.AuthenticationException, paramiko.SSHException) as e:
+                    except paramiko.AuthenticationException as e:
+                        # Only a rejected login says anything about the credential itself
+                        if credential_cache is not None:
+                            credential_cache.record_failure(ip, cred.id)
+                        auth_errors.append(f"Authentication failed for user {cred.username}: {str(e)}")
+                        continue
+                    except paramiko.SSHException as e:
                         auth_errors.append(f"Authentication failed for user {cred.username}: {str(e)}")
                         continue
                     except Exception as e:
                         auth_errors.append(f"Connection error for user {cred.username}: {str(e)}")
                         continue
 
+            if used_credentials is not None and credential_cache is not None:
+                credential_cache.record_success(ip, used_credentials.id)
+
             # If no credential sets or all credential sets failed, try with the provided credentials
             if not connection_successful:
                 try:
                     if private_key:
-                        pkey = load_private_key(private_key)
-                        client.connect(ip, port=port, username=username, pkey=pkey, timeout=10)
+                        if isinstance(private_key, paramiko.PKey):
+                            pkey = private_key
+                        else:
+                            pkey = load_private_key(private_key)
+                        authenticate(username, pkey=pkey)
                         connection_successful = True
                     else:
-                        client.connect(ip, port=port, username=username, password=password, timeout=10)
+                        authenticate(username, password=password)
                         connection_successful = True
                 except (paramiko.AuthenticationException, paramiko.SSHException) as e:
                     auth_errors.append(f"Authentication failed for user {username}: {str(e)}")
@@ -254,8 +583,8 @@ def execute_ssh_commands(ip, username, password=None, private_key=None, sudo_pas
                     sudo_password_to_use = None
 
                     # Determine which sudo password to use
-                    if used_credentials and used_credentials.sudo_password_encrypted:
-                        sudo_password_to_use = decrypt_data(used_credentials.sudo_password_encrypted)
+                    if used_credentials and used_credentials.sudo_password:
+                        sudo_password_to_use = used_credentials.sudo_password
                     elif sudo_password:
                         sudo_password_to_use = sudo_password
 
@@ -271,30 +600,25 @@ def execute_ssh_commands(ip, username, password=None, private_key=None, sudo_pas
                                 channel.get_pty()
                                 channel.exec_command("sudo -S -p '' echo success")
                                 channel.sendall((sudo_password_to_use + '\n').encode())
-                                output = channel.recv(1024).decode('utf-8')
-                                result.sudo_status = 'success' in output
+                                output = read_channel(channel, timeout=SUDO_CHECK_TIMEOUT,
+                                                      max_output_bytes=65536)
+                                channel.close()
+                                result.sudo_status = 'success' in output.stdout.text()
                         else:
                             # Try passwordless sudo
-                            stdin, stdout, stderr = client.exec_command("sudo -n true", timeout=5)
-                            exit_status = stdout.channel.recv_exit_status()
-                            result.sudo_status = (exit_status == 0)
+                            stdin, stdout, stderr = client.exec_command("sudo -n true", timeout=SUDO_CHECK_TIMEOUT)
+                            output = read_channel(stdout.channel, timeout=SUDO_CHECK_TIMEOUT,
+                                                  max_output_bytes=65536)
+                            result.sudo_status = (output.exit_status == 0)
                     except Exception as e:
                         logger.warning(f"Sudo check failed for {ip}: {str(e)}")
                         result.sudo_status = False
 
-                    # Validate all commands for security before execution
-                    all_commands_valid, validation_results = validate_commands_list(commands)
-                    unsafe_commands = []
-                    safe_commands = []
-
-                    for i, (is_safe, cmd_or_error) in enumerate(validation_results):
-                        if is_safe:
-                            safe_commands.append(commands[i])
-                        else:
-                            unsafe_commands.append({
-                                'command': commands[i],
-                                'reason': cmd_or_error
-                            })
+                    # Validate all commands for security before execution, unless
+                    # the scan session already did
+                    if validated_commands is None:
+                        validated_commands = partition_commands(commands)
+                    safe_commands, unsafe_commands = validated_commands
 
                     if unsafe_commands:
                         logger.warning(f"Blocked {len(unsafe_commands)} unsafe commands for {ip}: {json.dumps(unsafe_commands)}")
@@ -315,60 +639,75 @@ def execute_ssh_commands(ip, username, password=None, private_key=None, sudo_pas
                         })
                         all_commands_succeeded = False
 
-                    # Process safe commands
-                    for cmd in safe_commands:
+                    def run_command(cmd):
                         try:
-                            if cmd.startswith('sudo ') and sudo_password_to_use:
-                                transport = client.get_transport()
-                                if transport is None:
-                                    raise Exception("SSH transport is not available")
-
-                                channel = transport.open_session()
-                                channel.get_pty()
-                                channel.exec_command(cmd)
-                                channel.sendall((sudo_password_to_use + '\n').encode())
-                                stdout_data = ''
-                                stderr_data = ''
-
-                                while not channel.exit_status_ready():
-                                    if channel.recv_ready():
-                                        stdout_data += channel.recv(1024).decode('utf-8', errors='replace')
-                                    if channel.recv_stderr_ready():
-                                        stderr_data += channel.recv_stderr(1024).decode('utf-8', errors='replace')
-
-                                exit_status = channel.recv_exit_status()
-                            else:
-                                stdin, stdout, stderr = client.exec_command(cmd, timeout=30)
-                                exit_status = stdout.channel.recv_exit_status()
-                                stdout_data = stdout.read().decode('utf-8', errors='replace')
-                                stderr_data = stderr.read().decode('utf-8', errors='replace')
+                            transport = client.get_transport()
+                            if transport is None:
+                                raise Exception("SSH transport is not available")
+
+                            channel = transport.open_session(timeout=SSH_CONNECT_TIMEOUT)
+                            try:
+                                if cmd.startswith('sudo ') and sudo_password_to_use:
+                                    channel.get_pty()
+                                    channel.exec_command(cmd)
+                                    channel.sendall((sudo_password_to_use + '\n').encode())
+                                else:
+                                    channel.exec_command(cmd)
+                                output = read_channel(channel, timeout=command_timeout,
+                                                      max_output_bytes=max_output_bytes,
+                                                      tail_bytes=output_tail_bytes)
+                            finally:
+                                channel.close()
+
+                            exit_status = output.exit_status
+                            stdout_data = output.stdout.text()
+                            stderr_data = output.stderr.text()
+                            if output.timed_out:
+                                stderr_data += f"\nCommand timed out after {command_timeout:g} seconds"
 
                             # Mask potentially sensitive information in the output
                             stdout_data = mask_command_output(stdout_data)
                             stderr_data = mask_command_output(stderr_data)
 
-                            cmd_result = {
+                            return {
                                 'command': cmd,
                                 'exit_status': exit_status,
                                 'stdout': stdout_data,
                                 'stderr': stderr_data,
                                 'success': (exit_status == 0),
-                                'security_blocked': False
+                                'security_blocked': False,
+                                'timed_out': output.timed_out,
+                                'truncated': output.stdout.truncated or output.stderr.truncated,
+                                'stdout_bytes': output.stdout.total_bytes,
+                                'stderr_bytes': output.stderr.total_bytes
                             }
-
-                            command_output.append(cmd_result)
-                            if exit_status != 0:
-                                all_commands_succeeded = False
                         except Exception as e:
                             error_msg = mask_sensitive_data(str(e))
-                            command_output.append({
+                            return {
                                 'command': cmd,
                                 'exit_status': -1,
                                 'stdout': '',
                                 'stderr': error_msg,
                                 'success': False,
                                 'security_blocked': False
-                            })
+                            }
+
+                    command_timeout = get_command_timeout()
+                    max_output_bytes = get_max_output_bytes()
+                    output_tail_bytes = get_output_tail_bytes()
+
+                    # Process safe commands, optionally several at once as separate
+                    # channels on the same transport; results keep the original order
+                    parallelism = min(command_parallelism or 1, MAX_COMMAND_PARALLELISM, len(safe_commands))
+                    if parallelism > 1:
+                        with ThreadPoolExecutor(max_workers=parallelism) as command_executor:
+                            safe_results = list(command_executor.map(run_command, safe_commands))
+                    else:
+                        safe_results = [run_command(cmd) for cmd in safe_commands]
+
+                    for cmd_result in safe_results:
+                        command_output.append(cmd_result)
+                        if not cmd_result['success']:
                             all_commands_succeeded = False
 
                     result.command_status = all_commands_succeeded
@@ -406,47 +745,201 @@ def execute_ssh_commands(ip, username, password=None, private_key=None, sudo_pas
             result.status_code = 'failed'
             result.error_message = f"Error: {mask_sensitive_data(str(e))}"
         finally:
-            if client:
+            if connection_pool is not None and result.status_code == 'success':
+                connection_pool.release(
+                    ip, port, used_credentials.username if used_credentials else username, client,
+                    used_credentials.id if used_credentials else None
+                )
+            elif client:
                 client.close()
+            if preconnected_sock is not None:
+                preconnected_sock.close()
 
             result.execution_time = time.time() - start_time
-            db.session.commit()
+            if result_writer:
+                result_writer.submit(result)
+            else:
+                if scan_session_id is not None:
+                    db.session.execute(ScanSession.count_results(
+                        scan_session_id,
+                        success=int(result.status_code == 'success'),
+                        failed=int(result.status_code == 'failed')
+                    ))
+                db.session.commit()
+                publish_results(scan_session_id, [result.id])
 
     return result
 
+def _log_future_errors(futures):
+    for future in futures:
+        try:
+            future.result()  # This will raise any exceptions from the task
+        except Exception as e:
+            logger.error(f"Thread execution error: {mask_sensitive_data(str(e))}")
+
+def mark_scan_session_completed(scan_session_id):
+    """Mark a scan session as completed once all of its hosts have been processed"""
+    with app.app_context():
+        scan_session = ScanSession.query.get(scan_session_id)
+        if scan_session:
+            scan_session.status = 'completed'
+            scan_session.completed_at = datetime.utcnow()
+            db.session.commit()
+    publish_completed(scan_session_id)
+
+def _until(targets, should_stop):
+    """Yield targets until should_stop() returns True"""
+    for ip in targets:
+        if should_stop():
+            logger.info("Scan stopped before all targets were started")
+            return
+        yield ip
+
+def prepare_scan(scan_session_id, username, password=None, private_key=None, commands=None,
+                 collect_server_info=False, collect_detailed_info=False, sudo_password=None,
+                 credential_sets=None, port=22, connection_pool=None, command_parallelism=1,
+                 targets=None):
+    """Build the keyword arguments execute_ssh_commands gets for every host of a scan
+
+    Credentials are decrypted, keys parsed and commands validated once here.
+    `targets` (a TargetSet or list of the addresses to scan) limits the
+    credential outcomes loaded into the credential cache to their /24s.
+
+    Returns:
+        (ssh_kwargs, credential_cache); credential_cache is None unless several
+        credential sets are tried and the cache is enabled
+    """
+    # Decrypt credentials and parse keys once; workers share the results read-only
+    credential_sets = prepare_credentials(credential_sets)
+    private_key = prepare_private_key(private_key)
+    ssh_kwargs = dict(
+        username=username, password=password, private_key=private_key,
+        sudo_password=sudo_password, commands=commands, collect_info=collect_server_info,
+        collect_detailed_info=collect_detailed_info, scan_session_id=scan_session_id,
+        credential_sets=credential_sets, port=port, connection_pool=connection_pool,
+        command_parallelism=command_parallelism,
+        # Every host runs the same commands, so they are validated once here
+        validated_commands=partition_commands(commands) if commands else None
+    )
+    credential_cache = None
+    if credential_sets and len(credential_sets) > 1 and is_credential_cache_enabled():
+        try:
+            credential_cache = CredentialCache.load([cred.id for cred in credential_sets], targets=targets)
+            ssh_kwargs['credential_cache'] = credential_cache
+        except Exception as e:
+            logger.error(f"Could not load credential cache: {str(e)}")
+    return ssh_kwargs, credential_cache
+
+def run_scan(ip_addresses, ssh_kwargs, concurrency=10, port=22, engine='thread',
+             connect_concurrency=None, discovery=False, should_stop=None, fence=None):
+    """Scan targets in the calling thread and return once every started host has a result
+
+    Args:
+        ip_addresses: Iterable of target addresses, consumed lazily
+        ssh_kwargs: Keyword arguments for execute_ssh_commands, from prepare_scan()
+        should_stop: Optional callable; once it returns True no further hosts are started
+        fence: Optional callable run in every transaction that writes results;
+            they are dropped if it returns False (see scan_queue.lease_fence)
+    """
+    from result_writer import ScanResultWriter
+    scan_session_id = ssh_kwargs.get('scan_session_id')
+
+    targets = ip_addresses
+    if discovery:
+        from scan_engine import discover_live_hosts
+        try:
+            targets = discover_live_hosts(ip_addresses, port=port, scan_session_id=scan_session_id,
+                                          concurrency=connect_concurrency, fence=fence)
+        except Exception as e:
+            logger.error(f"Discovery sweep failed, scanning all targets: {mask_sensitive_data(str(e))}")
+    if should_stop is not None:
+        targets = _until(targets, should_stop)
+
+    if engine == 'asyncio':
+        from scan_engine import run_async_scan
+        try:
+            with ScanResultWriter(fence=fence) as result_writer:
+                run_async_scan(targets, dict(ssh_kwargs, result_writer=result_writer),
+                               concurrency=concurrency, connect_concurrency=connect_concurrency)
+        except Exception as e:
+            logger.error(f"Async scan engine error: {mask_sensitive_data(str(e))}")
+        return
+
+    with ScanResultWriter(fence=fence) as result_writer, \
+            ThreadPoolExecutor(max_workers=concurrency) as executor:
+        # Submit tasks as workers free up so the target iterator is consumed lazily
+        in_flight = set()
+        for ip in targets:
+            if len(in_flight) >= concurrency * 2:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                _log_future_errors(done)
+            in_flight.add(executor.submit(execute_ssh_commands, ip, result_writer=result_writer, **ssh_kwargs))
+
+        # Wait for all tasks to complete
+        _log_future_errors(wait(in_flight).done)
+
 def start_scan_session(scan_session_id, ip_addresses, username, password=None, private_key=None, 
                      commands=None, collect_server_info=False, collect_detailed_info=False, 
-                     sudo_password=None, credential_sets=None, concurrency=10, port=22):
-    """Start a scan session with multiple threads"""
+                     sudo_password=None, credential_sets=None, concurrency=10, port=22,
+                     engine=None, connect_concurrency=None, discovery=False, connection_pool=None,
+                     command_parallelism=1):
+    """Start a scan session in a background thread, or queue it for scan workers
+
+    With DISTRIBUTED_SCANS=enabled the targets are split into batches in the
+    scan queue instead (see scan_queue) and worker processes run the scan.
+
+    Args:
+        ip_addresses: Iterable of target addresses, e.g. a subnet_utils.TargetSet;
+            it is consumed lazily as workers become free
+        engine: 'thread' (one blocking worker per host) or 'asyncio' (non-blocking
+            connects, SSH work handed to `concurrency` threads). Defaults to the
+            SCAN_ENGINE environment variable, then 'thread'.
+        connect_concurrency: Maximum number of in-flight TCP connects for the
+            asyncio engine and the discovery sweep
+        discovery: Sweep all targets for an open SSH port first, record the
+            unreachable ones as failed in bulk and only scan the rest
+        connection_pool: Optional ssh_pool.SSHConnectionPool that keeps authenticated
+            connections open for the next scan of the same hosts (not used by
+            scan workers, nor by scans with more targets than the pool holds)
+        command_parallelism: Commands run concurrently per host over separate channels
+
+    Returns:
+        The scan thread, or None if the scan was queued for scan workers
+    """
+    engine = (engine or os.environ.get('SCAN_ENGINE', 'thread')).lower()
+
+    from scan_queue import is_distributed_scanning_enabled
+    if is_distributed_scanning_enabled():
+        from scan_queue import enqueue_scan
+        enqueue_scan(
+            scan_session_id, ip_addresses, username, password=password, private_key=private_key,
+            commands=commands, collect_server_info=collect_server_info,
+            collect_detailed_info=collect_detailed_info, sudo_password=sudo_password,
+            credential_sets=credential_sets, concurrency=concurrency, port=port, engine=engine,
+            connect_concurrency=connect_concurrency, discovery=discovery,
+            command_parallelism=command_parallelism
+        )
+        return None
+
+    if connection_pool is not None and isinstance(ip_addresses, (TargetSet, list)):
+        connection_pool = connection_pool.for_scan(len(ip_addresses))
+
+    ssh_kwargs, credential_cache = prepare_scan(
+        scan_session_id, username, password=password, private_key=private_key, commands=commands,
+        collect_server_info=collect_server_info, collect_detailed_info=collect_detailed_info,
+        sudo_password=sudo_password, credential_sets=credential_sets, port=port,
+        connection_pool=connection_pool, command_parallelism=command_parallelism,
+        # A lazy iterator of targets cannot be read twice
+        targets=ip_addresses if isinstance(ip_addresses, (TargetSet, list)) else None
+    )
+
     def scan_worker():
-        with ThreadPoolExecutor(max_workers=concurrency) as executor:
-            scan_args = [
-                (ip, username, password, private_key, sudo_password, commands, collect_server_info, 
-                 collect_detailed_info, scan_session_id, credential_sets, port) 
-                for ip in ip_addresses
-            ]
-            
-            # Submit all tasks to thread pool
-            futures = [
-                executor.submit(execute_ssh_commands, *args) 
-                for args in scan_args
-            ]
-            
-            # Wait for all tasks to complete
-            for future in futures:
-                try:
-                    future.result()  # This will raise any exceptions from the task
-                except Exception as e:
-                    logger.error(f"Thread execution error: {mask_sensitive_data(str(e))}")
-            
-            # Update scan session status to completed
-            with app.app_context():
-                scan_session = ScanSession.query.get(scan_session_id)
-                if scan_session:
-                    scan_session.status = 'completed'
-                    scan_session.completed_at = datetime.utcnow()
-                    db.session.commit()
-    
+        run_scan(ip_addresses, ssh_kwargs, concurrency=concurrency, port=port, engine=engine,
+                 connect_concurrency=connect_concurrency, discovery=discovery)
+        if credential_cache is not None:
+            credential_cache.flush()
+        mark_scan_session_completed(scan_session_id)
+
     # Start the scan in a background thread
     scan_thread = threading.Thread(target=scan_worker)
     scan_thread.daemon = True
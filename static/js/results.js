@@ -30,16 +30,30 @@ document.addEventListener('DOMContentLoaded', function() {
     let successRateChart;
     let executionTimeChart;
     
-    // Current scan data
+    // Results loaded so far for the current scan, in (IP, ID) order of the pages
     let currentScanData = null;
+    let currentScanId = null;
+    let nextCursor = null;
+    let totalMatching = 0;
+    let loadingPage = false;
+    let pageRequest = 0;
+    let filterTimer = null;
+    
+    // Results fetched per page
+    const RESULTS_PAGE_SIZE = 200;
+    
+    // Live updates of a running scan
+    let scanEvents = null;
+    let pendingLiveResults = [];
+    let liveUpdateTimer = null;
     
     // Initialize event handlers
     initializeEventHandlers();
     
     // Show details for current scan if any
-    const currentScanId = new URLSearchParams(window.location.search).get('scan_id');
-    if (currentScanId) {
-        loadScanResults(currentScanId);
+    const initialScanId = new URLSearchParams(window.location.search).get('scan_id');
+    if (initialScanId) {
+        loadScanResults(initialScanId);
     }
     
     // Initialize event handlers
@@ -75,97 +89,314 @@ document.addEventListener('DOMContentLoaded', function() {
             deleteScan(scanId);
         });
         
-        // Export buttons
+        // Export buttons; exports are built by background jobs on the server
         document.getElementById('exportCSV').addEventListener('click', function() {
-            if (!currentScanData) return;
-            
-            const csvContent = convertToCSV(currentScanData);
-            downloadFile(`scan_results_${document.getElementById('currentScanId').textContent}.csv`, csvContent, 'text/csv');
+            startExport('csv');
         });
         
         document.getElementById('exportJSON').addEventListener('click', function() {
-            if (!currentScanData) return;
-            
-            const jsonContent = JSON.stringify(currentScanData, null, 2);
-            downloadFile(`scan_results_${document.getElementById('currentScanId').textContent}.json`, jsonContent, 'application/json');
+            startExport('json');
         });
         
         document.getElementById('exportPDF').addEventListener('click', function() {
-            if (!currentScanData) return;
-            
-            const scanId = document.getElementById('currentScanId').textContent;
-            window.location.href = `/scan_results/${scanId}/export/pdf`;
+            startExport('pdf');
+        });
+        
+        // Load the next page of results
+        document.getElementById('loadMoreResults').addEventListener('click', function() {
+            loadResultsPage(false);
         });
         
-        // Filters
+        // Filters are applied by the server; the IP search waits for typing to pause
         document.getElementById('statusFilter').addEventListener('change', applyFilters);
         document.getElementById('sudoFilter').addEventListener('change', applyFilters);
-        document.getElementById('searchInput').addEventListener('input', applyFilters);
+        document.getElementById('searchInput').addEventListener('input', function() {
+            clearTimeout(filterTimer);
+            filterTimer = setTimeout(applyFilters, 300);
+        });
+    }
+    
+    // Run an export job and download its file once it is ready
+    function startExport(format) {
+        if (!currentScanId) return;
+        
+        fetch(`/scan_results/${currentScanId}/export_jobs`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ format: format })
+        })
+            .then(response => response.json())
+            .then(job => {
+                if (job.error && !job.id) {
+                    throw new Error(job.error);
+                }
+                if (job.status !== 'completed') {
+                    showToast(`Preparing ${format.toUpperCase()} export...`, 'Export', 'info');
+                }
+                waitForExport(job);
+            })
+            .catch(error => {
+                console.error('Error starting export:', error);
+                showToast('Failed to start export', 'Error', 'danger');
+            });
+    }
+    
+    function waitForExport(job) {
+        if (job.status === 'completed') {
+            window.location.href = job.download_url;
+            return;
+        }
+        if (job.status === 'failed') {
+            showToast(`Export failed: ${job.error}`, 'Error', 'danger');
+            return;
+        }
+        setTimeout(() => {
+            fetch(job.status_url)
+                .then(response => response.json())
+                .then(waitForExport)
+                .catch(error => {
+                    console.error('Error checking export:', error);
+                    showToast('Failed to check export status', 'Error', 'danger');
+                });
+        }, 1000);
     }
     
     // Load scan results
     function loadScanResults(scanId) {
-        // Show loading indicator
-        const resultDetails = document.getElementById('resultDetails');
-        resultDetails.style.display = 'block';
-        resultDetails.innerHTML = '<div class="text-center py-5"><div class="spinner-border text-primary" role="status"></div><p class="mt-3">Loading results...</p></div>';
+        currentScanId = String(scanId);
+        
+        document.getElementById('resultDetails').style.display = 'block';
+        document.getElementById('currentScanId').textContent = currentScanId;
+        
+        // Subscribe before loading so results finished in between are not missed;
+        // events are buffered until the first page has been rendered
+        subscribeToScan(currentScanId);
+        
+        loadScanSummary(currentScanId);
+        loadResultsPage(true);
+        
+        // Scroll to results
+        document.getElementById('resultDetails').scrollIntoView({
+            behavior: 'smooth'
+        });
+    }
+    
+    // Query arguments for the current filters
+    function resultsQuery() {
+        const params = new URLSearchParams({ limit: RESULTS_PAGE_SIZE });
+        const statusFilter = document.getElementById('statusFilter').value;
+        const sudoFilter = document.getElementById('sudoFilter').value;
+        const ipFilter = document.getElementById('searchInput').value.trim();
         
-        fetch(`/scan_results/${scanId}`)
+        if (statusFilter !== 'all') params.set('status', statusFilter);
+        if (sudoFilter !== 'all') params.set('sudo_status', sudoFilter);
+        if (ipFilter) params.set('ip', ipFilter);
+        return params;
+    }
+    
+    // Whether a pushed result belongs in the table under the current filters
+    function matchesFilters(result) {
+        const statusFilter = document.getElementById('statusFilter').value;
+        const sudoFilter = document.getElementById('sudoFilter').value;
+        const ipFilter = document.getElementById('searchInput').value.trim();
+        
+        return (statusFilter === 'all' || result.status_code === statusFilter) &&
+               (sudoFilter === 'all' || (sudoFilter === 'yes') === Boolean(result.sudo_status)) &&
+               (!ipFilter || result.ip_address.startsWith(ipFilter));
+    }
+    
+    // Fetch the first page (reset) or the next page of results
+    function loadResultsPage(reset) {
+        if (loadingPage && !reset) return;
+        if (!reset && !nextCursor) return;
+        
+        const scanId = currentScanId;
+        const request = reset ? ++pageRequest : pageRequest;
+        const params = resultsQuery();
+        if (!reset) params.set('cursor', nextCursor);
+        
+        if (reset) {
+            currentScanData = null;
+            document.getElementById('resultsLoadedInfo').textContent = 'Loading results...';
+        }
+        loadingPage = true;
+        
+        fetch(`/scan_results/${scanId}/page?${params}`)
             .then(response => response.json())
             .then(data => {
-                // Store the scan data
-                currentScanData = data.results;
-                
-                // Update the UI
-                document.getElementById('resultDetails').style.display = 'block';
-                document.getElementById('currentScanId').textContent = scanId;
-                
-                updateScanSummary(data.results);
+                // Ignore pages of a scan or filter that is no longer shown
+                if (request !== pageRequest || currentScanData === null && !reset) return;
                 
-                // Populate the results table
-                populateResultsTable(data.results);
-                
-                // Create charts
-                createCharts(data.results);
+                nextCursor = data.next_cursor;
+                if (reset) {
+                    totalMatching = data.total;
+                    currentScanData = data.results;
+                    populateResultsTable(currentScanData);
+                } else {
+                    upsertResults(data.results);
+                }
+                updateResultsInfo();
                 
-                // Scroll to results
-                document.getElementById('resultDetails').scrollIntoView({
-                    behavior: 'smooth'
-                });
+                scheduleLiveUpdate();
             })
             .catch(error => {
                 console.error('Error loading scan results:', error);
-                document.getElementById('resultDetails').innerHTML = `
-                    <div class="alert alert-danger">
-                        <i class="fas fa-exclamation-circle me-2"></i> Failed to load scan results.
-                    </div>
-                `;
+                showToast('Failed to load scan results', 'Error', 'danger');
+            })
+            .finally(() => {
+                if (request === pageRequest) loadingPage = false;
             });
     }
     
-    // Update scan summary
-    function updateScanSummary(results) {
-        if (!results || results.length === 0) {
-            document.getElementById('totalHosts').textContent = '0';
-            document.getElementById('sshSuccess').textContent = '0';
-            document.getElementById('sudoSuccess').textContent = '0';
-            document.getElementById('failedHosts').textContent = '0';
+    // Show how many results are loaded and whether there are more
+    function updateResultsInfo() {
+        const loaded = currentScanData ? currentScanData.length : 0;
+        document.getElementById('resultsLoadedInfo').textContent =
+            `Showing ${loaded} of ${Math.max(totalMatching, loaded)} results`;
+        document.getElementById('loadMoreResults').classList.toggle('d-none', !nextCursor);
+    }
+    
+    // Add results to the loaded data and the table, replacing rows with the same ID
+    function upsertResults(results) {
+        const indexById = new Map(currentScanData.map((result, index) => [result.id, index]));
+        const added = [];
+        results.forEach(result => {
+            if (indexById.has(result.id)) {
+                currentScanData[indexById.get(result.id)] = result;
+            } else {
+                indexById.set(result.id, currentScanData.length);
+                currentScanData.push(result);
+                added.push(result);
+            }
+        });
+        
+        if (!resultsTable) {
+            populateResultsTable(currentScanData);
+            return added;
+        }
+        results.forEach(result => {
+            const existing = resultsTable.row(`#result-${result.id}`);
+            if (existing.any()) {
+                existing.remove();
+            }
+            resultsTable.row.add(buildResultRow(result));
+        });
+        resultsTable.draw(false);
+        return added;
+    }
+    
+    // Receive results of a running scan as they are written
+    function subscribeToScan(scanId) {
+        if (scanEvents) {
+            scanEvents.close();
+            scanEvents = null;
+        }
+        pendingLiveResults = [];
+        if (!window.EventSource) return;
+        
+        scanEvents = new EventSource(`/scan_events/${scanId}`);
+        const events = scanEvents;
+        
+        events.addEventListener('progress', event => {
+            updateProgressSummary(JSON.parse(event.data));
+        });
+        
+        events.addEventListener('result', event => {
+            pendingLiveResults.push(JSON.parse(event.data));
+            scheduleLiveUpdate();
+        });
+        
+        events.addEventListener('resync', () => {
+            // Notifications were dropped on the server; start over
+            loadScanResults(scanId);
+        });
+        
+        events.addEventListener('complete', () => {
+            events.close();
+            if (scanEvents === events) {
+                scanEvents = null;
+                scheduleLiveUpdate(true);
+                loadScanSummary(scanId);
+            }
+        });
+        
+        events.onerror = () => {
+            // Refused streams (e.g. too many open) are not retried by the browser
+            if (events.readyState === EventSource.CLOSED && scanEvents === events) {
+                scanEvents = null;
+            }
+        };
+    }
+    
+    // Apply buffered live results at most twice a second
+    function scheduleLiveUpdate(flushNow = false) {
+        if (flushNow) {
+            clearTimeout(liveUpdateTimer);
+            liveUpdateTimer = null;
+            applyLiveResults();
             return;
         }
+        if (liveUpdateTimer || pendingLiveResults.length === 0) return;
+        liveUpdateTimer = setTimeout(() => {
+            liveUpdateTimer = null;
+            applyLiveResults();
+        }, 500);
+    }
+    
+    function applyLiveResults() {
+        // Wait for the first page
+        if (!currentScanData) return;
         
-        const totalHosts = results.length;
-        const sshSuccess = results.filter(r => r.ssh_status === true).length;
-        const sudoSuccess = results.filter(r => r.sudo_status === true).length;
-        const failedHosts = results.filter(r => r.status_code === 'failed').length;
+        const updates = pendingLiveResults.filter(matchesFilters);
+        pendingLiveResults = [];
+        if (updates.length === 0) return;
         
-        document.getElementById('totalHosts').textContent = totalHosts;
-        document.getElementById('sshSuccess').textContent = sshSuccess;
-        document.getElementById('sudoSuccess').textContent = sudoSuccess;
-        document.getElementById('failedHosts').textContent = failedHosts;
+        totalMatching += upsertResults(updates).length;
+        updateResultsInfo();
+    }
+    
+    // Load the summary cards and the charts from the aggregated scan summary
+    function loadScanSummary(scanId) {
+        fetch(`/scan_summary/${scanId}`)
+            .then(response => response.json())
+            .then(data => {
+                if (String(scanId) !== currentScanId) return;
+                updateScanSummary(data.summary);
+            })
+            .catch(error => {
+                console.error('Error loading scan summary:', error);
+            });
+    }
+    
+    // Update the cards fed by the progress counters while a scan runs
+    function updateProgressSummary(progress) {
+        if (String(progress.scan_id) !== currentScanId) return;
+        document.getElementById('totalHosts').textContent = progress.completed;
+        document.getElementById('failedHosts').textContent = progress.failed;
+        createSuccessRateChart(progress.success, progress.failed);
+    }
+    
+    // Update scan summary
+    function updateScanSummary(summary) {
+        document.getElementById('totalHosts').textContent = summary.success + summary.failed;
+        document.getElementById('sshSuccess').textContent = summary.ssh_success;
+        document.getElementById('sudoSuccess').textContent = summary.sudo_success;
+        document.getElementById('failedHosts').textContent = summary.failed;
+        
+        createSuccessRateChart(summary.success, summary.failed);
+        createExecutionTimeChart(summary.execution_time_buckets);
     }
     
     // Populate results table
     function populateResultsTable(results) {
+        // Initialize DataTable if not already initialized
+        if (resultsTable) {
+            resultsTable.destroy();
+            resultsTable = null;
+        }
+        
         const tableBody = document.getElementById('resultsTableBody');
         tableBody.innerHTML = '';
         
@@ -175,85 +406,77 @@ document.addEventListener('DOMContentLoaded', function() {
         }
         
         results.forEach(result => {
-            const row = document.createElement('tr');
-            
-            // Status styling
-            if (result.status_code === 'success') {
-                row.classList.add('table-success');
-            } else if (result.status_code === 'failed') {
-                row.classList.add('table-danger');
-            }
-            
-            row.innerHTML = `
-                <td>${result.ip_address}</td>
-                <td>
-                    ${result.status_code === 'success' 
-                        ? '<span class="badge bg-success">Success</span>' 
-                        : '<span class="badge bg-danger">Failed</span>'}
-                </td>
-                <td>
-                    ${result.ssh_status 
-                        ? '<span class="badge bg-success"><i class="fas fa-check"></i></span>' 
-                        : '<span class="badge bg-danger"><i class="fas fa-times"></i></span>'}
-                </td>
-                <td>
-                    ${result.sudo_status 
-                        ? '<span class="badge bg-success"><i class="fas fa-check"></i></span>' 
-                        : '<span class="badge bg-danger"><i class="fas fa-times"></i></span>'}
-                </td>
-                <td>
-                    ${result.command_status 
-                        ? '<span class="badge bg-success"><i class="fas fa-check"></i></span>' 
-                        : '<span class="badge bg-danger"><i class="fas fa-times"></i></span>'}
-                </td>
-                <td>${formatExecutionTime(result.execution_time)}</td>
-                <td>
-                    <button type="button" class="btn btn-sm btn-primary view-result" data-result-id="${result.id}">
-                        <i class="fas fa-eye"></i>
-                    </button>
-                </td>
-            `;
-            
-            tableBody.appendChild(row);
+            tableBody.appendChild(buildResultRow(result));
         });
         
-        // Initialize DataTable if not already initialized
-        if (resultsTable) {
-            resultsTable.destroy();
-        }
-        
         resultsTable = new DataTable('#resultsTable', {
             responsive: true,
-            order: [[0, 'asc']], // Sort by IP address ascending
+            order: [[0, 'asc']], // Sort by IP address ascending, numerically (data-order)
             language: {
                 search: "Filter:"
             }
         });
+    }
+    
+    // Build the table row of one result
+    function buildResultRow(result) {
+        const row = document.createElement('tr');
+        row.id = `result-${result.id}`;
         
-        // Add event listeners to view result buttons
-        document.querySelectorAll('.view-result').forEach(button => {
-            button.addEventListener('click', function() {
-                const resultId = this.getAttribute('data-result-id');
-                showResultDetails(resultId);
-            });
+        // Status styling
+        if (result.status_code === 'success') {
+            row.classList.add('table-success');
+        } else if (result.status_code === 'failed') {
+            row.classList.add('table-danger');
+        }
+        
+        row.innerHTML = `
+            <td data-order="${result.ip_int}">${result.ip_address}</td>
+            <td>
+                ${result.status_code === 'success' 
+                    ? '<span class="badge bg-success">Success</span>' 
+                    : '<span class="badge bg-danger">Failed</span>'}
+            </td>
+            <td>
+                ${result.ssh_status 
+                    ? '<span class="badge bg-success"><i class="fas fa-check"></i></span>' 
+                    : '<span class="badge bg-danger"><i class="fas fa-times"></i></span>'}
+            </td>
+            <td>
+                ${result.sudo_status 
+                    ? '<span class="badge bg-success"><i class="fas fa-check"></i></span>' 
+                    : '<span class="badge bg-danger"><i class="fas fa-times"></i></span>'}
+            </td>
+            <td>
+                ${result.command_status 
+                    ? '<span class="badge bg-success"><i class="fas fa-check"></i></span>' 
+                    : '<span class="badge bg-danger"><i class="fas fa-times"></i></span>'}
+            </td>
+            <td>${formatExecutionTime(result.execution_time)}</td>
+            <td>
+                <button type="button" class="btn btn-sm btn-primary view-result" data-result-id="${result.id}">
+                    <i class="fas fa-eye"></i>
+                </button>
+            </td>
+        `;
+        
+        row.querySelector('.view-result').addEventListener('click', function() {
+            const resultId = this.getAttribute('data-result-id');
+            showResultDetails(resultId);
         });
+        
+        return row;
     }
     
-    // Create charts
-    function createCharts(results) {
-        // Destroy existing charts if they exist
+    // Success rate chart of the whole scan
+    function createSuccessRateChart(successCount, failedCount) {
+        // Progress events update the existing chart in place
         if (successRateChart) {
-            successRateChart.destroy();
-        }
-        
-        if (executionTimeChart) {
-            executionTimeChart.destroy();
+            successRateChart.data.datasets[0].data = [successCount, failedCount];
+            successRateChart.update('none');
+            return;
         }
         
-        // Success Rate Chart
-        const successCount = results.filter(r => r.status_code === 'success').length;
-        const failedCount = results.filter(r => r.status_code === 'failed').length;
-        
         const successRateCtx = document.getElementById('successRateChart').getContext('2d');
         successRateChart = new Chart(successRateCtx, {
             type: 'pie',
@@ -285,41 +508,27 @@ document.addEventListener('DOMContentLoaded', function() {
                 }
             }
         });
+    }
+    
+    // Execution time chart from the host counts per time range of the summary
+    function createExecutionTimeChart(buckets) {
+        const labels = ['Under 1s', '1-5s', '5-10s', '10-30s', 'Over 30s'];
         
-        // Execution Time Chart
-        // Group by time ranges
-        const timeRanges = {
-            'Under 1s': 0,
-            '1-5s': 0,
-            '5-10s': 0,
-            '10-30s': 0,
-            'Over 30s': 0
-        };
-        
-        results.forEach(result => {
-            const time = result.execution_time || 0;
-            
-            if (time < 1) {
-                timeRanges['Under 1s']++;
-            } else if (time < 5) {
-                timeRanges['1-5s']++;
-            } else if (time < 10) {
-                timeRanges['5-10s']++;
-            } else if (time < 30) {
-                timeRanges['10-30s']++;
-            } else {
-                timeRanges['Over 30s']++;
-            }
-        });
+        // A refreshed summary updates the existing chart in place
+        if (executionTimeChart) {
+            executionTimeChart.data.datasets[0].data = buckets;
+            executionTimeChart.update('none');
+            return;
+        }
         
         const executionTimeCtx = document.getElementById('executionTimeChart').getContext('2d');
         executionTimeChart = new Chart(executionTimeCtx, {
             type: 'bar',
             data: {
-                labels: Object.keys(timeRanges),
+                labels: labels,
                 datasets: [{
                     label: 'Hosts',
-                    data: Object.values(timeRanges),
+                    data: buckets,
                     backgroundColor: '#0d6efd',
                     borderWidth: 1
                 }]
@@ -353,56 +562,24 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
-    // Apply filters to results table
+    // Reload the results with the current filters
     function applyFilters() {
-        const statusFilter = document.getElementById('statusFilter').value;
-        const sudoFilter = document.getElementById('sudoFilter').value;
-        const searchFilter = document.getElementById('searchInput').value.toLowerCase();
-        
-        if (!resultsTable) return;
-        
-        // Clear all filters
-        resultsTable.search('').columns().search('').draw();
-        
-        // Apply custom filtering
-        $.fn.dataTable.ext.search.push(
-            function(settings, data, dataIndex) {
-                // Skip if not the results table
-                if (settings.nTable.id !== 'resultsTable') return true;
-                
-                const statusValue = data[1].toLowerCase().includes('success') ? 'success' : 'failed';
-                const sudoValue = data[3].toLowerCase().includes('check') ? 'yes' : 'no';
-                const ipAndOutput = data[0].toLowerCase();
-                
-                // Status filter
-                const statusMatch = statusFilter === 'all' || statusFilter === statusValue;
-                
-                // Sudo filter
-                const sudoMatch = sudoFilter === 'all' || 
-                                 (sudoFilter === 'yes' && sudoValue === 'yes') || 
-                                 (sudoFilter === 'no' && sudoValue === 'no');
-                
-                // Search filter
-                const searchMatch = searchFilter === '' || ipAndOutput.includes(searchFilter);
-                
-                return statusMatch && sudoMatch && searchMatch;
-            }
-        );
-        
-        // Redraw the table with filters applied
-        resultsTable.draw();
-        
-        // Remove the custom filter function to prevent it from stacking
-        $.fn.dataTable.ext.search.pop();
+        if (!currentScanId) return;
+        loadResultsPage(true);
     }
     
-    // Show result details
+    // Show result details; output and server info are only loaded here
     function showResultDetails(resultId) {
-        if (!currentScanData) return;
-        
-        const result = currentScanData.find(r => r.id === parseInt(resultId));
-        if (!result) return;
-        
+        fetch(`/scan_result/${resultId}`)
+            .then(response => response.json())
+            .then(renderResultDetails)
+            .catch(error => {
+                console.error('Error loading result details:', error);
+                showToast('Failed to load result details', 'Error', 'danger');
+            });
+    }
+    
+    function renderResultDetails(result) {
         document.getElementById('detailsIpAddress').textContent = result.ip_address;
         
         // Populate command output
@@ -427,6 +604,11 @@ document.addEventListener('DOMContentLoaded', function() {
                                         aria-expanded="${isFirst ? 'true' : 'false'}" aria-controls="${collapseId}">
                                     <i class="fas fa-${statusIcon} ${statusClass} me-2"></i>
                                     <code>${cmd.command}</code>
+                                    ${cmd.truncated ? `
+                                    <span class="ms-2 badge bg-warning text-dark" title="${cmd.stdout_bytes || 0} bytes stdout, ${cmd.stderr_bytes || 0} bytes stderr">
+                                        Truncated
+                                    </span>
+                                    ` : ''}
                                     <span class="ms-auto badge ${cmd.success ? 'bg-success' : 'bg-danger'}">
                                         Exit: ${cmd.exit_status}
                                     </span>
@@ -870,61 +1052,4 @@ document.addEventListener('DOMContentLoaded', function() {
         if (!time) return 'N/A';
         return time < 1 ? `${Math.round(time * 1000)}ms` : `${time.toFixed(2)}s`;
     }
-    
-    // Convert results to CSV format
-    function convertToCSV(results) {
-        if (!results || results.length === 0) return '';
-        
-        // Define CSV headers
-        const headers = [
-            'IP Address',
-            'Status',
-            'SSH Status',
-            'Sudo Status',
-            'Command Status',
-            'Execution Time (s)',
-            'Error Message',
-            'Created At'
-        ];
-        
-        // Create CSV content
-        let csvContent = headers.join(',') + '\n';
-        
-        // Add data rows
-        results.forEach(result => {
-            const row = [
-                `"${result.ip_address}"`,
-                `"${result.status_code}"`,
-                result.ssh_status ? 'Yes' : 'No',
-                result.sudo_status ? 'Yes' : 'No',
-                result.command_status ? 'Yes' : 'No',
-                result.execution_time || 'N/A',
-                `"${(result.error_message || '').replace(/"/g, '""')}"`,
-                new Date(result.created_at).toISOString()
-            ];
-            
-            csvContent += row.join(',') + '\n';
-        });
-        
-        return csvContent;
-    }
-    
-    // Download file helper
-    function downloadFile(filename, content, contentType) {
-        const blob = new Blob([content], { type: contentType });
-        const url = URL.createObjectURL(blob);
-        
-        const a = document.createElement('a');
-        a.href = url;
-        a.download = filename;
-        a.style.display = 'none';
-        
-        document.body.appendChild(a);
-        a.click();
-        
-        setTimeout(() => {
-            document.body.removeChild(a);
-            URL.revokeObjectURL(url);
-        }, 100);
-    }
 });
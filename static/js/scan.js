@@ -113,7 +113,7 @@ document.addEventListener('DOMContentLoaded', function() {
             .then(data => {
                 if (data.success) {
                     const scanId = data.scan_id;
-                    pollScanStatus(scanId);
+                    watchScanStatus(scanId);
                 } else {
                     alert('Error starting scan: ' + data.message);
                     scanProgressModal.hide();
@@ -127,23 +127,58 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
+    // Update the progress UI; returns true once the scan is complete
+    function updateScanProgress(scanId, data) {
+        const percentComplete = data.percent_complete;
+        scanProgressBar.style.width = `${percentComplete}%`;
+        scanProgressBar.setAttribute('aria-valuenow', percentComplete);
+        
+        totalIPsElement.textContent = data.total;
+        completedIPsElement.textContent = data.completed;
+        
+        // If scan is complete, show results link
+        if (data.status === 'completed' || percentComplete >= 100) {
+            document.getElementById('viewResultsBtn').classList.remove('d-none');
+            document.getElementById('viewResultsBtn').setAttribute('href', `/results?scan_id=${scanId}`);
+            return true;
+        }
+        return false;
+    }
+    
+    // Subscribe to pushed scan progress, falling back to polling
+    function watchScanStatus(scanId) {
+        if (!window.EventSource) {
+            pollScanStatus(scanId);
+            return;
+        }
+        
+        const events = new EventSource(`/scan_events/${scanId}`);
+        let finished = false;
+        
+        events.addEventListener('progress', event => {
+            updateScanProgress(scanId, JSON.parse(event.data));
+        });
+        
+        events.addEventListener('complete', event => {
+            finished = true;
+            events.close();
+            updateScanProgress(scanId, JSON.parse(event.data));
+        });
+        
+        events.onerror = () => {
+            // The browser reconnects on its own unless the stream was refused
+            if (!finished && events.readyState === EventSource.CLOSED) {
+                pollScanStatus(scanId);
+            }
+        };
+    }
+    
     // Poll scan status
     function pollScanStatus(scanId) {
         fetch(`/scan_status/${scanId}`)
             .then(response => response.json())
             .then(data => {
-                // Update progress UI
-                const percentComplete = data.percent_complete;
-                scanProgressBar.style.width = `${percentComplete}%`;
-                scanProgressBar.setAttribute('aria-valuenow', percentComplete);
-                
-                totalIPsElement.textContent = data.total;
-                completedIPsElement.textContent = data.completed;
-                
-                // If scan is complete, show results link
-                if (data.status === 'completed' || percentComplete >= 100) {
-                    document.getElementById('viewResultsBtn').classList.remove('d-none');
-                    document.getElementById('viewResultsBtn').setAttribute('href', `/results?scan_id=${scanId}`);
+                if (updateScanProgress(scanId, data)) {
                     return;
                 }
                 
@@ -197,6 +232,86 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
+    // CSV import: the server parses the file and returns the merged target ranges
+    const csvImportForm = document.getElementById('csvImportForm');
+    const csvImportResult = document.getElementById('csvImportResult');
+    const csvImportButton = document.getElementById('csvImportButton');
+
+    if (csvImportForm) {
+        csvImportForm.addEventListener('submit', function(e) {
+            e.preventDefault();
+
+            if (!csvImportForm.checkValidity()) {
+                e.stopPropagation();
+                csvImportForm.classList.add('was-validated');
+                return;
+            }
+
+            csvImportButton.disabled = true;
+            csvImportResult.innerHTML = '<span class="text-info"><i class="fas fa-spinner fa-spin me-1"></i> Importing...</span>';
+
+            fetch('/import_targets', {
+                method: 'POST',
+                body: new FormData(csvImportForm)
+            })
+            .then(response => response.json())
+            .then(data => {
+                renderCsvImportResult(data);
+                if (data.success) {
+                    const existing = subnetsTextarea.value.trim();
+                    subnetsTextarea.value = existing ? `${existing}\n${data.targets}` : data.targets;
+                    bootstrap.Tab.getOrCreateInstance(document.getElementById('manual-tab')).show();
+                    showToast(`Imported ${data.ip_count} IP addresses from ${data.rows} rows`, 'CSV Import', 'success');
+                }
+            })
+            .catch(error => {
+                console.error('Error:', error);
+                csvImportResult.innerHTML = '<span class="text-danger"><i class="fas fa-exclamation-circle me-1"></i> Import failed</span>';
+            })
+            .finally(() => {
+                csvImportButton.disabled = false;
+            });
+        });
+    }
+
+    function renderCsvImportResult(data) {
+        csvImportResult.innerHTML = '';
+
+        const summary = document.createElement('div');
+        if (data.success) {
+            const column = data.has_header ? `column "${data.column}"` : 'a file without header';
+            summary.className = 'text-success';
+            summary.textContent = `Found ${data.ip_count} IP addresses in ${data.rows} rows (${column}).`;
+        } else {
+            summary.className = 'text-danger';
+            summary.textContent = data.error || 'Import failed';
+        }
+        csvImportResult.appendChild(summary);
+
+        if (!data.error_count) {
+            return;
+        }
+        const heading = document.createElement('div');
+        heading.className = 'text-warning mt-2';
+        heading.textContent = data.error_count > data.errors.length
+            ? `${data.error_count} invalid entries were skipped, the first ${data.errors.length}:`
+            : `${data.error_count} invalid entries were skipped:`;
+        csvImportResult.appendChild(heading);
+
+        const table = document.createElement('table');
+        table.className = 'table table-sm table-striped mt-1';
+        table.innerHTML = '<thead><tr><th>Line</th><th>Value</th><th>Error</th></tr></thead>';
+        const body = document.createElement('tbody');
+        data.errors.forEach(error => {
+            const row = body.insertRow();
+            [error.line, error.value, error.error].forEach(value => {
+                row.insertCell().textContent = value;
+            });
+        });
+        table.appendChild(body);
+        csvImportResult.appendChild(table);
+    }
+
     // Reset form button
     const resetFormBtn = document.getElementById('resetForm');
     
@@ -1,90 +1,436 @@
+import bisect
+import csv
 import ipaddress
-import pandas as pd
 import io
+import itertools
 import re
 import logging
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-def parse_subnet(subnet_str):
-    """Parse a subnet string (CIDR notation) and return a list of IP addresses"""
+def int_to_ip(value):
+    """Convert an integer to a dotted-quad IPv4 string"""
+    return f"{value >> 24}.{(value >> 16) & 255}.{(value >> 8) & 255}.{value & 255}"
+
+def ip_sort_key(ip_address):
+    """Integer ordering IPv4 addresses numerically; anything else sorts after them"""
+    try:
+        return int(ipaddress.IPv4Address(ip_address.strip()))
+    except (ValueError, AttributeError):
+        return 1 << 32
+
+def _merge_intervals(intervals):
+    """Sort inclusive (start, end) intervals and merge overlapping or adjacent ones"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+class TargetSet:
+    """Set of IPv4 target addresses stored as sorted, merged integer intervals.
+
+    Iterating yields dotted-quad strings in ascending order, generated on demand,
+    and len() is computed from the intervals, so even a /8 costs a few bytes
+    until the scan actually consumes it. Union and difference are linear in the
+    number of intervals; membership is a binary search.
+    """
+    def __init__(self, intervals=()):
+        self.intervals = _merge_intervals(
+            (start, end) for start, end in intervals if start <= end
+        )
+        self._starts = [start for start, _ in self.intervals]
+
+    def __len__(self):
+        return sum(end - start + 1 for start, end in self.intervals)
+
+    def __bool__(self):
+        return bool(self.intervals)
+
+    def __iter__(self):
+        for start, end in self.intervals:
+            for value in range(start, end + 1):
+                yield int_to_ip(value)
+
+    def __contains__(self, address):
+        if isinstance(address, str):
+            try:
+                address = int(ipaddress.IPv4Address(address))
+            except ValueError:
+                return False
+        index = bisect.bisect_right(self._starts, address) - 1
+        return index >= 0 and address <= self.intervals[index][1]
+
+    def __eq__(self, other):
+        return isinstance(other, TargetSet) and self.intervals == other.intervals
+
+    def __or__(self, other):
+        return self.union(other)
+
+    def __sub__(self, other):
+        return self.difference(other)
+
+    def __repr__(self):
+        ranges = ', '.join(f"{int_to_ip(start)}-{int_to_ip(end)}" for start, end in self.intervals)
+        return f"TargetSet([{ranges}])"
+
+    def ranges(self):
+        """Yield each interval as "first-last", or as one address, in parse_target_set syntax"""
+        for start, end in self.intervals:
+            yield int_to_ip(start) if start == end else f"{int_to_ip(start)}-{int_to_ip(end)}"
+
+    def chunks(self, size):
+        """Yield consecutive TargetSets of at most `size` addresses, in ascending order"""
+        chunk = []
+        remaining = size
+        for start, end in self.intervals:
+            while start <= end:
+                stop = min(end, start + remaining - 1)
+                chunk.append((start, stop))
+                remaining -= stop - start + 1
+                start = stop + 1
+                if not remaining:
+                    yield TargetSet(chunk)
+                    chunk = []
+                    remaining = size
+        if chunk:
+            yield TargetSet(chunk)
+
+    def union(self, other):
+        """Return a TargetSet containing the addresses of both sets"""
+        return TargetSet(self.intervals + other.intervals)
+
+    def difference(self, other):
+        """Return a TargetSet with the addresses of `other` removed"""
+        result = []
+        excluded = other.intervals
+        index = 0
+        for start, end in self.intervals:
+            # Skip exclusions that end before this interval
+            while index < len(excluded) and excluded[index][1] < start:
+                index += 1
+            cursor = start
+            scan = index
+            while scan < len(excluded) and excluded[scan][0] <= end:
+                ex_start, ex_end = excluded[scan]
+                if ex_start > cursor:
+                    result.append((cursor, ex_start - 1))
+                cursor = max(cursor, ex_end + 1)
+                if ex_end > end:
+                    break
+                scan += 1
+            if cursor <= end:
+                result.append((cursor, end))
+        return TargetSet(result)
+
+    @classmethod
+    def from_addresses(cls, addresses):
+        """Build a TargetSet from individual dotted-quad addresses"""
+        values = (int(ipaddress.IPv4Address(address)) for address in addresses)
+        return cls((value, value) for value in values)
+
+def _subnet_bounds(subnet_str, hosts_only=True):
+    """(first, last) integers of an IPv4 CIDR subnet; raises ValueError if invalid"""
+    network = ipaddress.ip_network(subnet_str.strip(), strict=False)
+    if network.version != 4:
+        raise ValueError("only IPv4 subnets are supported")
+    first = int(network.network_address)
+    last = int(network.broadcast_address)
+    # Match network.hosts(): skip network and broadcast addresses except for /31 and /32
+    if hosts_only and network.prefixlen < 31:
+        first, last = first + 1, last - 1
+    return (first, last)
+
+def _range_bounds(range_str):
+    """(start, end) integers of an IP range or single address; raises ValueError if invalid"""
+    if '-' not in range_str:
+        value = int(ipaddress.IPv4Address(range_str.strip()))
+        return (value, value)
+
+    parts = range_str.split('-')
+    if len(parts) != 2:
+        raise ValueError("a range has exactly one '-'")
+    start_ip, end_ip = parts
+
+    # If end_ip is just the last octet
+    if '.' not in end_ip:
+        base_ip = start_ip.split('.')
+        end_ip = '.'.join(base_ip[:-1]) + '.' + end_ip
+
+    start = ipaddress.IPv4Address(start_ip.strip())
+    end = ipaddress.IPv4Address(end_ip.strip())
+
+    return (int(start), int(end))
+
+def subnet_interval(subnet_str, hosts_only=True):
+    """Return the (first, last) host integers of an IPv4 CIDR subnet, or None if invalid
+
+    With hosts_only=False the network and broadcast addresses are included, which
+    is what an exclusion like "!10.20.0.0/16" should remove.
+    """
     try:
-        network = ipaddress.ip_network(subnet_str, strict=False)
-        return [str(ip) for ip in network.hosts()]
+        return _subnet_bounds(subnet_str, hosts_only=hosts_only)
     except ValueError as e:
         logger.error(f"Invalid subnet format: {subnet_str} - {str(e)}")
-        return []
+        return None
 
-def parse_ip_range(range_str):
-    """Parse IP range in format 192.168.1.1-192.168.1.10"""
+def ip_range_interval(range_str):
+    """Return the (start, end) integers of an IP range like 192.168.1.1-192.168.1.10, or None if invalid"""
     try:
-        if '-' not in range_str:
-            return [range_str]  # Single IP address
-        
-        start_ip, end_ip = range_str.split('-')
-        
-        # If end_ip is just the last octet
-        if '.' not in end_ip:
-            base_ip = start_ip.split('.')
-            end_ip = '.'.join(base_ip[:-1]) + '.' + end_ip
-        
-        start = ipaddress.IPv4Address(start_ip.strip())
-        end = ipaddress.IPv4Address(end_ip.strip())
-        
-        return [str(ipaddress.IPv4Address(ip)) for ip in range(int(start), int(end) + 1)]
+        return _range_bounds(range_str)
     except Exception as e:
         logger.error(f"Invalid IP range format: {range_str} - {str(e)}")
-        return []
+        return None
+
+def parse_subnet(subnet_str):
+    """Parse a subnet string (CIDR notation) and return a list of IP addresses"""
+    interval = subnet_interval(subnet_str)
+    return list(TargetSet([interval])) if interval else []
+
+def parse_ip_range(range_str):
+    """Parse IP range in format 192.168.1.1-192.168.1.10"""
+    interval = ip_range_interval(range_str)
+    return list(TargetSet([interval])) if interval else []
+
+_ADDRESS_PATTERN = re.compile(r'^([0-9]{1,3}\.){3}[0-9]{1,3}$')
+_ENTRY_SEPARATOR = re.compile(r'[\n,]')
+_EXCEPT_SEPARATOR = re.compile(r'\s+except\s+', re.IGNORECASE)
+_AND_SEPARATOR = re.compile(r'\s+and\s+', re.IGNORECASE)
+
+def target_entry_interval(entry, hosts_only=True):
+    """Parse one CIDR, range or single-address entry into an interval
+
+    Raises:
+        ValueError: With the reason the entry is not a valid target
+    """
+    # Check if the entry contains a CIDR subnet
+    if '/' in entry:
+        return _subnet_bounds(entry, hosts_only=hosts_only)
+    # Plain addresses are the bulk of large inventories; skip ipaddress for them
+    if _ADDRESS_PATTERN.match(entry):
+        value = 0
+        for octet in entry.split('.'):
+            # Same rules as ipaddress: at most 255, no leading zeros
+            if int(octet) > 255 or (len(octet) > 1 and octet[0] == '0'):
+                raise ValueError(f"{entry!r} is not a valid IPv4 address")
+            value = (value << 8) | int(octet)
+        return (value, value)
+    # Check if the entry contains an IP range
+    if '-' in entry:
+        start, end = _range_bounds(entry)
+        if start > end:
+            raise ValueError("range ends before it starts")
+        return (start, end)
+    raise ValueError("not an IP address, range or CIDR subnet")
+
+class TargetSetBuilder:
+    """Collects target input piece by piece and builds one TargetSet from it
+
+    Accepts the same syntax as parse_target_set, including exclusions, which
+    apply to everything added. Intervals are merged every COMPACT_EVERY new
+    entries, so repeated and overlapping entries of a large input only cost
+    memory until the next merge.
+    """
+    COMPACT_EVERY = 65536
+
+    def __init__(self):
+        self.included = []
+        self.excluded = []
+        self._compact_at = self.COMPACT_EVERY
+
+    def add(self, text):
+        """Add entries separated by new lines or commas
+
+        Returns:
+            List of (entry, reason) tuples for the entries that are not valid
+        """
+        errors = []
+        # Split input by lines or commas
+        for line in _ENTRY_SEPARATOR.split(text):
+            line = line.strip()
+            if not line:
+                continue
+
+            entries = []
+            parts = _EXCEPT_SEPARATOR.split(line, maxsplit=1)
+            if len(parts) == 2:
+                line = parts[0].strip()
+                for entry in _AND_SEPARATOR.split(parts[1].strip()):
+                    entries.append((entry.strip(), True))
+
+            if line.startswith('!'):
+                entries.append((line[1:].strip(), True))
+            elif line:
+                entries.append((line, False))
+
+            for entry, exclude in entries:
+                try:
+                    interval = target_entry_interval(entry, hosts_only=not exclude)
+                except ValueError as e:
+                    errors.append((entry, str(e)))
+                    continue
+                (self.excluded if exclude else self.included).append(interval)
+
+        if len(self.included) + len(self.excluded) >= self._compact_at:
+            self._compact()
+        return errors
+
+    def _compact(self):
+        self.included = _merge_intervals(self.included)
+        self.excluded = _merge_intervals(self.excluded)
+        # Scattered single addresses do not merge; wait for as many new entries again
+        self._compact_at = max(self.COMPACT_EVERY, 2 * (len(self.included) + len(self.excluded)))
+
+    def build(self):
+        targets = TargetSet(self.included)
+        if self.excluded:
+            targets = targets - TargetSet(self.excluded)
+        return targets
+
+def _target_set_from_lines(lines):
+    """Build a TargetSet from an iterable of input lines (see parse_target_set)
+
+    Entries are parsed as they are read, so only their intervals are kept.
+    """
+    builder = TargetSetBuilder()
+    for text in lines:
+        for entry, reason in builder.add(text):
+            logger.error(f"Invalid target entry: {entry} - {reason}")
+    return builder.build()
+
+def parse_target_set(input_text):
+    """Parse various subnet input formats into a lazily-iterated TargetSet
+
+    Entries are separated by new lines or commas. Exclusions are applied to the
+    whole input and can be written as "!10.20.0.0/16" or inline as
+    "10.0.0.0/8 except 10.20.0.0/16 and 10.99.1.0/24".
+    """
+    return _target_set_from_lines([input_text])
 
 def parse_subnet_input(input_text):
-    """Parse various subnet input formats and return a list of IP addresses"""
-    ip_addresses = []
-    
-    # Split input by lines or commas
-    lines = re.split(r'[\n,]', input_text)
-    
-    for line in lines:
-        line = line.strip()
-        if not line:
+    """Parse various subnet input formats and return a sorted, de-duplicated list of IP addresses"""
+    return list(parse_target_set(input_text))
+
+# Header names recognised as the column holding the targets, compared
+# lowercase without spaces, dashes or underscores ("IP Address" -> "ipaddress")
+CSV_TARGET_COLUMNS = ['ip', 'ipaddress', 'ipv4', 'ipv4address', 'subnet', 'cidr', 'address', 'network',
+                      'iprange', 'target']
+
+# Invalid rows listed in an import result; the rest are only counted
+CSV_IMPORT_MAX_ERRORS = 100
+
+def _header_key(name):
+    return re.sub(r'[^a-z0-9]', '', name.lower())
+
+def _is_target(value):
+    try:
+        target_entry_interval(value.strip().lstrip('!').strip())
+        return True
+    except ValueError:
+        return False
+
+class CSVTargetImport:
+    """Outcome of reading a CSV file of targets"""
+    def __init__(self):
+        self.targets = TargetSet()
+        self.column = None
+        self.has_header = True
+        self.rows = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, line, value, reason, max_errors):
+        self.error_count += 1
+        if len(self.errors) < max_errors:
+            self.errors.append({'line': line, 'value': value[:200], 'error': reason})
+
+    def to_dict(self):
+        return {
+            'column': self.column,
+            'has_header': self.has_header,
+            'rows': self.rows,
+            'ip_count': len(self.targets),
+            'error_count': self.error_count,
+            'errors': self.errors,
+        }
+
+def import_csv_targets(lines, max_errors=CSV_IMPORT_MAX_ERRORS):
+    """Read a CSV file of targets row by row into a TargetSet
+
+    The delimiter is detected from the first line (comma, semicolon, tab or
+    pipe). Targets come from the first column whose header is in
+    CSV_TARGET_COLUMNS. Without such a header, a first row that already holds
+    a target means the file has no header, and the column of that target is
+    used; otherwise the first column is. Cells may hold several entries and
+    exclusions, as in parse_target_set.
+
+    Args:
+        lines: Iterable of the file's lines, e.g. a text file opened with newline=''
+        max_errors: How many invalid entries to list in the result
+
+    Returns:
+        CSVTargetImport; errors list the line, value and reason of invalid entries
+
+    Raises:
+        csv.Error: If the file is not valid CSV
+    """
+    result = CSVTargetImport()
+    lines = iter(lines)
+    first_line = next(lines, '')
+    try:
+        dialect = csv.Sniffer().sniff(first_line, delimiters=',;\t|')
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(itertools.chain([first_line], lines), dialect)
+
+    header = next(reader, None)
+    if not header:
+        return result
+
+    keys = [_header_key(name) for name in header]
+    column = next((index for index, key in enumerate(keys) if key in CSV_TARGET_COLUMNS), None)
+    rows = reader
+    if column is None:
+        column = next((index for index, value in enumerate(header) if _is_target(value)), None)
+        if column is not None:
+            result.has_header = False
+            rows = itertools.chain([header], reader)
+        else:
+            column = 0
+    result.column = header[column] if result.has_header else None
+
+    builder = TargetSetBuilder()
+    for row in rows:
+        if not row:
+            continue  # blank line
+        result.rows += 1
+        line = reader.line_num
+        value = row[column].strip() if len(row) > column else ''
+        if not value:
+            result.add_error(line, '', 'no target in this row', max_errors)
             continue
-        
-        # Check if the line contains a CIDR subnet
-        if '/' in line:
-            ip_addresses.extend(parse_subnet(line))
-        # Check if the line contains an IP range
-        elif '-' in line:
-            ip_addresses.extend(parse_ip_range(line))
-        # Check if it's a single IP address
-        elif re.match(r'^(\d{1,3}\.){3}\d{1,3}$', line):
-            ip_addresses.append(line)
-    
-    # Remove duplicates and sort
-    ip_addresses = sorted(list(set(ip_addresses)), 
-                         key=lambda ip: [int(octet) for octet in ip.split('.')])
-    
-    return ip_addresses
+        for entry, reason in builder.add(value):
+            result.add_error(line, entry, reason, max_errors)
+
+    result.targets = builder.build()
+    return result
 
 def parse_csv_file(csv_content):
-    """Parse CSV file containing IP addresses or subnets"""
+    """Parse CSV file containing IP addresses or subnets (see import_csv_targets)
+
+    Args:
+        csv_content: CSV text, or an iterable of its lines such as a text file
+
+    Returns:
+        Sorted, de-duplicated list of IP addresses
+    """
     try:
-        df = pd.read_csv(io.StringIO(csv_content))
-        
-        # Try to find a column with IP addresses or subnets
-        ip_column = None
-        for col in df.columns:
-            if col.lower() in ['ip', 'ipaddress', 'ip_address', 'subnet', 'address', 'network']:
-                ip_column = col
-                break
-        
-        if not ip_column and len(df.columns) > 0:
-            # If no obvious column name, use the first column
-            ip_column = df.columns[0]
-        
-        if ip_column:
-            return parse_subnet_input('\n'.join(df[ip_column].astype(str).tolist()))
-        else:
-            return []
+        lines = io.StringIO(csv_content, newline='') if isinstance(csv_content, str) else csv_content
+        return list(import_csv_targets(lines).targets)
     except Exception as e:
         logger.error(f"Error parsing CSV file: {str(e)}")
         return []
@@ -1 +1,30 @@
 # Test package marker for explicit module-based test runs.
+import unittest
+from pathlib import Path
+
+
+class AppTestCase(unittest.TestCase):
+    """Loads the app against a fresh SQLite database once per test class
+
+    Subclasses get `app_module`, `app` and `db`; extend setUpClass after
+    calling super() and stop their own fixtures before tearDownClass's super().
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        # Imported here so tests.test_app can inherit from this class
+        from tests.test_app import load_app_with_temp_db
+
+        cls.db_path, cls.app_module = load_app_with_temp_db()
+        cls.app = cls.app_module.app
+        cls.db = cls.app_module.db
+
+    @classmethod
+    def tearDownClass(cls):
+        with cls.app.app_context():
+            cls.db.session.remove()
+            cls.db.drop_all()
+            cls.db.engine.dispose()
+        db_file = Path(cls.db_path)
+        if db_file.exists():
+            db_file.unlink()
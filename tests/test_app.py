@@ -1,9 +1,12 @@
 import importlib
 import os
+import re
 import sys
 import unittest
 from pathlib import Path
 
+from tests import AppTestCase
+
 
 TEST_ENCRYPTION_KEY = "MDAwMDAwMDAwMDAwMDAwMDAwMDAwMDAwMDAwMDAwMDA="
 
@@ -26,10 +29,19 @@ def load_app_with_temp_db():
         "models",
         "forms",
         "ssh_utils",
+        "scan_engine",
+        "result_writer",
+        "result_export",
+        "export_jobs",
+        "credential_cache",
         "subnet_utils",
+        "scan_queue",
         "encryption_utils",
         "migrations.scheduled_scans",
         "migrations.credential_sets",
+        "migrations.command_templates",
+        "migrations.scan_progress",
+        "migrations.scan_results_keyset",
     ]
     for module_name in modules_to_clear:
         sys.modules.pop(module_name, None)
@@ -43,23 +55,7 @@ def load_app_with_temp_db():
     return str(db_path), app_module
 
 
-class AppRoutesTestCase(unittest.TestCase):
-    @classmethod
-    def setUpClass(cls):
-        cls.db_path, cls.app_module = load_app_with_temp_db()
-        cls.app = cls.app_module.app
-        cls.db = cls.app_module.db
-
-    @classmethod
-    def tearDownClass(cls):
-        with cls.app.app_context():
-            cls.db.session.remove()
-            cls.db.drop_all()
-            cls.db.engine.dispose()
-        db_file = Path(cls.db_path)
-        if db_file.exists():
-            db_file.unlink()
-
+class AppRoutesTestCase(AppTestCase):
     def setUp(self):
         self.client = self.app.test_client()
         with self.app.app_context():
@@ -111,6 +107,53 @@ class AppRoutesTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertEqual(response.get_json(), {"error": "Username is required"})
 
+    def test_start_scan_rejects_out_of_range_command_parallelism(self):
+        login_response = self.login()
+        self.assertEqual(login_response.status_code, 302)
+
+        response = self.client.post(
+            "/start_scan",
+            json={
+                "subnets": "192.168.1.10",
+                "username": "tester",
+                "password": "secret",
+                "command_parallelism": 50,
+            },
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json(), {"error": "Command parallelism must be between 1 and 10"})
+
+    def test_import_targets_returns_merged_ranges_and_row_errors(self):
+        import io
+
+        login_response = self.login()
+        self.assertEqual(login_response.status_code, 302)
+
+        upload = "\ufeffHost,IP Address\n" + "".join(f"h{i},10.0.{i // 256}.{i % 256}\n" for i in range(600))
+        upload += "bad,10.0.0.999\n"
+        response = self.client.post(
+            "/import_targets",
+            data={"csvFile": (io.BytesIO(upload.encode("utf-8")), "inventory.csv")},
+            content_type="multipart/form-data",
+        )
+        payload = response.get_json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(payload["column"], "IP Address")
+        self.assertEqual((payload["rows"], payload["ip_count"], payload["error_count"]), (601, 600, 1))
+        self.assertEqual(payload["targets"], "10.0.0.0-10.0.2.87")
+        self.assertEqual(payload["errors"][0]["line"], 602)
+
+        response = self.client.post(
+            "/import_targets",
+            data={"csvFile": (io.BytesIO(b"name\nnot-an-ip\n"), "empty.csv")},
+            content_type="multipart/form-data",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()["error"], "No valid IP addresses found")
+        self.assertEqual(self.client.post("/import_targets", data={}).status_code, 400)
+
     def test_scan_results_summary_returns_saved_results(self):
         login_response = self.login()
         self.assertEqual(login_response.status_code, 302)
@@ -155,6 +198,388 @@ class AppRoutesTestCase(unittest.TestCase):
         self.assertEqual(payload["summary"]["success"], 1)
         self.assertEqual(payload["summary"]["failed"], 1)
 
+    def test_scan_status_reads_session_counters(self):
+        login_response = self.login()
+        self.assertEqual(login_response.status_code, 302)
+
+        with self.app.app_context():
+            session = self.app_module.ScanSession(username="tester", auth_type="password", total_ips=4)
+            self.db.session.add(session)
+            self.db.session.commit()
+            self.db.session.execute(self.app_module.ScanSession.count_results(session.id, success=2, failed=1))
+            self.db.session.commit()
+            session_id = session.id
+
+        response = self.client.get(f"/scan_status/{session_id}")
+        payload = response.get_json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((payload["completed"], payload["success"], payload["failed"]), (3, 2, 1))
+        self.assertEqual(payload["percent_complete"], 75)
+
+    def test_scan_summary_aggregates_results(self):
+        login_response = self.login()
+        self.assertEqual(login_response.status_code, 302)
+
+        with self.app.app_context():
+            session = self.app_module.ScanSession(username="tester", auth_type="password", total_ips=4)
+            other = self.app_module.ScanSession(username="tester", auth_type="password", total_ips=1)
+            self.db.session.add_all([session, other])
+            self.db.session.commit()
+            for ip, status, ssh, sudo, execution_time in [
+                ("10.0.0.1", "success", True, True, 0.5), ("10.0.0.2", "success", True, False, 7.0),
+                ("10.0.0.3", "failed", False, False, None), ("10.0.0.4", "pending", False, False, None),
+            ]:
+                self.db.session.add(self.app_module.ScanResult(
+                    scan_session_id=session.id, ip_address=ip, status_code=status,
+                    ssh_status=ssh, sudo_status=sudo, execution_time=execution_time
+                ))
+            self.db.session.add(self.app_module.ScanResult(
+                scan_session_id=other.id, ip_address="10.0.1.1", status_code="success"
+            ))
+            self.db.session.execute(self.app_module.ScanSession.count_results(session.id, success=2, failed=1))
+            self.db.session.commit()
+            session_id, other_id = session.id, other.id
+
+        payload = self.client.get(f"/scan_summary/{session_id}").get_json()
+        summary = payload["summary"]
+
+        self.assertEqual(
+            (summary["total"], summary["success"], summary["failed"], summary["pending"]), (4, 2, 1, 1)
+        )
+        self.assertEqual((summary["ssh_success"], summary["sudo_success"]), (2, 1))
+        self.assertEqual(summary["execution_time_buckets"], [3, 0, 1, 0, 0])
+        self.assertAlmostEqual(summary["avg_execution_time"], 3.75)
+        self.assertAlmostEqual(summary["success_rate"], 200 / 3)
+        # Result rows, the pending one included
+        self.assertEqual(payload["session"]["total_count"], 4)
+        with self.app.app_context():
+            session = self.db.session.get(self.app_module.ScanSession, session_id)
+            self.assertEqual(session.to_dict()["total_count"], 4)
+
+        # The session list counts the same rows as "Total"
+        page = self.client.get("/results").get_data(as_text=True)
+        row = page.split(f'data-scan-id="{session_id}"', 1)[1].split("</tr>", 1)[0]
+        cells = re.findall(r"<td[^>]*>\s*([^<]*?)\s*</td>", row)
+        self.assertEqual(cells[-3:], ["2", "1", "4"])
+        self.assertEqual(payload["progress"]["completed"], 3)
+
+        empty = self.client.get(f"/scan_summary/{other_id + 1}")
+        self.assertEqual(empty.status_code, 404)
+        other_summary = self.client.get(f"/scan_summary/{other_id}").get_json()["summary"]
+        self.assertEqual((other_summary["total"], other_summary["success"]), (1, 1))
+
+    def test_scan_results_page_walks_keyset_with_filters(self):
+        login_response = self.login()
+        self.assertEqual(login_response.status_code, 302)
+
+        with self.app.app_context():
+            session = self.app_module.ScanSession(username="tester", auth_type="password", total_ips=6)
+            self.db.session.add(session)
+            self.db.session.commit()
+            for ip, status, sudo in [
+                ("10.0.0.3", "success", True), ("10.0.0.1", "success", False),
+                ("10.0.1.1", "failed", False), ("10.0.0.2", "failed", False),
+                ("10.0.0.1", "failed", False), ("10.0.0.10", "success", False),
+            ]:
+                self.db.session.add(self.app_module.ScanResult(
+                    scan_session_id=session.id, ip_address=ip, status_code=status,
+                    ssh_status=status == "success", sudo_status=sudo,
+                    command_output='[{"command": "id"}]', server_info='{"hostname": "h"}'
+                ))
+            self.db.session.commit()
+            session_id = session.id
+
+        pages = []
+        url = f"/scan_results/{session_id}/page?limit=2"
+        while url:
+            payload = self.client.get(url).get_json()
+            pages.append(payload)
+            cursor = payload["next_cursor"]
+            url = f"/scan_results/{session_id}/page?limit=2&cursor={cursor}" if cursor else None
+
+        ips = [result["ip_address"] for page in pages for result in page["results"]]
+        # Numeric order: 10.0.0.10 after 10.0.0.3, not after 10.0.0.1
+        self.assertEqual(ips, ["10.0.0.1", "10.0.0.1", "10.0.0.2", "10.0.0.3", "10.0.0.10", "10.0.1.1"])
+        # The numeric key the results table sorts the IP column by
+        self.assertEqual(pages[0]["results"][0]["ip_int"], 0x0A000001)
+        self.assertEqual([len(page["results"]) for page in pages], [2, 2, 2])
+        self.assertEqual(pages[0]["total"], 6)
+        self.assertNotIn("total", pages[1])
+        self.assertNotIn("command_output", pages[0]["results"][0])
+        self.assertNotIn("server_info", pages[0]["results"][0])
+
+        payload = self.client.get(
+            f"/scan_results/{session_id}/page?status=failed&ip=10.0.0.&fields=server_info"
+        ).get_json()
+        self.assertEqual([r["ip_address"] for r in payload["results"]], ["10.0.0.1", "10.0.0.2"])
+        self.assertEqual(payload["results"][0]["server_info"], {"hostname": "h"})
+        self.assertNotIn("command_output", payload["results"][0])
+
+        payload = self.client.get(f"/scan_results/{session_id}/page?sudo_status=yes").get_json()
+        self.assertEqual((payload["total"], payload["results"][0]["ip_address"]), (1, "10.0.0.3"))
+
+        detail = self.client.get(f"/scan_result/{payload['results'][0]['id']}").get_json()
+        self.assertEqual(detail["command_output"], '[{"command": "id"}]')
+
+        self.assertEqual(self.client.get(f"/scan_results/{session_id}/page?cursor=bogus").status_code, 400)
+        self.assertEqual(self.client.get(f"/scan_results/{session_id}/page?fields=password").status_code, 400)
+
+    def test_exports_stream_all_results_in_every_format(self):
+        import csv
+        import gzip
+        import io
+        import json
+        import result_export
+
+        login_response = self.login()
+        self.assertEqual(login_response.status_code, 302)
+
+        with self.app.app_context():
+            session = self.app_module.ScanSession(
+                username="tester", auth_type="password", total_ips=5, status="completed"
+            )
+            self.db.session.add(session)
+            self.db.session.commit()
+            for index in range(5):
+                self.db.session.add(self.app_module.ScanResult(
+                    scan_session_id=session.id, ip_address=f"10.0.0.{5 - index}",
+                    status_code="success" if index % 2 else "failed",
+                    command_output=f'[{{"command": "echo {index}"}}]', error_message="a, \"quoted\" error"
+                ))
+            self.db.session.commit()
+            session_id = session.id
+
+        # Several pages per export
+        previous_batch_size = result_export.EXPORT_BATCH_SIZE
+        result_export.EXPORT_BATCH_SIZE = 2
+        self.addCleanup(setattr, result_export, "EXPORT_BATCH_SIZE", previous_batch_size)
+        expected_ips = [f"10.0.0.{i}" for i in range(1, 6)]
+
+        response = self.client.get(f"/scan_results/{session_id}/export/csv")
+        self.assertEqual(response.mimetype, "text/csv")
+        self.assertTrue(response.is_streamed)
+        rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+        self.assertEqual(rows[0][0], "IP Address")
+        self.assertEqual([row[0] for row in rows[1:]], expected_ips)
+        self.assertEqual(rows[1][6], 'a, "quoted" error')
+
+        response = self.client.get(f"/scan_results/{session_id}/export/json")
+        document = json.loads(response.get_data(as_text=True))
+        self.assertEqual(document["summary"], {"total": 5, "success": 2, "failed": 3, "success_rate": 40.0})
+        self.assertEqual([r["ip_address"] for r in document["results"]], expected_ips)
+        self.assertEqual(document["results"][0]["command_output"], '[{"command": "echo 4"}]')
+
+        response = self.client.get(f"/scan_results/{session_id}/export/ndjson?compress=gzip")
+        self.assertEqual(response.mimetype, "application/gzip")
+        self.assertIn(".ndjson.gz", response.headers["Content-Disposition"])
+        lines = gzip.decompress(response.get_data()).decode().splitlines()
+        self.assertEqual([json.loads(line)["ip_address"] for line in lines], expected_ips)
+
+        self.assertEqual(self.client.get(f"/scan_results/{session_id}/export/csv?compress=zip").status_code, 400)
+        self.assertEqual(self.client.get(f"/scan_results/{session_id}/export/xml").status_code, 400)
+
+    def test_pdf_report_lists_every_host_across_pages(self):
+        import io
+        import re
+        import zlib
+        import result_export
+
+        with self.app.app_context():
+            session = self.app_module.ScanSession(
+                username="tester", auth_type="password", total_ips=7, status="completed"
+            )
+            self.db.session.add(session)
+            self.db.session.commit()
+            for index in range(7):
+                self.db.session.add(self.app_module.ScanResult(
+                    scan_session_id=session.id, ip_address=f"10.0.0.{index + 1}",
+                    status_code="success" if index % 2 else "failed", execution_time=index / 2,
+                    error_message="cost $5 (retry)" if index == 0 else None
+                ))
+            self.db.session.commit()
+
+            previous_rows = result_export.PDF_ROWS_PER_PAGE
+            result_export.PDF_ROWS_PER_PAGE = 3
+            self.addCleanup(setattr, result_export, "PDF_ROWS_PER_PAGE", previous_rows)
+            output = io.BytesIO()
+            pages = result_export.write_pdf_report(session, output)
+
+        data = output.getvalue()
+        # Summary page plus 3 + 3 + 1 hosts
+        self.assertEqual(pages, 4)
+        self.assertEqual(len(re.findall(rb"/Type\s*/Page\b", data)), 4)
+        self.assertIn(b"/BaseFont /Courier", data)
+        text = b"".join(zlib.decompress(stream) for stream in re.findall(rb"stream\n(.*?)\nendstream", data, re.S))
+        for index in range(7):
+            self.assertIn(f"(10.0.0.{index + 1})".encode(), text)
+        self.assertIn(rb"cost $5 \(retry\)", text)
+
+    def test_export_jobs_build_once_and_rebuild_after_changes(self):
+        import tempfile
+        import time
+        import export_jobs
+
+        login_response = self.login()
+        self.assertEqual(login_response.status_code, 302)
+
+        export_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(export_dir.cleanup)
+        export_jobs._manager = export_jobs.ExportJobManager(export_dir.name)
+        self.addCleanup(setattr, export_jobs, "_manager", None)
+
+        with self.app.app_context():
+            session = self.app_module.ScanSession(
+                username="tester", auth_type="password", total_ips=2, status="completed"
+            )
+            self.db.session.add(session)
+            self.db.session.commit()
+            self.db.session.add(self.app_module.ScanResult(
+                scan_session_id=session.id, ip_address="10.0.0.1", status_code="success"
+            ))
+            self.db.session.commit()
+            session_id = session.id
+
+        def wait_for(job):
+            deadline = time.monotonic() + 30
+            while job["status"] in ("queued", "running") and time.monotonic() < deadline:
+                time.sleep(0.05)
+                job = self.client.get(job["status_url"]).get_json()
+            return job
+
+        response = self.client.post(f"/scan_results/{session_id}/export_jobs", json={"format": "csv"})
+        self.assertEqual(response.status_code, 202)
+        job = wait_for(response.get_json())
+        self.assertEqual(job["status"], "completed")
+        download = self.client.get(job["download_url"])
+        self.assertEqual(download.mimetype, "text/csv")
+        self.assertIn("10.0.0.1", download.get_data(as_text=True))
+        download.close()
+        first_files = os.listdir(export_dir.name)
+        self.assertEqual(len(first_files), 1)
+
+        # Unchanged scan: the cached file is reused, also by the direct export URL
+        again = self.client.post(f"/scan_results/{session_id}/export_jobs", json={"format": "csv"}).get_json()
+        self.assertEqual((again["id"], again["status"]), (job["id"], "completed"))
+        cached = self.client.get(f"/scan_results/{session_id}/export/csv")
+        self.assertIsNotNone(cached.content_length)
+        cached.close()
+
+        with self.app.app_context():
+            self.db.session.add(self.app_module.ScanResult(
+                scan_session_id=session_id, ip_address="10.0.0.2", status_code="failed"
+            ))
+            self.db.session.commit()
+
+        rebuilt = self.client.post(f"/scan_results/{session_id}/export_jobs", json={"format": "csv"}).get_json()
+        self.assertNotEqual(rebuilt["id"], job["id"])
+        rebuilt = wait_for(rebuilt)
+        download = self.client.get(rebuilt["download_url"])
+        self.assertIn("10.0.0.2", download.get_data(as_text=True))
+        download.close()
+        files = os.listdir(export_dir.name)
+        self.assertEqual(len(files), 1)
+        self.assertNotEqual(files, first_files)
+
+        pdf = self.client.get(f"/scan_results/{session_id}/export/pdf")
+        self.assertEqual(pdf.status_code, 202)
+        self.assertEqual(wait_for(pdf.get_json())["status"], "completed")
+        pdf = self.client.get(f"/scan_results/{session_id}/export/pdf")
+        self.assertEqual(pdf.mimetype, "application/pdf")
+        self.assertTrue(pdf.get_data().startswith(b"%PDF"))
+        pdf.close()
+
+        self.assertEqual(self.client.get("/export_jobs/unknown").status_code, 404)
+        self.assertEqual(
+            self.client.post(f"/scan_results/{session_id}/export_jobs", json={"format": "xml"}).status_code, 400
+        )
+
+    def test_scan_events_end_with_complete_for_finished_scan(self):
+        login_response = self.login()
+        self.assertEqual(login_response.status_code, 302)
+
+        with self.app.app_context():
+            session = self.app_module.ScanSession(
+                username="tester", auth_type="password", total_ips=1, status="completed"
+            )
+            self.db.session.add(session)
+            self.db.session.commit()
+            session_id = session.id
+
+        response = self.client.get(f"/scan_events/{session_id}")
+        body = response.get_data(as_text=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "text/event-stream")
+        self.assertIn("event: progress", body)
+        self.assertTrue(body.rstrip().split("\n\n")[-1].startswith("event: complete"))
+
+    def test_scan_events_push_committed_results(self):
+        import threading
+        from ssh_utils import mark_scan_session_completed
+        from scan_events import broker, publish_results
+
+        login_response = self.login()
+        self.assertEqual(login_response.status_code, 302)
+
+        with self.app.app_context():
+            session = self.app_module.ScanSession(username="tester", auth_type="password", total_ips=1)
+            self.db.session.add(session)
+            self.db.session.commit()
+            session_id = session.id
+
+        def finish_scan():
+            # Wait for the stream to subscribe
+            while broker.subscriber_count() == 0:
+                threading.Event().wait(0.01)
+            with self.app.app_context():
+                result = self.app_module.ScanResult(
+                    scan_session_id=session_id, ip_address="10.0.0.1", status_code="success"
+                )
+                self.db.session.add(result)
+                self.db.session.execute(self.app_module.ScanSession.count_results(session_id, success=1))
+                self.db.session.commit()
+                result_id = result.id
+            publish_results(session_id, [result_id])
+            mark_scan_session_completed(session_id)
+
+        worker = threading.Thread(target=finish_scan)
+        worker.start()
+        response = self.client.get(f"/scan_events/{session_id}")
+        body = response.get_data(as_text=True)
+        worker.join()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("event: result", body)
+        self.assertIn('"ip_address": "10.0.0.1"', body)
+        self.assertIn('"completed": 1', body)
+        self.assertIn("event: complete", body)
+        self.assertEqual(broker.subscriber_count(), 0)
+
+    def test_scan_event_stream_closed_before_iterating_unsubscribes(self):
+        from werkzeug.test import EnvironBuilder
+        from scan_events import broker
+
+        login_response = self.login()
+        self.assertEqual(login_response.status_code, 302)
+
+        with self.app.app_context():
+            session = self.app_module.ScanSession(username="tester", auth_type="password", total_ips=1)
+            self.db.session.add(session)
+            self.db.session.commit()
+            session_id = session.id
+
+        # Call the WSGI app directly: the test client always reads the first chunk
+        cookie = self.client.get_cookie(self.app.config["SESSION_COOKIE_NAME"])
+        environ = EnvironBuilder(
+            path=f"/scan_events/{session_id}", headers={"Cookie": f"{cookie.key}={cookie.value}"}
+        ).get_environ()
+        app_iter = self.app(environ, lambda status, headers, exc_info=None: None)
+        self.assertEqual(broker.subscriber_count(), 1)
+        app_iter.close()
+
+        self.assertEqual(broker.subscriber_count(), 0)
+
     def test_create_schedule_page_loads_for_authenticated_user(self):
         login_response = self.login()
         self.assertEqual(login_response.status_code, 302)
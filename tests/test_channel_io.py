@@ -0,0 +1,49 @@
+import unittest
+
+from channel_io import OutputBuffer
+
+
+class OutputBufferTestCase(unittest.TestCase):
+    def feed(self, buffer, data, chunk_size):
+        for start in range(0, len(data), chunk_size):
+            buffer.append(data[start:start + chunk_size])
+        return buffer
+
+    def test_small_output_is_kept_whole(self):
+        buffer = self.feed(OutputBuffer(max_bytes=100, tail_bytes=20), b"x" * 100, 7)
+
+        self.assertFalse(buffer.truncated)
+        self.assertEqual(buffer.getvalue(), b"x" * 100)
+        self.assertEqual(buffer.text(), "x" * 100)
+
+    def test_head_and_tail_are_kept(self):
+        data = bytes(range(256)) * 40
+        for chunk_size in (1, 7, 64, 4096, len(data)):
+            buffer = self.feed(OutputBuffer(max_bytes=100, tail_bytes=30), data, chunk_size)
+
+            self.assertEqual(buffer.total_bytes, len(data))
+            self.assertEqual(buffer.head_value(), data[:70])
+            self.assertEqual(buffer.tail_value(), data[-30:])
+            self.assertEqual(buffer.omitted_bytes, len(data) - 100)
+            self.assertLessEqual(buffer.tail_size, 30 + chunk_size)
+
+    def test_truncated_text_has_marker(self):
+        buffer = self.feed(OutputBuffer(max_bytes=10, tail_bytes=4), b"abcdefghij0123456789", 3)
+
+        self.assertTrue(buffer.truncated)
+        self.assertEqual(buffer.text(), "abcdef\n[... 10 bytes omitted, 20 bytes total ...]\n6789")
+
+    def test_tail_is_limited_to_half_of_the_cap(self):
+        buffer = self.feed(OutputBuffer(max_bytes=10, tail_bytes=1024), b"a" * 5 + b"b" * 20, 4)
+
+        self.assertEqual(buffer.getvalue(), b"aaaaabbbbb")
+
+    def test_zero_limit_keeps_everything(self):
+        buffer = self.feed(OutputBuffer(), b"z" * 100000, 32768)
+
+        self.assertFalse(buffer.truncated)
+        self.assertEqual(buffer.stored_bytes, 100000)
+
+
+if __name__ == "__main__":
+    unittest.main()
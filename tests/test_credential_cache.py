@@ -0,0 +1,114 @@
+import importlib
+import unittest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from tests import AppTestCase
+
+
+class CredentialCacheTestCase(AppTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.credential_cache = importlib.import_module("credential_cache")
+        cls.models = importlib.import_module("models")
+
+    def setUp(self):
+        with self.app.app_context():
+            self.models.CredentialHostStat.query.delete()
+            self.db.session.commit()
+        self.credentials = [
+            SimpleNamespace(id=1, priority=10),
+            SimpleNamespace(id=2, priority=5),
+            SimpleNamespace(id=3, priority=0),
+        ]
+
+    def order(self, cache, ip):
+        return [cred.id for cred in cache.order(ip, self.credentials)]
+
+    def test_priority_order_without_history(self):
+        cache = self.credential_cache.CredentialCache.load([1, 2, 3])
+
+        self.assertEqual(self.order(cache, "10.0.0.1"), [1, 2, 3])
+
+    def test_known_good_credential_is_tried_first_in_next_scan(self):
+        cache = self.credential_cache.CredentialCache.load([1, 2, 3])
+        cache.record_failure("10.0.0.1", 1)
+        cache.record_failure("10.0.0.1", 2)
+        cache.record_success("10.0.0.1", 3)
+        cache.flush()
+
+        reloaded = self.credential_cache.CredentialCache.load([1, 2, 3])
+        self.assertEqual(self.order(reloaded, "10.0.0.1")[0], 3)
+        # Neighbours in the same /24 try the set that works there before the others
+        self.assertEqual(self.order(reloaded, "10.0.0.2"), [3, 1, 2])
+        self.assertEqual(self.order(reloaded, "10.0.1.2"), [1, 2, 3])
+
+    def test_failure_penalty_decays(self):
+        cache = self.credential_cache.CredentialCache([1, 2, 3], half_life_hours=1)
+        cache.record_failure("10.0.0.1", 1)
+
+        self.assertEqual(self.order(cache, "10.0.0.1"), [2, 3, 1])
+
+        cache._stats[("10.0.0.1", 1)]["last_failure_at"] = datetime.utcnow() - timedelta(hours=30)
+        cache.record_failure("10.0.0.1", 2)
+        self.assertEqual(self.order(cache, "10.0.0.1"), [3, 1, 2])
+
+    def test_repeated_flush_updates_existing_rows(self):
+        cache = self.credential_cache.CredentialCache.load([1, 2, 3])
+        cache.record_failure("10.0.0.1", 1)
+        cache.flush()
+        cache.record_success("10.0.0.1", 1)
+        cache.flush()
+
+        with self.app.app_context():
+            stats = self.models.CredentialHostStat.query.all()
+            self.assertEqual(len(stats), 1)
+            self.assertEqual((stats[0].success_count, stats[0].failure_count, stats[0].failure_streak), (1, 1, 0))
+
+
+    def stats(self):
+        with self.app.app_context():
+            return {
+                (stat.ip_address, stat.credential_set_id):
+                    (stat.success_count, stat.failure_count, stat.failure_streak)
+                for stat in self.models.CredentialHostStat.query.all()
+            }
+
+    def test_concurrent_scans_flushing_the_same_hosts_add_up(self):
+        first = self.credential_cache.CredentialCache.load([1, 2, 3])
+        second = self.credential_cache.CredentialCache.load([1, 2, 3])
+        first.record_failure("10.0.0.1", 1)
+        first.record_success("10.0.0.2", 1)
+        second.record_failure("10.0.0.1", 1)
+        second.record_success("10.0.0.3", 2)
+
+        first.flush()
+        # The second insert of 10.0.0.1 hits the unique constraint and is merged instead
+        second.flush()
+        self.assertEqual(self.stats(), {
+            ("10.0.0.1", 1): (0, 2, 2), ("10.0.0.2", 1): (1, 0, 0), ("10.0.0.3", 2): (1, 0, 0)
+        })
+
+        # Both now know the row; later outcomes are added to it
+        first.record_success("10.0.0.1", 1)
+        second.record_failure("10.0.0.1", 1)
+        first.flush()
+        second.flush()
+        self.assertEqual(self.stats()[("10.0.0.1", 1)], (1, 3, 1))
+
+    def test_load_reads_only_the_subnets_of_the_targets(self):
+        cache = self.credential_cache.CredentialCache.load([1, 2, 3])
+        for ip in ("10.0.0.1", "10.0.0.200", "10.0.1.1", "10.0.2.1"):
+            cache.record_success(ip, 3)
+        cache.flush()
+
+        subnet_utils = importlib.import_module("subnet_utils")
+        for targets in (["10.0.0.5", "10.0.1.9"], subnet_utils.parse_target_set("10.0.0.5-10.0.1.9")):
+            loaded = self.credential_cache.CredentialCache.load([1, 2, 3], targets=targets)
+            self.assertEqual(sorted(ip for ip, _ in loaded._stats), ["10.0.0.1", "10.0.0.200", "10.0.1.1"])
+            self.assertEqual(self.order(loaded, "10.0.0.5")[0], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import importlib
+import os
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+
+class ScanProgressMigrationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.tmpdir.name) / "legacy.db"
+        self.previous_url = os.environ.get("DATABASE_URL")
+        os.environ["DATABASE_URL"] = f"sqlite:///{self.db_path.as_posix()}"
+
+        conn = sqlite3.connect(self.db_path)
+        conn.executescript("""
+            CREATE TABLE scan_sessions (id INTEGER PRIMARY KEY, username VARCHAR(100) NOT NULL);
+            CREATE TABLE scan_results (
+                id INTEGER PRIMARY KEY, scan_session_id INTEGER NOT NULL,
+                ip_address VARCHAR(50) NOT NULL, status_code VARCHAR(20) NOT NULL
+            );
+            INSERT INTO scan_sessions (id, username) VALUES (1, 'a'), (2, 'b');
+            INSERT INTO scan_results (scan_session_id, ip_address, status_code) VALUES
+                (1, '10.0.0.1', 'success'), (1, '10.0.0.2', 'failed'), (1, '10.0.0.3', 'pending'),
+                (1, '10.0.0.4', 'success');
+        """)
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        if self.previous_url is None:
+            os.environ.pop("DATABASE_URL", None)
+        else:
+            os.environ["DATABASE_URL"] = self.previous_url
+        self.tmpdir.cleanup()
+
+    def test_counters_are_backfilled_and_index_created(self):
+        migration = importlib.import_module("migrations.scan_progress")
+
+        self.assertTrue(migration.migrate_database())
+        # Running it again is a no-op
+        self.assertTrue(migration.migrate_database())
+
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute(
+            "SELECT id, completed_count, success_count, failed_count FROM scan_sessions ORDER BY id"
+        ).fetchall()
+        indexes = [row[1] for row in conn.execute("PRAGMA index_list('scan_results')")]
+        conn.close()
+
+        self.assertEqual(rows, [(1, 3, 2, 1), (2, 0, 0, 0)])
+        self.assertIn("ix_scan_results_session_status", indexes)
+
+    def test_keyset_column_backfilled_and_index_created(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.executescript("""
+            CREATE INDEX ix_scan_results_session_ip ON scan_results (scan_session_id, ip_address, id);
+            INSERT INTO scan_results (scan_session_id, ip_address, status_code) VALUES (1, '10.0.0.10', 'success');
+        """)
+        conn.commit()
+        conn.close()
+        migration = importlib.import_module("migrations.scan_results_keyset")
+
+        self.assertTrue(migration.migrate_database())
+        self.assertTrue(migration.migrate_database())
+
+        conn = sqlite3.connect(self.db_path)
+        columns = [row[2] for row in conn.execute("PRAGMA index_info('ix_scan_results_session_ip_int')")]
+        indexes = [row[1] for row in conn.execute("PRAGMA index_list('scan_results')")]
+        ips = [row[0] for row in conn.execute("SELECT ip_address FROM scan_results ORDER BY ip_int")]
+        conn.close()
+
+        self.assertEqual(columns, ["scan_session_id", "ip_int", "id"])
+        self.assertNotIn("ix_scan_results_session_ip", indexes)
+        self.assertEqual(ips, ["10.0.0.1", "10.0.0.2", "10.0.0.3", "10.0.0.4", "10.0.0.10"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import importlib
+import unittest
+
+from tests import AppTestCase
+
+
+class ScanResultWriterTestCase(AppTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.result_writer = importlib.import_module("result_writer")
+
+    def setUp(self):
+        with self.app.app_context():
+            session = self.app_module.ScanSession(username="tester", auth_type="password", total_ips=2)
+            self.db.session.add(session)
+            self.db.session.commit()
+            self.session_id = session.id
+
+    def make_result(self, ip, status_code="success"):
+        return self.app_module.ScanResult(
+            scan_session_id=self.session_id,
+            ip_address=ip,
+            status_code=status_code,
+            ssh_status=status_code == "success",
+            execution_time=0.5,
+        )
+
+    def results(self):
+        with self.app.app_context():
+            return self.app_module.ScanResult.query.filter_by(scan_session_id=self.session_id).all()
+
+    def test_pending_rows_are_visible_before_completion(self):
+        writer = self.result_writer.ScanResultWriter(flush_size=1, flush_interval=0.01).start()
+        writer.mark_pending(self.session_id, "10.0.0.1")
+        writer.mark_pending(self.session_id, "10.0.0.2")
+        writer.close()
+
+        self.assertEqual(sorted(r.status_code for r in self.results()), ["pending", "pending"])
+        self.assertEqual(sorted(r.ip_int for r in self.results()), [0x0A000001, 0x0A000002])
+
+    def test_final_result_updates_flushed_pending_row(self):
+        writer = self.result_writer.ScanResultWriter(flush_size=1, flush_interval=0.01).start()
+        writer.mark_pending(self.session_id, "10.0.0.1")
+        writer.submit(self.make_result("10.0.0.1"))
+        writer.close()
+
+        results = self.results()
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0].status_code, "success")
+        self.assertTrue(results[0].ssh_status)
+
+    def test_result_finished_within_one_batch_is_inserted_once(self):
+        writer = self.result_writer.ScanResultWriter(flush_size=100, flush_interval=5).start()
+        writer.mark_pending(self.session_id, "10.0.0.1")
+        writer.mark_pending(self.session_id, "10.0.0.2")
+        writer.submit(self.make_result("10.0.0.1"))
+        writer.submit(self.make_result("10.0.0.2", status_code="failed"))
+        writer.close()
+
+        results = sorted(self.results(), key=lambda r: r.ip_address)
+        self.assertEqual([r.status_code for r in results], ["success", "failed"])
+        self.assertFalse(results[1].ssh_status)
+
+    def test_session_counters_follow_final_results(self):
+        writer = self.result_writer.ScanResultWriter(flush_size=2, flush_interval=0.01).start()
+        for index in range(5):
+            writer.mark_pending(self.session_id, f"10.0.0.{index}")
+        for index in range(5):
+            writer.submit(self.make_result(f"10.0.0.{index}", "success" if index % 2 else "failed"))
+        writer.close()
+
+        with self.app.app_context():
+            session = self.db.session.get(self.app_module.ScanSession, self.session_id)
+            self.assertEqual((session.completed_count, session.success_count, session.failed_count), (5, 2, 3))
+
+    def test_failed_batch_is_retried(self):
+        from unittest import mock
+
+        self.result_writer.FLUSH_RETRY_DELAY = 0
+        commit = self.db.session.commit
+        failures = [Exception("database is locked")]
+
+        def fail_once():
+            if failures:
+                raise failures.pop()
+            commit()
+
+        writer = self.result_writer.ScanResultWriter(flush_size=100, flush_interval=5).start()
+        writer.mark_pending(self.session_id, "10.0.0.1")
+        writer.submit(self.make_result("10.0.0.1"))
+        writer.mark_pending(self.session_id, "10.0.0.2")
+        with mock.patch.object(self.db.session, "commit", side_effect=fail_once):
+            writer.close()
+
+        self.assertEqual(sorted(r.status_code for r in self.results()), ["pending", "success"])
+        with self.app.app_context():
+            session = self.db.session.get(self.app_module.ScanSession, self.session_id)
+            self.assertEqual(session.completed_count, 1)
+
+    def test_bad_row_does_not_lose_the_rest_of_the_batch(self):
+        self.result_writer.FLUSH_RETRY_DELAY = 0
+        writer = self.result_writer.ScanResultWriter(flush_size=100, flush_interval=5).start()
+        writer.mark_pending(self.session_id, "10.0.0.1")
+        writer.mark_pending(self.session_id, "10.0.0.2")
+        writer.submit(self.make_result("10.0.0.1"))
+        writer.submit(self.make_result(None))
+        writer.submit(self.make_result("10.0.0.2", status_code="failed"))
+        writer.close()
+
+        results = sorted(self.results(), key=lambda r: r.ip_address)
+        self.assertEqual([(r.ip_address, r.status_code) for r in results],
+                         [("10.0.0.1", "success"), ("10.0.0.2", "failed")])
+        with self.app.app_context():
+            session = self.db.session.get(self.app_module.ScanSession, self.session_id)
+            self.assertEqual((session.completed_count, session.success_count, session.failed_count), (2, 1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import importlib
+import socket
+import time
+import unittest
+
+from tests import AppTestCase
+
+
+class DiscoverySweepTestCase(AppTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.scan_engine = importlib.import_module("scan_engine")
+
+    def setUp(self):
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(16)
+        self.port = self.listener.getsockname()[1]
+        with self.app.app_context():
+            session = self.app_module.ScanSession(username="tester", auth_type="password", total_ips=3)
+            self.db.session.add(session)
+            self.db.session.commit()
+            self.session_id = session.id
+
+    def tearDown(self):
+        self.listener.close()
+
+    def test_only_listening_hosts_are_returned(self):
+        live = self.scan_engine.discover_live_hosts(
+            ["127.0.0.1", "127.0.0.2", "127.0.0.3"],
+            port=self.port,
+            scan_session_id=self.session_id,
+            timeout=2,
+        )
+
+        self.assertEqual(list(live), ["127.0.0.1"])
+
+    def test_unreachable_hosts_are_recorded_as_failed(self):
+        self.scan_engine.discover_live_hosts(
+            ["127.0.0.1", "127.0.0.2", "127.0.0.3"],
+            port=self.port,
+            scan_session_id=self.session_id,
+            timeout=2,
+        )
+
+        with self.app.app_context():
+            results = self.app_module.ScanResult.query.filter_by(scan_session_id=self.session_id).all()
+
+        self.assertEqual(sorted(r.ip_address for r in results), ["127.0.0.2", "127.0.0.3"])
+        self.assertTrue(all(r.status_code == "failed" for r in results))
+        self.assertTrue(all(r.error_message.startswith("Socket error") for r in results))
+
+    def results(self):
+        with self.app.app_context():
+            return self.app_module.ScanResult.query.filter_by(scan_session_id=self.session_id).all()
+
+    def test_unreachable_host_has_the_thread_engine_message(self):
+        ssh_utils = importlib.import_module("ssh_utils")
+        ssh_kwargs = dict(username="tester", password="x", port=self.port, scan_session_id=self.session_id)
+
+        # Nothing listens on 127.0.0.2 and 127.0.0.3
+        ssh_utils.execute_ssh_commands("127.0.0.2", **ssh_kwargs)
+        self.scan_engine.run_async_scan(["127.0.0.3"], ssh_kwargs)
+
+        messages = {r.ip_address: r.error_message for r in self.results()}
+        self.assertTrue(messages["127.0.0.2"].startswith("Authentication failed with all credentials: "
+                                                         "Connection error for user tester: "))
+        self.assertEqual(messages["127.0.0.3"], messages["127.0.0.2"].replace("127.0.0.2", "127.0.0.3"))
+
+    def test_connected_hosts_waiting_for_ssh_workers_are_bounded(self):
+        from unittest import mock
+
+        wildcard = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        wildcard.bind(("0.0.0.0", 0))
+        wildcard.listen(128)
+        self.addCleanup(wildcard.close)
+        targets = [f"127.0.1.{host}" for host in range(1, 41)]
+        open_tcp_connection = self.scan_engine.open_tcp_connection
+        connected = []
+        served = []
+        idle_peak = []
+
+        async def tracked_connect(*args):
+            sock = await open_tcp_connection(*args)
+            connected.append(sock)
+            return sock
+
+        def slow_ssh_worker(ip, sock=None, **kwargs):
+            served.append(ip)
+            if sock is not None:
+                sock.close()
+            idle_peak.append(sum(1 for s in connected if s.fileno() != -1))
+            time.sleep(0.02)
+
+        with mock.patch.object(self.scan_engine, "open_tcp_connection", side_effect=tracked_connect), \
+                mock.patch("ssh_utils.execute_ssh_commands", side_effect=slow_ssh_worker):
+            self.scan_engine.run_async_scan(targets, dict(port=wildcard.getsockname()[1]),
+                                            concurrency=2, connect_concurrency=100)
+
+        self.assertEqual(sorted(served), sorted(targets))
+        self.assertLessEqual(max(idle_peak), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,208 @@
+import importlib
+import os
+import socket
+import threading
+import unittest
+from datetime import datetime, timedelta
+
+from tests import AppTestCase
+
+
+class ScanQueueTestCase(AppTestCase):
+    @classmethod
+    def setUpClass(cls):
+        from benchmarks.sshd_standin import SSHStandin
+
+        super().setUpClass()
+        cls.models = importlib.import_module("models")
+        cls.scan_queue = importlib.import_module("scan_queue")
+        cls.ssh_utils = importlib.import_module("ssh_utils")
+        probe = socket.socket()
+        probe.bind(("127.0.0.1", 0))
+        cls.port = probe.getsockname()[1]
+        probe.close()
+        cls.addresses = ["127.0.0.1", "127.0.0.2", "127.0.0.3"]
+        cls.standin = SSHStandin(cls.addresses, cls.port, users={"tester": "secret"}).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.standin.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        with self.app.app_context():
+            self.models.ScanBatch.query.delete()
+            self.models.ScanJob.query.delete()
+            self.models.ScanResult.query.delete()
+            self.models.ScanSession.query.delete()
+            session = self.models.ScanSession(username="tester", auth_type="password", total_ips=3)
+            self.db.session.add(session)
+            self.db.session.commit()
+            self.session_id = session.id
+
+    def tearDown(self):
+        os.environ.pop("DISTRIBUTED_SCANS", None)
+
+    def enqueue(self, batch_size=2, **kwargs):
+        return self.scan_queue.enqueue_scan(
+            self.session_id, self.addresses, "tester", password="secret", commands=["echo queued"],
+            port=self.port, batch_size=batch_size, **kwargs
+        )
+
+    def session(self):
+        with self.app.app_context():
+            return self.db.session.get(self.models.ScanSession, self.session_id)
+
+    def results(self):
+        with self.app.app_context():
+            return self.models.ScanResult.query.filter_by(scan_session_id=self.session_id).all()
+
+    def expire_lease(self, batch_id):
+        with self.app.app_context():
+            batch = self.db.session.get(self.models.ScanBatch, batch_id)
+            batch.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+            self.db.session.commit()
+
+    def test_start_scan_session_queues_batches_with_encrypted_credentials(self):
+        os.environ["DISTRIBUTED_SCANS"] = "enabled"
+
+        thread = self.ssh_utils.start_scan_session(
+            self.session_id, self.addresses, "tester", password="secret", port=self.port
+        )
+
+        self.assertIsNone(thread)
+        with self.app.app_context():
+            batches = self.models.ScanBatch.query.order_by(self.models.ScanBatch.id).all()
+            job = self.models.ScanJob.query.filter_by(scan_session_id=self.session_id).one()
+            self.assertEqual([(batch.targets, batch.size, batch.status) for batch in batches],
+                             [("127.0.0.1-127.0.0.3", 3, "queued")])
+            self.assertNotIn("secret", job.password_encrypted)
+        self.assertEqual(self.scan_queue.load_scan_job(self.session_id)["password"], "secret")
+
+    def test_each_batch_is_claimed_by_one_worker(self):
+        self.enqueue()
+
+        first = self.scan_queue.claim_batch("worker-a")
+        second = self.scan_queue.claim_batch("worker-b")
+
+        self.assertNotEqual(first.id, second.id)
+        self.assertEqual(first.targets, "127.0.0.1-127.0.0.2")
+        self.assertEqual(second.targets, "127.0.0.3")
+        self.assertIsNone(self.scan_queue.claim_batch("worker-c"))
+
+    def test_expired_lease_is_taken_over(self):
+        self.enqueue(batch_size=3)
+        batch = self.scan_queue.claim_batch("worker-a")
+        self.expire_lease(batch.id)
+
+        takeover = self.scan_queue.claim_batch("worker-b")
+
+        self.assertEqual(takeover.id, batch.id)
+        self.assertEqual(takeover.attempts, 2)
+        self.assertFalse(self.scan_queue.renew_lease(batch.id, "worker-a"))
+        self.assertFalse(self.scan_queue.finish_batch(batch, "worker-a"))
+        self.assertTrue(self.scan_queue.renew_lease(batch.id, "worker-b"))
+
+    def test_workers_scan_all_batches_and_complete_the_session(self):
+        self.enqueue()
+        workers = [self.scan_queue.ScanWorker(worker_id=name, poll_interval=0.1) for name in ("a", "b")]
+        threads = [threading.Thread(target=worker.run, kwargs={"stop_when_idle": True}) for worker in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(60)
+
+        results = self.results()
+        self.assertEqual(sorted(result.ip_address for result in results), self.addresses)
+        self.assertTrue(all(result.status_code == "success" for result in results))
+        session = self.session()
+        self.assertEqual(session.status, "completed")
+        self.assertEqual((session.completed_count, session.success_count), (3, 3))
+        with self.app.app_context():
+            self.assertEqual(self.models.ScanBatch.query.count(), 0)
+            self.assertEqual(self.models.ScanJob.query.count(), 0)
+
+    def test_retry_replaces_results_of_the_earlier_attempt(self):
+        self.enqueue(batch_size=3)
+        batch = self.scan_queue.claim_batch("worker-a")
+        # The first worker got as far as one failed host before its lease ran out
+        importlib.import_module("scan_engine").record_connection_failures(
+            self.session_id, [("127.0.0.2", "Socket error", 0.1)]
+        )
+        self.expire_lease(batch.id)
+
+        self.assertTrue(self.scan_queue.ScanWorker(worker_id="worker-b").run_once())
+
+        results = self.results()
+        self.assertEqual(sorted(result.ip_address for result in results), self.addresses)
+        session = self.session()
+        self.assertEqual((session.completed_count, session.success_count, session.failed_count), (3, 3, 0))
+
+    def test_hosts_in_flight_after_a_lost_lease_write_nothing(self):
+        from unittest import mock
+
+        self.enqueue(batch_size=3)
+        execute_ssh_commands = self.ssh_utils.execute_ssh_commands
+        release = threading.Event()
+        first_call = []
+
+        def stalled_host(*args, **kwargs):
+            # The first host worker A starts hangs until worker B has taken the batch over
+            if not first_call:
+                first_call.append(args[0])
+                release.wait(30)
+            return execute_ssh_commands(*args, **kwargs)
+
+        worker_a = self.scan_queue.ScanWorker(worker_id="worker-a", lease_seconds=60)
+        with mock.patch.object(self.ssh_utils, "execute_ssh_commands", side_effect=stalled_host):
+            thread = threading.Thread(target=worker_a.run_once)
+            thread.start()
+            deadline = datetime.utcnow() + timedelta(seconds=30)
+            while len([r for r in self.results() if r.status_code == "success"]) < 2:
+                self.assertLess(datetime.utcnow(), deadline)
+                threading.Event().wait(0.05)
+            with self.app.app_context():
+                batch_id = self.models.ScanBatch.query.one().id
+            self.expire_lease(batch_id)
+
+            self.assertTrue(self.scan_queue.ScanWorker(worker_id="worker-b").run_once())
+            release.set()
+            thread.join(30)
+
+        results = self.results()
+        self.assertEqual(sorted(result.ip_address for result in results), self.addresses)
+        self.assertTrue(all(result.status_code == "success" for result in results))
+        session = self.session()
+        self.assertEqual(session.status, "completed")
+        self.assertEqual((session.completed_count, session.success_count, session.failed_count), (3, 3, 0))
+
+    def test_exhausted_batch_records_its_hosts_as_failed(self):
+        self.enqueue(batch_size=3)
+        batch = self.scan_queue.claim_batch("worker-a")
+        self.expire_lease(batch.id)
+
+        self.assertTrue(self.scan_queue.ScanWorker(worker_id="worker-b", max_attempts=1).run_once())
+
+        results = self.results()
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(result.status_code == "failed" for result in results))
+        self.assertTrue(all("after 1 attempts" in result.error_message for result in results))
+        session = self.session()
+        self.assertEqual((session.status, session.failed_count), ("completed", 3))
+
+    def test_stopped_worker_releases_its_batch_without_counting_the_attempt(self):
+        self.enqueue(batch_size=3)
+        worker = self.scan_queue.ScanWorker(worker_id="worker-a")
+        worker.stop()
+
+        self.assertTrue(worker.run_once())
+
+        with self.app.app_context():
+            batch = self.models.ScanBatch.query.one()
+            self.assertEqual((batch.status, batch.attempts, batch.worker_id), ("queued", 0, None))
+        self.assertEqual(self.results(), [])
+        self.assertEqual(self.session().status, "running")
+
+
+if __name__ == "__main__":
+    unittest.main()
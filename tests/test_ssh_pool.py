@@ -0,0 +1,158 @@
+import importlib
+import socket
+import time
+import unittest
+
+import ssh_pool
+from tests import AppTestCase
+
+
+class FakeChannel:
+    def close(self):
+        pass
+
+
+class FakeTransport:
+    def __init__(self):
+        self.active = True
+        self.channel_error = None
+
+    def is_active(self):
+        return self.active
+
+    def is_authenticated(self):
+        return True
+
+    def open_session(self, timeout=None):
+        if self.channel_error:
+            raise self.channel_error
+        return FakeChannel()
+
+
+class FakeClient:
+    def __init__(self):
+        self.transport = FakeTransport()
+        self.closed = False
+
+    def get_transport(self):
+        return self.transport
+
+    def close(self):
+        self.closed = True
+        self.transport.active = False
+
+
+class SSHConnectionPoolTestCase(unittest.TestCase):
+    def test_released_connection_is_checked_out_exclusively(self):
+        pool = ssh_pool.SSHConnectionPool(max_size=4, idle_timeout=60)
+        client = FakeClient()
+        pool.release("10.0.0.1", 22, "root", client, credential_id=7)
+
+        self.assertEqual(pool.acquire("10.0.0.1", 22, "root"), (client, 7))
+        self.assertEqual(pool.acquire("10.0.0.1", 22, "root"), (None, None))
+        self.assertEqual(pool.acquire("10.0.0.1", 22, "admin"), (None, None))
+
+    def test_least_recently_used_connection_is_evicted(self):
+        pool = ssh_pool.SSHConnectionPool(max_size=2, idle_timeout=60)
+        clients = [FakeClient() for _ in range(3)]
+        for index, client in enumerate(clients):
+            pool.release(f"10.0.0.{index}", 22, "root", client)
+
+        self.assertEqual(len(pool), 2)
+        self.assertTrue(clients[0].closed)
+        self.assertFalse(clients[2].closed)
+
+    def test_idle_and_unhealthy_connections_are_discarded(self):
+        pool = ssh_pool.SSHConnectionPool(max_size=4, idle_timeout=0.05)
+        idle, broken = FakeClient(), FakeClient()
+        pool.release("10.0.0.1", 22, "root", idle)
+        time.sleep(0.1)
+        self.assertEqual(pool.prune(), 1)
+        self.assertTrue(idle.closed)
+
+        pool.idle_timeout = 60
+        pool.release("10.0.0.2", 22, "root", broken)
+        broken.transport.channel_error = EOFError()
+        self.assertEqual(pool.acquire("10.0.0.2", 22, "root"), (None, None))
+        self.assertTrue(broken.closed)
+
+    def test_scans_larger_than_the_pool_do_not_use_it(self):
+        pool = ssh_pool.SSHConnectionPool(max_size=2, idle_timeout=60)
+
+        self.assertIs(pool.for_scan(2), pool)
+        self.assertIsNone(pool.for_scan(3))
+
+
+class PooledScanTestCase(AppTestCase):
+    @classmethod
+    def setUpClass(cls):
+        from benchmarks.sshd_standin import SSHStandin, StandinStats
+
+        super().setUpClass()
+        cls.ssh_utils = importlib.import_module("ssh_utils")
+        probe = socket.socket()
+        probe.bind(("127.0.0.1", 0))
+        cls.port = probe.getsockname()[1]
+        probe.close()
+        cls.stats = StandinStats()
+        cls.addresses = ["127.0.0.1", "127.0.0.2", "127.0.0.3"]
+        cls.standin = SSHStandin(cls.addresses, cls.port, users={"tester": "secret"}, stats=cls.stats).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.standin.stop()
+        super().tearDownClass()
+
+    def scan(self, pool):
+        app_module = self.app_module
+        with app_module.app.app_context():
+            session = app_module.ScanSession(username="tester", auth_type="password", total_ips=1)
+            app_module.db.session.add(session)
+            app_module.db.session.commit()
+            session_id = session.id
+        self.ssh_utils.execute_ssh_commands(
+            "127.0.0.1", "tester", password="secret", commands=["echo pooled"],
+            scan_session_id=session_id, port=self.port, connection_pool=pool
+        )
+        with app_module.app.app_context():
+            return app_module.ScanResult.query.filter_by(scan_session_id=session_id).one().status_code
+
+    def test_repeated_scans_reuse_the_authenticated_connection(self):
+        pool = ssh_pool.SSHConnectionPool(max_size=4, idle_timeout=60)
+        connections = self.stats.connections
+        try:
+            self.assertEqual([self.scan(pool) for _ in range(3)], ["success"] * 3)
+            self.assertEqual(self.stats.connections - connections, 1)
+            self.assertEqual(len(pool), 1)
+        finally:
+            pool.close_all()
+
+    def test_rescan_of_more_hosts_than_the_pool_holds_is_not_pooled(self):
+        pool = ssh_pool.SSHConnectionPool(max_size=2, idle_timeout=60)
+        app_module = self.app_module
+        connections = self.stats.connections
+        try:
+            for _ in range(2):
+                with app_module.app.app_context():
+                    session = app_module.ScanSession(username="tester", auth_type="password", total_ips=3)
+                    app_module.db.session.add(session)
+                    app_module.db.session.commit()
+                    session_id = session.id
+                self.ssh_utils.start_scan_session(
+                    session_id, list(self.addresses), "tester", password="secret", commands=["echo pooled"],
+                    port=self.port, concurrency=1, connection_pool=pool
+                ).join()
+                with app_module.app.app_context():
+                    statuses = [result.status_code for result in
+                                app_module.ScanResult.query.filter_by(scan_session_id=session_id)]
+                self.assertEqual(statuses, ["success"] * 3)
+
+            # Every host connects afresh each run and nothing is kept open
+            self.assertEqual(self.stats.connections - connections, 6)
+            self.assertEqual(len(pool), 0)
+        finally:
+            pool.close_all()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import io
+import unittest
+
+import subnet_utils
+
+
+class TargetSetTestCase(unittest.TestCase):
+    def test_subnet_input_is_sorted_and_deduplicated(self):
+        addresses = subnet_utils.parse_subnet_input("192.168.1.0/30, 192.168.1.2\n10.0.0.9-10")
+
+        self.assertEqual(addresses, ["10.0.0.9", "10.0.0.10", "192.168.1.1", "192.168.1.2"])
+
+    def test_subnet_hosts_exclude_network_and_broadcast(self):
+        self.assertEqual(subnet_utils.parse_subnet("10.0.0.0/30"), ["10.0.0.1", "10.0.0.2"])
+        self.assertEqual(subnet_utils.parse_subnet("10.0.0.0/31"), ["10.0.0.0", "10.0.0.1"])
+        self.assertEqual(subnet_utils.parse_subnet("10.0.0.7/32"), ["10.0.0.7"])
+
+    def test_overlapping_inputs_are_merged_into_intervals(self):
+        targets = subnet_utils.parse_target_set("10.0.0.1-10.0.0.20, 10.0.0.10-30, 10.0.0.31")
+
+        self.assertEqual(len(targets.intervals), 1)
+        self.assertEqual(len(targets), 31)
+        self.assertEqual(list(targets)[-1], "10.0.0.31")
+
+    def test_large_subnet_is_counted_without_materialising(self):
+        targets = subnet_utils.parse_target_set("10.0.0.0/8")
+        iterator = iter(targets)
+
+        self.assertEqual(len(targets), 2 ** 24 - 2)
+        self.assertEqual([next(iterator), next(iterator)], ["10.0.0.1", "10.0.0.2"])
+
+    def test_chunks_split_intervals_without_expanding_them(self):
+        targets = subnet_utils.parse_target_set("10.0.0.1-10.0.0.5, 10.0.1.0/31, 172.16.0.0/12")
+
+        chunks = targets.chunks(4)
+
+        self.assertEqual(list(next(chunks).ranges()), ["10.0.0.1-10.0.0.4"])
+        self.assertEqual(list(next(chunks).ranges()), ["10.0.0.5", "10.0.1.0-10.0.1.1", "172.16.0.1"])
+        self.assertEqual(sum(len(chunk) for chunk in targets.chunks(2 ** 16)), len(targets))
+
+    def test_invalid_entries_are_skipped(self):
+        targets = subnet_utils.parse_target_set("999.1.1.1\n10.0.0.0/33\nnot-an-ip\n10.0.0.1")
+
+        self.assertEqual(list(targets), ["10.0.0.1"])
+
+    def test_union_and_difference(self):
+        first = subnet_utils.parse_target_set("10.0.0.1-10.0.0.10")
+        second = subnet_utils.parse_target_set("10.0.0.11-10.0.0.20, 10.0.0.40")
+
+        union = first | second
+        self.assertEqual(union.intervals, [(167772161, 167772180), (167772200, 167772200)])
+        remaining = union - subnet_utils.parse_target_set("10.0.0.5-10.0.0.15, 10.0.0.40")
+        self.assertEqual(list(remaining), [
+            "10.0.0.1", "10.0.0.2", "10.0.0.3", "10.0.0.4",
+            "10.0.0.16", "10.0.0.17", "10.0.0.18", "10.0.0.19", "10.0.0.20",
+        ])
+
+    def test_membership(self):
+        targets = subnet_utils.parse_target_set("10.0.0.0/24, 10.0.2.0/24")
+
+        self.assertIn("10.0.0.7", targets)
+        self.assertIn(167772167, targets)
+        self.assertNotIn("10.0.0.0", targets)
+        self.assertNotIn("10.0.1.7", targets)
+        self.assertNotIn("10.0.3.1", targets)
+        self.assertNotIn("not-an-ip", targets)
+
+    def test_exclusion_syntax(self):
+        targets = subnet_utils.parse_target_set(
+            "10.0.0.0/8 except 10.20.0.0/16 and 10.99.1.0/24\n!10.0.0.0/24, !10.255.255.0/24"
+        )
+
+        self.assertNotIn("10.20.5.5", targets)
+        self.assertNotIn("10.99.1.10", targets)
+        self.assertNotIn("10.0.0.200", targets)
+        self.assertIn("10.21.0.0", targets)
+        self.assertIn("10.99.2.1", targets)
+        self.assertEqual(len(targets), 2 ** 24 - 2 - 65536 - 256 - 255 - 255)
+        self.assertEqual(next(iter(targets)), "10.0.1.0")
+
+    def test_exclusions_apply_to_whole_input(self):
+        addresses = subnet_utils.parse_subnet_input("!10.0.0.2\n10.0.0.1-10.0.0.3")
+
+        self.assertEqual(addresses, ["10.0.0.1", "10.0.0.3"])
+
+    def test_csv_file_uses_named_target_column(self):
+        csv_content = (
+            "hostname,IP Address,notes\n"
+            'web,"10.0.0.1, 10.0.0.2",ignored\n'
+            "db,10.0.1.0/30,ignored\n"
+            "short-row\n"
+            "gone,!10.0.0.2,ignored\n"
+        )
+
+        addresses = subnet_utils.parse_csv_file(csv_content)
+
+        self.assertEqual(addresses, ["10.0.0.1", "10.0.1.1", "10.0.1.2"])
+
+    def test_csv_file_falls_back_to_first_column(self):
+        addresses = subnet_utils.parse_csv_file(iter(["host\n", "192.168.1.5\n", "not-an-ip\n"]))
+
+        self.assertEqual(addresses, ["192.168.1.5"])
+        self.assertEqual(subnet_utils.parse_csv_file(""), [])
+
+    def test_csv_import_reports_invalid_rows(self):
+        csv_content = (
+            "name;location;cidr\n"
+            "a;dc1;10.1.0.0/24\n"
+            "b;dc1;10.1.1.0/24\n"
+            "\n"
+            "c;dc2;10.1.300.0/24\n"
+            "d;dc2;\n"
+            "e;dc2;10.2.0.9-10.2.0.1\n"
+        )
+
+        result = subnet_utils.import_csv_targets(io.StringIO(csv_content, newline=""), max_errors=2)
+
+        self.assertEqual(result.column, "cidr")
+        self.assertEqual(result.rows, 5)
+        self.assertEqual(list(result.targets.ranges()), ["10.1.0.1-10.1.0.254", "10.1.1.1-10.1.1.254"])
+        self.assertEqual(result.error_count, 3)
+        self.assertEqual([error["line"] for error in result.errors], [5, 6])
+        self.assertEqual(result.errors[0]["value"], "10.1.300.0/24")
+
+    def test_csv_import_without_header(self):
+        result = subnet_utils.import_csv_targets(["srv1\t10.0.0.5\n", "srv2\t10.0.0.6-7\n"])
+
+        self.assertFalse(result.has_header)
+        self.assertEqual(result.rows, 2)
+        self.assertEqual(list(result.targets.ranges()), ["10.0.0.5-10.0.0.7"])
+
+    def test_builder_compacts_repeated_entries(self):
+        builder = subnet_utils.TargetSetBuilder()
+        builder.COMPACT_EVERY = builder._compact_at = 10
+        for _ in range(50):
+            self.assertEqual(builder.add("10.0.0.0/30\n10.0.0.3"), [])
+
+        self.assertLess(len(builder.included), 10)
+        self.assertEqual(list(builder.build()), ["10.0.0.1", "10.0.0.2", "10.0.0.3"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+"""
+Scan worker: scans batches of queued scan sessions (see scan_queue).
+
+Start any number of these, on this host or others, against the same
+DATABASE_URL and ENCRYPTION_KEY as the web app, which queues scans instead of
+running them when DISTRIBUTED_SCANS=enabled. On SIGTERM or SIGINT the worker
+finishes the hosts in flight and releases the rest of its batch.
+
+    python worker.py --concurrency 50
+"""
+import argparse
+import logging
+import signal
+from scan_queue import ScanWorker
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="hosts scanned at once (default: each scan's own setting)")
+    parser.add_argument("--poll-interval", type=float, default=5.0,
+                        help="seconds to wait when no batch is queued")
+    parser.add_argument("--worker-id", default=None, help="name in the batch leases (default: host:pid:random)")
+    parser.add_argument("--exit-when-idle", action="store_true", help="exit once the queue is empty")
+    args = parser.parse_args()
+
+    worker = ScanWorker(worker_id=args.worker_id, concurrency=args.concurrency,
+                        poll_interval=args.poll_interval)
+
+    def shutdown(signum, frame):
+        logger.info(f"Received signal {signum}, stopping scan worker")
+        worker.stop()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    worker.run(stop_when_idle=args.exit_when_idle)
+
+
+if __name__ == "__main__":
+    main()